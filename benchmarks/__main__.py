@@ -0,0 +1,9 @@
+import os
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from benchmarks.run import main  # noqa: E402
+
+main()
@@ -0,0 +1,50 @@
+import random
+
+from benchmarks.models import Product, Region, Vendor
+
+
+def seed(
+    rows: int,
+    fanout: int,
+    vendors: int,
+    regions: int = 10,
+    random_seed: int = 0,
+) -> None:
+    """
+    Seed the database with rows products, each with fanout random vendors
+    out of vendors, each in one of regions.
+    """
+    rand = random.Random(random_seed)
+    region_objs = Region.objects.bulk_create(
+        [Region(name=f"Region {i}") for i in range(regions)]
+    )
+    vendor_objs = Vendor.objects.bulk_create(
+        [
+            Vendor(
+                name=f"Vendor {i}",
+                about="About vendor.",
+                enabled=bool(i % 2),
+                region=rand.choice(region_objs),
+            )
+            for i in range(vendors)
+        ]
+    )
+    product_objs = Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Product {i}",
+                description="A product.",
+                enabled=bool(i % 2),
+            )
+            for i in range(rows)
+        ]
+    )
+    through = Product.vendors.through
+    through.objects.bulk_create(
+        [
+            through(product_id=product.id, vendor_id=vendor.id)
+            for product in product_objs
+            for vendor in rand.sample(vendor_objs, min(fanout, vendors))
+        ],
+        batch_size=5000,
+    )
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class Region(models.Model):
+    name = models.CharField(max_length=256)
+
+    def __str__(self):
+        return self.name
+
+
+class Vendor(models.Model):
+    name = models.CharField(max_length=256)
+    about = models.TextField(blank=True, default='')
+    enabled = models.BooleanField(default=False)
+    region = models.ForeignKey(
+        Region,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class Product(models.Model):
+    name = models.CharField(max_length=256)
+    description = models.TextField(blank=True, default='')
+    enabled = models.BooleanField(default=False)
+    vendors = models.ManyToManyField(Vendor, blank=True)
+
+    def __str__(self):
+        return self.name
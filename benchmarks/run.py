@@ -0,0 +1,220 @@
+"""
+Benchmark quick against standard serialization.
+
+Run with python -m benchmarks, see --help for options.
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import ModelViewSet
+
+from benchmarks.data import seed
+from benchmarks.models import Product, Vendor
+from benchmarks.serializers import make_serializers
+from drfwn_quick.data import ENGINES, FETCH_STRATEGIES
+from drfwn_quick.viewsets import QuickableNestedModelViewSet
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """
+    Measure a function's wall time over repeat calls, then its query count
+    and peak traced memory over one call each. Memory is traced separately
+    as tracing slows everything down.
+    """
+    # Warm up, e.g. compiling quick plans.
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "queries": len(queries),
+        "peak_kib": peak / 1024,
+    }
+
+
+def rolled_back(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Wrap a function that writes so every call starts from the same data."""
+    def wrapped() -> Any:
+        with transaction.atomic():
+            result = func()
+            transaction.set_rollback(True)
+        return result
+    return wrapped
+
+
+def get_cases(
+    depth: int,
+    fetch_strategy: str,
+    engine: str = "rows",
+) -> list[tuple[str, str, Callable[[], Any]]]:
+    """Get (case, variant, function) for every benchmark."""
+    quick_serializer, standard_serializer = make_serializers(
+        depth,
+        fetch_strategy,
+        engine,
+    )
+
+    class QuickProductViewSet(QuickableNestedModelViewSet):
+        queryset = Product.objects.all().order_by("-id")
+        serializer_class = quick_serializer
+        pagination_class = None
+
+    class ProductViewSet(ModelViewSet):
+        queryset = Product.objects.all().order_by("-id")
+        serializer_class = standard_serializer
+        pagination_class = None
+
+    factory = APIRequestFactory()
+    product = Product.objects.order_by("id").first()
+    vendors = list(Vendor.objects.order_by("id")[:3])
+    payload = {
+        "name": "Benchmark product",
+        "vendors": [{"id": v.id, "name": v.name} for v in vendors],
+    }
+
+    def request(
+        viewset: type,
+        actions: dict[str, str],
+        method: str,
+        query: str = "",
+        detail: bool = False,
+        **kwargs,
+    ) -> Callable[[], Any]:
+        view = viewset.as_view(actions)
+        path = f"/products/{query}"
+        view_kwargs = {"pk": product.id} if detail else {}
+
+        def call() -> Any:
+            response = view(
+                getattr(factory, method)(path, format="json", **kwargs),
+                **view_kwargs,
+            )
+            response.render()
+            return response
+        return call
+
+    list_actions = {"get": "list", "post": "create"}
+    detail_actions = {"get": "retrieve", "put": "update"}
+    cases = [
+        (
+            "serializer",
+            "quick",
+            lambda: quick_serializer(
+                Product.objects.all(),
+                force_quick=True,
+            ).data,
+        ),
+        (
+            "serializer",
+            "standard",
+            lambda: standard_serializer(
+                Product.objects.all(),
+                many=True,
+            ).data,
+        ),
+    ]
+    for variant, viewset, query in (
+        ("quick", QuickProductViewSet, "?quick=true"),
+        ("standard", ProductViewSet, ""),
+    ):
+        cases += [
+            ("list", variant, request(viewset, list_actions, "get", query)),
+            (
+                "retrieve",
+                variant,
+                request(viewset, detail_actions, "get", query, detail=True),
+            ),
+            (
+                "create",
+                variant,
+                rolled_back(
+                    request(
+                        viewset,
+                        list_actions,
+                        "post",
+                        query,
+                        data=payload,
+                    )
+                ),
+            ),
+            (
+                "update",
+                variant,
+                rolled_back(
+                    request(
+                        viewset,
+                        detail_actions,
+                        "put",
+                        query,
+                        detail=True,
+                        data=payload,
+                    )
+                ),
+            ),
+        ]
+    return sorted(cases, key=lambda case: case[0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--depth", type=int, choices=(1, 2), default=1)
+    parser.add_argument(
+        "--fetch-strategy",
+        choices=FETCH_STRATEGIES,
+        default="join",
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--json",
+        dest="json_path",
+        help="Also write results as JSON to this path.",
+    )
+    args = parser.parse_args()
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    seed(args.rows, args.fanout, args.vendors)
+    results = []
+    cases = get_cases(args.depth, args.fetch_strategy, args.engine)
+    for case, variant, func in cases:
+        results.append(
+            {"case": case, "variant": variant, **measure(func, args.repeat)}
+        )
+    print(
+        f"rows={args.rows} fanout={args.fanout} vendors={args.vendors}"
+        f" depth={args.depth} fetch_strategy={args.fetch_strategy}"
+        f" engine={args.engine}"
+    )
+    print(
+        f"{'case':<12}{'variant':<10}{'median ms':>12}{'min ms':>12}"
+        f"{'queries':>10}{'peak KiB':>12}"
+    )
+    for result in results:
+        print(
+            f"{result['case']:<12}{result['variant']:<10}"
+            f"{result['median_ms']:>12.2f}{result['min_ms']:>12.2f}"
+            f"{result['queries']:>10}{result['peak_kib']:>12.1f}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
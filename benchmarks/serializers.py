@@ -0,0 +1,73 @@
+from drf_writable_nested import WritableNestedModelSerializer
+from rest_framework.serializers import ModelSerializer
+
+from benchmarks.models import Product, Region, Vendor
+from drfwn_quick.serializers import QuickableNestedModelSerializer
+
+
+def make_serializers(
+    depth: int,
+    fetch_strategy: str,
+    engine: str = "rows",
+) -> tuple[type, type]:
+    """
+    Make the quick and standard product serializers for a nesting depth.
+
+    At depth 1, vendors are nested in products. At depth 2, regions are
+    nested in vendors in turn. Classes are made per call as quick plans are
+    compiled once per class.
+    """
+    class RegionSerializer(ModelSerializer):
+        class Meta:
+            model = Region
+            fields = "__all__"
+
+    class VendorSerializer(WritableNestedModelSerializer):
+        if depth > 1:
+            region = RegionSerializer(required=False, allow_null=True)
+
+        class Meta:
+            model = Vendor
+            fields = "__all__"
+
+    class ProductSerializer(WritableNestedModelSerializer):
+        vendors = VendorSerializer(many=True, required=False)
+
+        class Meta:
+            model = Product
+            fields = "__all__"
+
+    class QuickRegionSerializer(QuickableNestedModelSerializer):
+        queryset = Region.objects.all()
+        related_querysets = {"vendor": Vendor.objects.all()}
+
+        class Meta:
+            model = Region
+            fields = "__all__"
+
+    class QuickVendorSerializer(QuickableNestedModelSerializer):
+        queryset = Vendor.objects.all()
+        related_querysets = {
+            "product": Product.objects.all(),
+            "region": Region.objects.all(),
+        }
+        if depth > 1:
+            region = QuickRegionSerializer(required=False, allow_null=True)
+
+        class Meta:
+            model = Vendor
+            fields = "__all__"
+
+    class QuickProductSerializer(QuickableNestedModelSerializer):
+        queryset = Product.objects.all()
+        related_querysets = {"vendors": Vendor.objects.all()}
+        quick_depth = depth
+        vendors = QuickVendorSerializer(many=True, required=False)
+
+        class Meta:
+            model = Product
+            fields = "__all__"
+
+    QuickProductSerializer.fetch_strategy = fetch_strategy
+    QuickProductSerializer.quick_engine = engine
+    return QuickProductSerializer, ProductSerializer
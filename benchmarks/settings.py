@@ -0,0 +1,23 @@
+"""Django settings for the benchmarks, using an in-memory SQLite database."""
+SECRET_KEY = "benchmarks"
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+USE_TZ = False
+INSTALLED_APPS = [
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "drfwn_quick",
+    "benchmarks",
+]
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.core import checks
+
+
+class DrfwnQuickConfig(AppConfig):
+    name = "drfwn_quick"
+
+    def ready(self) -> None:
+        # Connects the cache invalidation signal receivers in every process,
+        # including those that never serialize, e.g. workers that only write.
+        import drfwn_quick.cache  # noqa: F401
+        from drfwn_quick.routers import check_read_router
+        checks.register(check_read_router)
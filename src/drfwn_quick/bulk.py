@@ -0,0 +1,352 @@
+from collections import defaultdict
+from typing import Any, Mapping
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from drfwn_quick.cache import invalidate_model
+from drfwn_quick.data import chunked, rel_is_to_many
+from drfwn_quick.settings import ID_CHUNK_SIZE
+
+
+class BulkRelatedIdsField(serializers.Field):
+    """
+    A relation's related ID(s) for bulk writes, given as IDs or as rows
+    with IDs, as nested writes accept. Related rows are linked rather than
+    written, and checked to exist for every row at once, see
+    check_related_ids.
+    """
+    default_error_messages = {
+        "invalid": "Expected an ID or an object with an ID.",
+        "not_a_list": "Expected a list of items but got type \"{input_type}\".",
+        "unsupported": "This relation can't be written in bulk.",
+    }
+
+    def __init__(
+        self,
+        many: bool = False,
+        supported: bool = True,
+        **kwargs,
+    ) -> None:
+        self.many = many
+        self.supported = supported
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data: Any) -> int | list[int]:
+        if not self.supported:
+            self.fail("unsupported")
+        if not self.many:
+            return self.to_id(data)
+        if not isinstance(data, list):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        return list(dict.fromkeys(self.to_id(item) for item in data))
+
+    def to_id(self, item: Any) -> int:
+        value = item.get("id", None) if isinstance(item, dict) else item
+        if isinstance(value, bool):
+            self.fail("invalid")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            self.fail("invalid")
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    A list serializer for bulk writes. For updates, its instance is the
+    rows' instances by ID, and each row is validated against its own, e.g.
+    so that unique validators don't flag a row's unchanged values.
+    """
+
+    def run_child_validation(self, data: Any) -> Any:
+        if self.instance is not None and isinstance(data, dict):
+            self.child.instance = self.instance.get(data.get("id", None))
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+
+def make_bulk_serializer_class(serializer_class: type) -> type:
+    """
+    Make a subclass of a serializer for bulk writes, which validates
+    relations as related IDs (see BulkRelatedIdsField) rather than with
+    nested serializers or a query per related row.
+
+    Other fields, and validation, are as the serializer's. Only forward
+    relations, and many-to-many relations through tables Django creates,
+    can be written.
+    """
+    model = serializer_class.Meta.model
+    attrs = {
+        "Meta": type(
+            "Meta",
+            (serializer_class.Meta,),
+            {"list_serializer_class": BulkListSerializer},
+        ),
+    }
+    for name, field in serializer_class().fields.items():
+        if field.read_only:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        many = rel_is_to_many(model_field)
+        supported = not model_field.auto_created and (
+            not model_field.many_to_many
+            or model_field.remote_field.through._meta.auto_created
+        )
+        kwargs = {"source": field.source} if field.source != name else {}
+        attrs[name] = BulkRelatedIdsField(
+            many=many,
+            supported=supported,
+            required=field.required,
+            allow_null=not many and model_field.null,
+            **kwargs,
+        )
+    return type(f"Bulk{serializer_class.__name__}", (serializer_class,), attrs)
+
+
+def check_related_ids(
+    rows: list[Mapping[str, Any]],
+    related_querysets: Mapping[str, QuerySet],
+) -> None:
+    """
+    Check that the related IDs of bulk rows exist in their relations'
+    related querysets, with one query per relation rather than per ID.
+    Raises a ValidationError with errors per row otherwise.
+    """
+    related_ids = defaultdict(set)
+    for row in rows:
+        for name, value in row.items():
+            if name in related_querysets and value is not None:
+                related_ids[name].update(
+                    value if isinstance(value, list) else [value]
+                )
+    existing_ids = {}
+    for name, ids in related_ids.items():
+        existing_ids[name] = set()
+        for ids_chunk in chunked(sorted(ids), ID_CHUNK_SIZE):
+            existing_ids[name].update(
+                related_querysets[name].filter(
+                    pk__in=ids_chunk
+                ).values_list("pk", flat=True)
+            )
+    errors = []
+    for row in rows:
+        row_errors = {}
+        for name, ids in existing_ids.items():
+            value = row.get(name, None)
+            missing = [
+                i for i in (value if isinstance(value, list) else [value])
+                if i is not None and i not in ids
+            ]
+            if missing:
+                row_errors[name] = [
+                    f"Invalid pk \"{i}\" - object does not exist."
+                    for i in missing
+                ]
+        errors.append(row_errors)
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def get_unique_sets(model: type[Model]) -> list[tuple[str, ...]]:
+    """
+    Get the sets of a model's fields whose values must be unique together,
+    from unique fields, unique_together and unconditional unique
+    constraints.
+    """
+    unique_sets = [
+        (field.name,) for field in model._meta.concrete_fields
+        if field.unique and not field.primary_key
+    ]
+    unique_sets += [tuple(names) for names in model._meta.unique_together]
+    unique_sets += [
+        tuple(constraint.fields)
+        for constraint in model._meta.total_unique_constraints
+        if constraint.fields
+    ]
+    return list(dict.fromkeys(unique_sets))
+
+
+def check_unique_rows(
+    model: type[Model],
+    rows: list[Mapping[str, Any]],
+    instances: list[Model] | None = None,
+) -> None:
+    """
+    Check that bulk rows don't collide with each other on unique fields, or
+    sets of fields, which validating each row on its own can't catch. For
+    updates, instances are the rows' instances in the same order, whose
+    values are used for fields a row doesn't give.
+
+    Raises a ValidationError with errors per row otherwise, for each row
+    with the same values as an earlier one. Null values never collide.
+    """
+    errors = [{} for _ in rows]
+    for names in get_unique_sets(model):
+        seen = set()
+        for i, row in enumerate(rows):
+            values = []
+            for name in names:
+                if name in row:
+                    values.append(row[name])
+                elif instances is not None:
+                    values.append(
+                        getattr(
+                            instances[i],
+                            model._meta.get_field(name).attname,
+                        )
+                    )
+                else:
+                    # Left to the field's default, checked by the database.
+                    values.append(None)
+            if any(value is None for value in values):
+                continue
+            if tuple(values) in seen:
+                if len(names) == 1:
+                    errors[i][names[0]] = [
+                        "This field must be unique within the rows."
+                    ]
+                else:
+                    errors[i].setdefault("non_field_errors", []).append(
+                        f"The fields {', '.join(names)} must make a unique"
+                        " set within the rows."
+                    )
+            seen.add(tuple(values))
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def bulk_save(
+    model: type[Model],
+    rows: list[Mapping[str, Any]],
+    instances: list[Model] | None = None,
+) -> list[Model]:
+    """
+    Save rows validated by a bulk serializer in one transaction, creating
+    them with bulk_create, or updating the given instances (in the same
+    order) with bulk_update.
+
+    Many-to-many links are written with one bulk insert per relation, and
+    for updates, stale links removed. As bulk writes don't send model
+    signals, the related dataset caches of every written model are
+    invalidated here.
+
+    Raises a ValidationError if the database rejects the rows, e.g. for
+    colliding with rows written since they were validated.
+    """
+    objs = []
+    links = []
+    update_fields = set()
+    for i, row in enumerate(rows):
+        obj = instances[i] if instances is not None else model()
+        row_links = {}
+        for name, value in row.items():
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None:
+                setattr(obj, name, value)
+            elif model_field.many_to_many:
+                row_links[name] = value
+            else:
+                setattr(
+                    obj,
+                    model_field.attname if model_field.is_relation else name,
+                    value,
+                )
+                update_fields.add(name)
+        objs.append(obj)
+        links.append(row_links)
+    using = router.db_for_write(model)
+    try:
+        with transaction.atomic(using=using):
+            if instances is None:
+                features = connections[using].features
+                if features.can_return_rows_from_bulk_insert:
+                    model.objects.using(using).bulk_create(objs)
+                else:
+                    # IDs are needed for links, and only returned by saving.
+                    for obj in objs:
+                        obj.save(using=using)
+            elif objs:
+                # Fields set on save, e.g. auto_now, aren't otherwise.
+                for model_field in model._meta.concrete_fields:
+                    if getattr(model_field, "auto_now", False):
+                        for obj in objs:
+                            model_field.pre_save(obj, False)
+                        update_fields.add(model_field.name)
+                if update_fields:
+                    model.objects.using(using).bulk_update(
+                        objs,
+                        update_fields,
+                    )
+            save_links(model, objs, links, using)
+    except IntegrityError:
+        raise ValidationError(
+            {
+                "non_field_errors": [
+                    "The rows conflict with existing rows, or each other."
+                ]
+            }
+        )
+    invalidate_model(model)
+    return objs
+
+
+def save_links(
+    model: type[Model],
+    objs: list[Model],
+    links: list[dict[str, list[int]]],
+    using: str,
+) -> None:
+    """
+    Set the many-to-many links of saved objects, per relation, to the given
+    related IDs, adding only missing links and removing only stale ones.
+    """
+    obj_ids = defaultdict(dict)
+    for obj, obj_links in zip(objs, links):
+        for name, ids in obj_links.items():
+            obj_ids[name][obj.pk] = ids
+    for name, related_ids in obj_ids.items():
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(
+            field.m2m_reverse_field_name()
+        ).attname
+        existing = {}
+        for ids_chunk in chunked(list(related_ids.keys()), ID_CHUNK_SIZE):
+            existing.update(
+                {
+                    (source_id, target_id): pk
+                    for pk, source_id, target_id
+                    in through.objects.using(using).filter(
+                        **{f"{source}__in": ids_chunk}
+                    ).values_list("pk", source, target)
+                }
+            )
+        wanted = {
+            (source_id, target_id)
+            for source_id, ids in related_ids.items()
+            for target_id in ids
+        }
+        stale = [pk for pair, pk in existing.items() if pair not in wanted]
+        for ids_chunk in chunked(stale, ID_CHUNK_SIZE):
+            through.objects.using(using).filter(pk__in=ids_chunk).delete()
+        through.objects.using(using).bulk_create(
+            [
+                through(**{source: source_id, target: target_id})
+                for source_id, target_id in sorted(wanted - existing.keys())
+            ]
+        )
+        invalidate_model(through)
+        invalidate_model(field.related_model)
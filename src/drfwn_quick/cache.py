@@ -0,0 +1,307 @@
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from drfwn_quick.settings import (
+    RELATED_CACHE_ALIAS,
+    RELATED_CACHE_MAX_SIZE,
+    RELATED_CACHE_TIMEOUT,
+    RESPONSE_CACHE_ALIAS,
+    RESPONSE_CACHE_MAX_SIZE,
+    RESPONSE_CACHE_TIMEOUT,
+)
+
+
+KEY_PREFIX = "drfwn_quick"
+
+# Every cache instance, so that all can be invalidated by signals.
+_caches = weakref.WeakSet()
+
+
+class GenerationCache:
+    """
+    A cache whose entries are keyed by the generations of the models they
+    are built from.
+
+    Entries are kept in-process, bounded by max_size with least recently
+    used eviction, and expire after timeout seconds. If a Django cache alias
+    is given, that backend is used instead so that entries are shared
+    between processes, bounded by the backend's own configuration.
+
+    Entries are invalidated whenever a row of their models is saved or
+    deleted, or its many-to-many relations change. Each model has a
+    generation that is part of its entries' keys and is bumped on change,
+    which also works across processes for shared backends. Only models that
+    have been keyed have generations, so changes to others cost nothing.
+    """
+
+    def __init__(
+        self,
+        max_size: int = RELATED_CACHE_MAX_SIZE,
+        timeout: int = RELATED_CACHE_TIMEOUT,
+        alias: str | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.timeout = timeout
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        # Labels of models keyed in-process, the only ones to invalidate.
+        self._keyed = set()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    @property
+    def backend(self) -> Any:
+        return caches[self.alias] if self.alias else None
+
+    def stats(self) -> dict[str, int]:
+        """Get hit and miss counts, and the in-process entry count."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Remove all in-process entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_generation(self, model: type[Model]) -> int:
+        return self.get_generations([model])[model._meta.label]
+
+    def get_generations(self, models: list[type[Model]]) -> dict[str, int]:
+        """
+        Get the generations of models, by label, with one lookup, marking
+        them as keyed so that changes to their rows invalidate entries.
+        """
+        labels = [model._meta.label for model in models]
+        if self.backend is not None:
+            keys = {
+                f"{KEY_PREFIX}:generation:{label}": label for label in labels
+            }
+            found = self.backend.get_many(keys.keys())
+            for key in keys.keys() - found.keys():
+                # A model's generation key marks it as keyed for every
+                # process. Keys don't expire, entries would become valid
+                # again otherwise.
+                self.backend.add(key, 0, timeout=None)
+            return {label: found.get(key, 0) for key, label in keys.items()}
+        self._keyed.update(labels)
+        return {label: self._generations.get(label, 0) for label in labels}
+
+    def invalidate(self, model: type[Model]) -> None:
+        """Invalidate every entry for a model, if it has been keyed."""
+        label = model._meta.label
+        if self.backend is not None:
+            try:
+                self.backend.incr(f"{KEY_PREFIX}:generation:{label}")
+            except ValueError:
+                # No generation key, so no process has keyed the model.
+                pass
+            return
+        if label not in self._keyed:
+            return
+        with self._lock:
+            self._generations[label] = self._generations.get(label, 0) + 1
+            # Entries are unreachable now, drop them rather than wait for
+            # eviction.
+            for key in [k for k in self._entries if k[0] == label]:
+                del self._entries[key]
+
+    def _get_many(self, keys: list[tuple]) -> dict[tuple, Any]:
+        if self.backend is not None:
+            backend_keys = {self._backend_key(k): k for k in keys}
+            return {
+                backend_keys[k]: v
+                for k, v in self.backend.get_many(backend_keys.keys()).items()
+            }
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key, None)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def _set_many(self, values: dict[tuple, Any]) -> None:
+        if self.backend is not None:
+            self.backend.set_many(
+                {self._backend_key(k): v for k, v in values.items()},
+                timeout=self.timeout,
+            )
+            return
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _backend_key(self, key: tuple) -> str:
+        return ":".join([KEY_PREFIX, *[str(i) for i in key]])
+
+
+class RelatedDatasetCache(GenerationCache):
+    """
+    A cache of related datasets, keyed by related model and queryset, see
+    GenerationCache.
+    """
+
+    def get_key(self, queryset: QuerySet) -> tuple[str, int, str]:
+        """Get a key for a queryset, unique to its model's generation."""
+        query_hash = hashlib.md5(
+            str(queryset.query).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        return (
+            queryset.model._meta.label,
+            self.get_generation(queryset.model),
+            query_hash,
+        )
+
+    def get_dataset(
+        self,
+        queryset: QuerySet,
+        load: Callable[[], dict[int, dict[str, Any]]],
+    ) -> dict[int, dict[str, Any]]:
+        """Get a queryset's full dataset, loading it with load if missing."""
+        key = self.get_key(queryset)
+        found = self._get_many([key])
+        if key in found:
+            self.hits += 1
+            return found[key]
+        self.misses += 1
+        dataset = load()
+        self._set_many({key: dataset})
+        return dataset
+
+    def get_rows(
+        self,
+        queryset: QuerySet,
+        ids: set[int],
+        load: Callable[[set[int]], dict[int, dict[str, Any]]],
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Get a dataset of a queryset's rows for the given IDs.
+
+        Rows are cached individually. Only IDs that are missing are loaded,
+        with load.
+        """
+        key = self.get_key(queryset)
+        row_keys = {(*key, row_id): row_id for row_id in ids}
+        found = self._get_many(list(row_keys.keys()))
+        dataset = {row_keys[k]: row for k, row in found.items()}
+        missing_ids = set(ids) - dataset.keys()
+        self.hits += len(dataset)
+        self.misses += len(missing_ids)
+        if missing_ids:
+            loaded = load(missing_ids)
+            self._set_many({(*key, i): row for i, row in loaded.items()})
+            dataset.update(loaded)
+        return dataset
+
+
+class ResponseCache(GenerationCache):
+    """
+    A cache of rendered responses, keyed by what they were rendered for and
+    the generations of every model their data is built from, see
+    GenerationCache.
+    """
+
+    def get_key(
+        self,
+        models: list[type[Model]],
+        parts: tuple,
+    ) -> tuple[str, str]:
+        """
+        Get a key for a response to parts, e.g. its URL, unique to its
+        models' generations.
+        """
+        generations = sorted(self.get_generations(models).items())
+        return (
+            "response",
+            hashlib.md5(
+                repr((parts, generations)).encode(),
+                usedforsecurity=False,
+            ).hexdigest(),
+        )
+
+    def get(self, key: tuple) -> Any | None:
+        """Get a cached response, None if missing."""
+        value = self._get_many([key]).get(key, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: tuple, value: Any) -> None:
+        """Cache a response."""
+        self._set_many({key: value})
+
+
+related_dataset_cache = RelatedDatasetCache(alias=RELATED_CACHE_ALIAS)
+response_cache = ResponseCache(
+    max_size=RESPONSE_CACHE_MAX_SIZE,
+    timeout=RESPONSE_CACHE_TIMEOUT,
+    alias=RESPONSE_CACHE_ALIAS,
+)
+
+
+def invalidate_model(model: type[Model]) -> None:
+    """Invalidate a model's entries in every cache."""
+    for cache in list(_caches):
+        cache.invalidate(model)
+
+
+def is_historical(model: type[Model]) -> bool:
+    """
+    Check if a model is a migration's historical model, whose changes are
+    left alone as caches may not be set up yet, e.g. a database cache's
+    table before createcachetable.
+    """
+    return model._meta.apps is not apps
+
+
+@receiver([post_save, post_delete], dispatch_uid="drfwn_quick_change")
+def _invalidate_on_change(sender: type[Model], **kwargs) -> None:
+    if not is_historical(sender):
+        invalidate_model(sender)
+
+
+@receiver(m2m_changed, dispatch_uid="drfwn_quick_m2m_changed")
+def _invalidate_on_m2m_change(
+    sender: type[Model],
+    instance: Model,
+    action: str,
+    model: type[Model],
+    **kwargs,
+) -> None:
+    if action.startswith("post_") and not is_historical(instance.__class__):
+        invalidate_model(sender)
+        invalidate_model(instance.__class__)
+        invalidate_model(model)
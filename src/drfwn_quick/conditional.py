@@ -0,0 +1,140 @@
+import hashlib
+from datetime import datetime
+from typing import Any
+
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    DateTimeField,
+    Max,
+    Model,
+    Sum,
+)
+from django.db.models.functions import Cast
+from django.db.models.query import QuerySet
+
+from drfwn_quick.data import get_to_many_pairs
+
+
+# A queryset quick data is built from, and for through rows, the lookups of
+# their source and target IDs.
+FINGERPRINT_QUERYSETS = list[tuple[QuerySet, tuple[str, str] | None]]
+
+
+def get_modified_field(model: type[Model]) -> str | None:
+    """
+    Get the name of a model's auto_now datetime field, which changes on
+    every save of a row, if it has one.
+    """
+    for field in model._meta.concrete_fields:
+        if isinstance(field, DateTimeField) and field.auto_now:
+            return field.name
+    return None
+
+
+def get_relation_querysets(
+    plan: Any,
+    rel_name: str,
+    ids: QuerySet | None = None,
+) -> FINGERPRINT_QUERYSETS:
+    """
+    Get the querysets a relation's output is built from, its related rows
+    and, for many-to-many relations, the through rows of ids (or all of
+    them), with their source and target lookups.
+    """
+    field = plan.relations[rel_name]
+    querysets = [(plan.related_querysets[rel_name], None)]
+    if field.many_to_many:
+        pairs, source, target = get_to_many_pairs(field)
+        if ids is not None:
+            pairs = pairs.filter(**{f"{source}__in": ids})
+        querysets.append((pairs, (source, target)))
+    return querysets
+
+
+def get_fingerprint_querysets(
+    plan: Any,
+    queryset: QuerySet,
+    depth: int = 1,
+) -> FINGERPRINT_QUERYSETS:
+    """
+    Get the querysets quick data for a queryset's rows is built from,
+    following nested quick serializers to depth levels as expand_dataset
+    does.
+    """
+    querysets = [(queryset, None)]
+    ids = queryset.values("pk")
+    for rel_name in plan.field_names:
+        # Collapsed to-many relations still output their related IDs.
+        if rel_name in plan.expanded_names or rel_name in plan.rel_fields:
+            querysets += get_relation_querysets(plan, rel_name, ids)
+    nested_plans = plan.get_nested_plans()
+    levels = [
+        (nested_plans[rel_name], depth - 1)
+        for rel_name in plan.expanded_names
+        if rel_name in nested_plans
+    ]
+    while levels:
+        nested_plan, nested_depth = levels.pop()
+        if nested_depth < 1:
+            continue
+        for rel_name, next_plan in nested_plan.get_nested_plans().items():
+            # Related rows are expanded from every row, not only these.
+            querysets += get_relation_querysets(nested_plan, rel_name)
+            levels.append((next_plan, nested_depth - 1))
+    return querysets
+
+
+def get_fingerprint(
+    plan: Any,
+    queryset: QuerySet,
+    depth: int = 1,
+    key: tuple = (),
+) -> tuple[str, datetime | None] | None:
+    """
+    Get a fingerprint of the quick data for a queryset's rows, with one
+    aggregate query per queryset it is built from, see
+    get_fingerprint_querysets, rather than by building the data.
+
+    Each queryset is fingerprinted by its row count and largest ID, which
+    change as rows are added or removed, and its model's auto_now field's
+    latest value, which changes as rows are saved. Through rows, which
+    aren't updated in place, are instead fingerprinted by the sums of their
+    source IDs, target IDs and the products of both, so that links moved
+    between rows, or swapped, change it too. The fingerprint is a hash of
+    those, and key, along with the latest auto_now value.
+
+    Returns None if any model but a through model has no auto_now field,
+    as updates to its rows wouldn't change the fingerprint.
+    """
+    values = [repr(key)]
+    modified = []
+    for fingerprint_queryset, link in get_fingerprint_querysets(
+        plan,
+        queryset,
+        depth,
+    ):
+        modified_field = get_modified_field(fingerprint_queryset.model)
+        if modified_field is None and link is None:
+            return None
+        aggregates = {"count": Count("pk"), "max_pk": Max("pk")}
+        if modified_field is not None:
+            aggregates["modified"] = Max(modified_field)
+        if link is not None:
+            source, target = link
+            aggregates["sum"] = Sum(target)
+            aggregates["source_sum"] = Sum(source)
+            # Cast so that products of large IDs don't overflow.
+            aggregates["link_sum"] = Sum(
+                Cast(source, BigIntegerField())
+                * Cast(target, BigIntegerField())
+            )
+        result = fingerprint_queryset.order_by().aggregate(**aggregates)
+        values.append(repr(sorted(result.items())))
+        if result.get("modified", None) is not None:
+            modified.append(result["modified"])
+    etag = hashlib.md5(
+        "\n".join(values).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return etag, max(modified, default=None)
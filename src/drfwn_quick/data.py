@@ -1,13 +1,39 @@
+import asyncio
 import datetime
-from typing import Any
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator
 
+from asgiref.sync import sync_to_async
 from django.db.models.fields import Field
+from django.db.models.fields.reverse_related import ForeignObjectRel
 from django.db.models.query import QuerySet
 
-from drfwn_quick.settings import DATETIME_FORMAT, HANDLE_DATETIMES
+from drfwn_quick.cache import RelatedDatasetCache
+from drfwn_quick.metrics import QuickMetrics, phase
+from drfwn_quick.parallel import run_parallel
+from drfwn_quick.settings import (
+    DATETIME_FORMAT,
+    HANDLE_DATETIMES,
+    ID_CHUNK_SIZE,
+)
 
 
 DATASET = dict[int, dict[str, Any]]
+# Output field name and queryset.values() lookup pairs.
+COLUMNS = tuple[tuple[str, str], ...]
+ROW_BUILDER = Callable[[dict[str, Any], dict[str, DATASET]], dict[str, Any]]
+# Output field name, lookup and kind of field, see get_row_steps.
+ROW_STEPS = tuple[tuple[str, str, str], ...]
+
+FETCH_STRATEGIES = ("join", "prefetch")
+ENGINES = ("rows", "columns", "json")
+
+# Kinds of field handled by row builders.
+_VALUE = "value"
+_DATETIME = "datetime"
+_RELATION = "relation"
+_RELATED_ONE = "related_one"
+_RELATED_IDS = "related_ids"
 
 
 def rel_is_to_many(field: Field) -> bool:
@@ -18,6 +44,228 @@ def rel_is_to_many(field: Field) -> bool:
         return False
 
 
+def chunked(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Yield lists of at most size items from the given iterable."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def collect_related_ids(
+    dataset_rows: list[dict[str, Any]],
+    rel_names: list[str],
+) -> dict[str, set[int]]:
+    """Collect the related IDs referenced by rows, per relation name."""
+    related_ids = {rel_name: set() for rel_name in rel_names}
+    for dataset_row in dataset_rows:
+        for rel_name in rel_names:
+            item = dataset_row.get(rel_name, None)
+            if isinstance(item, list):
+                related_ids[rel_name].update(item)
+            elif item is not None:
+                related_ids[rel_name].add(item)
+    return related_ids
+
+
+def get_to_many_pairs(
+    field: Field | ForeignObjectRel,
+) -> tuple[QuerySet, str, str]:
+    """
+    Get the queryset a to-many relation's ID pairs are queried from, and
+    the lookups of the source and target IDs.
+    """
+    if field.many_to_many:
+        if isinstance(field, ForeignObjectRel):
+            # Reverse side of a many-to-many, the columns are swapped.
+            m2m_field = field.field
+            source = m2m_field.m2m_reverse_field_name()
+            target = m2m_field.m2m_field_name()
+        else:
+            m2m_field = field
+            source = m2m_field.m2m_field_name()
+            target = m2m_field.m2m_reverse_field_name()
+        queryset = m2m_field.remote_field.through.objects.all()
+    else:
+        source = field.field.name
+        target = "id"
+        queryset = field.related_model.objects.all()
+    return queryset, source, target
+
+
+def fetch_to_many_ids(
+    field: Field | ForeignObjectRel,
+    ids: list[int],
+    chunk_size: int = ID_CHUNK_SIZE,
+) -> dict[int, list[int]]:
+    """
+    Fetch the related IDs of a to-many relation for the given IDs.
+
+    Only the relation's ID pairs are queried (from the through table for
+    many-to-many relations, or the related table for reverse foreign keys),
+    then grouped by ID. Avoids the row fan-out of joining every to-many
+    relation in one queryset.values() call.
+    """
+    queryset, source, target = get_to_many_pairs(field)
+    grouped_ids = {}
+    for ids_chunk in chunked(ids, chunk_size):
+        pairs = queryset.filter(
+            **{f"{source}__in": ids_chunk}
+        ).values_list(source, target)
+        for source_id, target_id in pairs:
+            grouped_ids.setdefault(source_id, []).append(target_id)
+    return grouped_ids
+
+
+def load_related_dataset(
+    queryset: QuerySet,
+    ids: set[int] | None = None,
+    chunk_size: int = ID_CHUNK_SIZE,
+    cache: RelatedDatasetCache | None = None,
+    columns: COLUMNS | None = None,
+    datetime_columns: Iterable[str] = (),
+) -> DATASET:
+    """
+    Load a related queryset's values into a dataset keyed by ID.
+
+    If ids are given, only those rows are loaded, in chunks of chunk_size to
+    stay under database parameter limits. Otherwise, every row is loaded.
+
+    If a cache is given, rows are looked up in it first and only what is
+    missing is loaded.
+
+    If columns are given, only those are loaded, named by their output
+    names, rather than every column of the related model. The "id" column is
+    always loaded.
+
+    Columns in datetime_columns are formatted as rows are loaded (and before
+    they are cached), so that rows are in their output form once, however
+    many rows reference them.
+    """
+    lookups = get_dataset_lookups(columns)
+    if cache is not None:
+        # The cache key needs to differ for differing columns.
+        key_queryset = queryset.values(*lookups) if lookups else queryset
+        if ids is None:
+            return cache.get_dataset(
+                key_queryset,
+                lambda: load_related_dataset(
+                    queryset,
+                    chunk_size=chunk_size,
+                    columns=columns,
+                    datetime_columns=datetime_columns,
+                ),
+            )
+        return cache.get_rows(
+            key_queryset,
+            ids,
+            lambda missing_ids: load_related_dataset(
+                queryset,
+                missing_ids,
+                chunk_size,
+                columns=columns,
+                datetime_columns=datetime_columns,
+            ),
+        )
+    if ids is None:
+        rows = queryset.values(*lookups)
+    else:
+        rows = (
+            row
+            for ids_chunk in chunked(sorted(ids), chunk_size)
+            for row in queryset.filter(id__in=ids_chunk).values(*lookups)
+        )
+    return build_dataset(rows, columns, datetime_columns)
+
+
+def get_dataset_lookups(columns: COLUMNS | None = None) -> list[str]:
+    """
+    Get the lookups a related dataset is loaded with by queryset.values(),
+    every column if columns aren't given.
+    """
+    lookups = list(dict.fromkeys([lookup for _, lookup in columns or ()]))
+    if columns and "id" not in lookups:
+        lookups.append("id")
+    return lookups
+
+
+def build_dataset(
+    rows: Iterable[dict[str, Any]],
+    columns: COLUMNS | None = None,
+    datetime_columns: Iterable[str] = (),
+) -> DATASET:
+    """
+    Build a dataset from related rows loaded with queryset.values(), see
+    load_related_dataset.
+    """
+    datetime_columns = tuple(datetime_columns)
+    if datetime_columns:
+        rows = (format_datetime_columns(row, datetime_columns) for row in rows)
+    if columns and any(name != lookup for name, lookup in columns):
+        return {
+            row["id"]: {
+                "id": row["id"],
+                **{name: row[lookup] for name, lookup in columns},
+            }
+            for row in rows
+        }
+    return {row["id"]: row for row in rows}
+
+
+def get_related_loaders(
+    plan: Any,
+    related_cache: RelatedDatasetCache | None = None,
+    metrics: QuickMetrics | None = None,
+) -> dict[str, Callable[[], DATASET]]:
+    """
+    Get functions that each load one of a plan's expanded relations'
+    datasets in full, by relation name, so they can be run in parallel.
+
+    If metrics are given, loads are timed as the "related" phase and their
+    rows counted.
+    """
+    def make_loader(rel_name: str) -> Callable[[], DATASET]:
+        def load() -> DATASET:
+            with phase(metrics, "related"):
+                dataset = load_related_dataset(
+                    plan.related_querysets[rel_name],
+                    cache=related_cache,
+                    columns=plan.related_columns.get(rel_name, None),
+                    datetime_columns=plan.get_related_datetime_columns(
+                        rel_name
+                    ),
+                )
+            if metrics is not None:
+                metrics.count_related_rows({rel_name: dataset})
+            return dataset
+        return load
+
+    return {
+        rel_name: make_loader(rel_name) for rel_name in plan.expanded_names
+    }
+
+
+def format_datetime_columns(
+    row: dict[str, Any],
+    columns: tuple[str, ...],
+) -> dict[str, Any]:
+    """Get a copy of a row with its datetime columns formatted."""
+    if not columns:
+        return row
+    return {
+        **row,
+        **{
+            column: row[column].strftime(DATETIME_FORMAT)
+            for column in columns
+            if row.get(column) is not None
+        },
+    }
+
+
 def prepare_row(
     dataset_row: dict[str, Any],
     field_names: list[str],
@@ -39,18 +287,20 @@ def prepare_row(
         if item is None:
             value = None if field_name not in rel_names else []
         elif field_name in rel_names:
-            related_row = datasets[field_name][item]
-            if not HANDLE_DATETIMES:
-                value = related_row
-            else:
-                value = {
-                    k: v.strftime(DATETIME_FORMAT)
-                    if isinstance(v, datetime.datetime)
-                    else v
-                    for k, v in related_row.items()
-                }
+            # Items are lists of IDs if relations were fetched separately.
+            item_ids = item if isinstance(item, list) else [item]
             # Needs to be list for later concatenation, if required.
-            value = [value]
+            value = []
+            for item_id in item_ids:
+                related_row = datasets[field_name][item_id]
+                if HANDLE_DATETIMES:
+                    related_row = {
+                        k: v.strftime(DATETIME_FORMAT)
+                        if isinstance(v, datetime.datetime)
+                        else v
+                        for k, v in related_row.items()
+                    }
+                value.append(related_row)
         elif HANDLE_DATETIMES and isinstance(item, datetime.datetime):
             value = item.strftime(DATETIME_FORMAT)
         else:
@@ -59,39 +309,1151 @@ def prepare_row(
     return row
 
 
+def get_row_steps(
+    field_names: tuple[str, ...],
+    rel_names: tuple[str, ...],
+    datetime_columns: frozenset[str] = frozenset(),
+    to_one_names: tuple[str, ...] = (),
+    columns: COLUMNS | None = None,
+    id_names: tuple[str, ...] = (),
+) -> ROW_STEPS:
+    """
+    Get how each field of a row is output, as (output name, lookup, kind)
+    in order. See make_row_builder for the arguments.
+    """
+    if columns is None:
+        columns = tuple((field_name, field_name) for field_name in field_names)
+    steps = []
+    for name, field_name in columns:
+        if field_name in id_names:
+            steps.append((name, field_name, _RELATED_IDS))
+        elif field_name in rel_names:
+            steps.append((name, field_name, _RELATION))
+        elif field_name in to_one_names:
+            steps.append((name, field_name, _RELATED_ONE))
+        elif HANDLE_DATETIMES and field_name in datetime_columns:
+            steps.append((name, field_name, _DATETIME))
+        else:
+            steps.append((name, field_name, _VALUE))
+    return tuple(steps)
+
+
+def make_row_builder(
+    field_names: tuple[str, ...],
+    rel_names: tuple[str, ...],
+    datetime_columns: frozenset[str] = frozenset(),
+    to_one_names: tuple[str, ...] = (),
+    columns: COLUMNS | None = None,
+    id_names: tuple[str, ...] = (),
+) -> ROW_BUILDER:
+    """
+    Make a function equivalent to prepare_row for fixed fields.
+
+    How each field is handled is decided once, here, from the known relation
+    and datetime columns, rather than per row with lookups and isinstance
+    checks.
+
+    Unlike prepare_row, to-one relations in to_one_names are also expanded,
+    to a single related row rather than a list. Related rows are used as
+    they are, shared between rows, so their datetime columns need to be
+    formatted when loaded, see load_related_dataset.
+
+    If columns are given, each lookup in field_names is output with its
+    column's name, otherwise field names are output as they are.
+
+    To-many relations in id_names aren't expanded, their related IDs are
+    output as they are.
+    """
+    steps = get_row_steps(
+        field_names,
+        rel_names,
+        datetime_columns,
+        to_one_names,
+        columns,
+        id_names,
+    )
+
+    def build_row(
+        dataset_row: dict[str, Any],
+        datasets: dict[str, DATASET],
+    ) -> dict[str, Any]:
+        row = {"id": dataset_row["id"]}
+        get = dataset_row.get
+        for name, field_name, kind in steps:
+            item = get(field_name, None)
+            if kind is _VALUE:
+                row[name] = item
+            elif item is None:
+                # Relations are to-many fields, empty values need to be lists.
+                row[name] = (
+                    [] if kind is _RELATION or kind is _RELATED_IDS else None
+                )
+            elif kind is _DATETIME:
+                row[name] = item.strftime(DATETIME_FORMAT)
+            elif kind is _RELATED_ONE:
+                row[name] = datasets[field_name][item]
+            elif kind is _RELATED_IDS:
+                row[name] = item if isinstance(item, list) else [item]
+            else:
+                dataset = datasets[field_name]
+                if isinstance(item, list):
+                    row[name] = [dataset[item_id] for item_id in item]
+                else:
+                    row[name] = [dataset[item]]
+        return row
+
+    return build_row
+
+
+def fetches_row_related_ids(field: Field | ForeignObjectRel) -> bool:
+    """Check if a relation's related IDs are only on the related rows."""
+    return rel_is_to_many(field) or isinstance(field, ForeignObjectRel)
+
+
+def get_row_related_ids(
+    dataset: DATASET,
+    plan: Any,
+    rel_name: str,
+    fetched_ids: dict[int, list[int]] | None = None,
+) -> dict[int, Any]:
+    """
+    Get the related ID(s) of a dataset's rows for a relation, by row ID.
+
+    fetched_ids are the relation's IDs fetched with fetch_to_many_ids, if
+    fetches_row_related_ids, otherwise they are read from the rows.
+    """
+    field = plan.relations[rel_name]
+    if rel_is_to_many(field):
+        return fetched_ids
+    elif isinstance(field, ForeignObjectRel):
+        # Reverse one-to-one, the ID is only on the related row.
+        return {
+            row_id: related_ids[0]
+            for row_id, related_ids in fetched_ids.items()
+        }
+    # Named by the relation if loaded with the serializer's columns.
+    key = plan.output_names.get(rel_name, field.attname)
+    return {row_id: row[key] for row_id, row in dataset.items()}
+
+
+def collect_nested_ids(row_related_ids: dict[int, Any]) -> set[int]:
+    """Collect the related IDs of get_row_related_ids into one set."""
+    nested_ids = set()
+    for related_ids in row_related_ids.values():
+        if isinstance(related_ids, list):
+            nested_ids.update(related_ids)
+        elif related_ids is not None:
+            nested_ids.add(related_ids)
+    return nested_ids
+
+
+def merge_nested_datasets(
+    dataset: DATASET,
+    plan: Any,
+    row_related_ids: dict[str, dict[int, Any]],
+    nested_datasets: dict[str, DATASET],
+) -> DATASET:
+    """
+    Get a copy of a dataset with its relations replaced by the related rows
+    of nested_datasets, see expand_dataset.
+    """
+    output_names = plan.output_names
+    expanded = {}
+    for row_id, row in dataset.items():
+        row = dict(row)
+        for rel_name, nested_dataset in nested_datasets.items():
+            field = plan.relations[rel_name]
+            related_ids = row_related_ids[rel_name].get(row_id, None)
+            name = output_names.get(rel_name, rel_name)
+            if rel_is_to_many(field):
+                row[name] = [nested_dataset[i] for i in related_ids or []]
+            else:
+                # Replaces the relation's ID column, e.g. "region_id".
+                row.pop(getattr(field, "attname", rel_name), None)
+                row[name] = nested_dataset.get(related_ids, None)
+        expanded[row_id] = row
+    return expanded
+
+
+def expand_dataset(
+    dataset: DATASET,
+    plan: Any,
+    depth: int,
+    related_cache: RelatedDatasetCache | None = None,
+) -> DATASET:
+    """
+    Expand the relations of a related dataset's rows, to depth levels.
+
+    Only relations that the plan's serializer declares a nested quick
+    serializer for are expanded, following those serializers' own plans.
+    Each level is resolved with one batched query per relation, not per row.
+    Rows are copied rather than modified, as datasets may be cached.
+    """
+    nested_plans = plan.get_nested_plans()
+    if depth < 1 or not dataset or not nested_plans:
+        return dataset
+    ids = list(dataset.keys())
+    # Relation name to the related ID(s) per row ID.
+    row_related_ids = {
+        rel_name: get_row_related_ids(
+            dataset,
+            plan,
+            rel_name,
+            fetch_to_many_ids(plan.relations[rel_name], ids)
+            if fetches_row_related_ids(plan.relations[rel_name]) else None,
+        )
+        for rel_name in nested_plans.keys()
+    }
+    nested_datasets = {
+        rel_name: expand_dataset(
+            load_related_dataset(
+                plan.related_querysets[rel_name],
+                collect_nested_ids(row_related_ids[rel_name]),
+                cache=related_cache,
+                columns=plan.related_columns.get(rel_name, None),
+                datetime_columns=plan.get_related_datetime_columns(rel_name),
+            ),
+            nested_plan,
+            depth - 1,
+            related_cache,
+        )
+        for rel_name, nested_plan in nested_plans.items()
+    }
+    return merge_nested_datasets(
+        dataset,
+        plan,
+        row_related_ids,
+        nested_datasets,
+    )
+
+
+def get_row_handling(
+    field_names: list[str],
+    model: Any,
+    plan: Any | None = None,
+) -> tuple[
+    dict[str, Field | ForeignObjectRel],
+    list[str],
+    dict[str, COLUMNS],
+    ROW_BUILDER,
+]:
+    """
+    Get how rows of a model are handled, from its plan if given.
+
+    Returns the to-many relation fields, the relations that are expanded,
+    related rows' columns, and a function to build each row.
+    """
+    if plan is not None:
+        return (
+            plan.rel_fields,
+            list(plan.expanded_names),
+            plan.related_columns,
+            plan.build_row,
+        )
+    rel_fields = {
+        f.name: f for f in model._meta.get_fields() if rel_is_to_many(f)
+    }
+    rel_names = list(rel_fields.keys())
+
+    def build_row(
+        dataset_row: dict[str, Any],
+        datasets: dict[str, DATASET],
+    ) -> dict[str, Any]:
+        return prepare_row(dataset_row, field_names, rel_names, datasets)
+
+    return (
+        rel_fields,
+        [field_name for field_name in field_names if field_name in rel_names],
+        {},
+        build_row,
+    )
+
+
+def resolve_related_datasets(
+    related_ids: dict[str, set[int]],
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    related_columns: dict[str, COLUMNS] | None = None,
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+    workers: int = 1,
+) -> dict[str, DATASET]:
+    """
+    Get the datasets to resolve rows' relations with: related_datasets plus,
+    if related_querysets are given, the rows in related_ids loaded from
+    them, on up to workers threads. If a plan is given, related rows are
+    expanded to depth levels.
+
+    See format_queryset_data for the other arguments.
+    """
+    if related_querysets:
+        related_columns = related_columns or {}
+        loaded = run_parallel(
+            [
+                partial(
+                    load_related_dataset,
+                    related_querysets[rel_name],
+                    ids,
+                    cache=related_cache,
+                    columns=related_columns.get(rel_name, None),
+                    datetime_columns=(
+                        plan.get_related_datetime_columns(rel_name)
+                        if plan is not None else ()
+                    ),
+                )
+                for rel_name, ids in related_ids.items()
+            ],
+            workers,
+            metrics,
+        )
+        referenced_datasets = dict(zip(related_ids.keys(), loaded))
+        if metrics is not None:
+            metrics.count_related_rows(referenced_datasets)
+        related_datasets = {**related_datasets, **referenced_datasets}
+    if plan is not None and depth > 1:
+        nested_plans = plan.get_nested_plans()
+        related_datasets = {
+            rel_name: expand_dataset(
+                dataset,
+                nested_plans[rel_name],
+                depth - 1,
+                related_cache,
+            )
+            if rel_name in nested_plans else dataset
+            for rel_name, dataset in related_datasets.items()
+        }
+    return related_datasets
+
+
+def add_to_many_ids(
+    dataset_rows: list[dict[str, Any]],
+    to_many_fields: dict[str, Field | ForeignObjectRel],
+) -> None:
+    """Add the lists of related IDs of to-many relations to rows, in place."""
+    ids = [dataset_row["id"] for dataset_row in dataset_rows]
+    for rel_name, field in to_many_fields.items():
+        grouped_ids = fetch_to_many_ids(field, ids)
+        for dataset_row in dataset_rows:
+            dataset_row[rel_name] = grouped_ids.get(dataset_row["id"], [])
+
+
+def format_dataset_rows(
+    dataset_rows: list[dict[str, Any]],
+    field_names: list[str],
+    model: Any,
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+    workers: int = 1,
+) -> list[dict[str, Any]]:
+    """
+    Format rows fetched with queryset.values(), replacing relation IDs with
+    real values. Rows repeated by to-many joins are merged, without
+    duplicating related rows when several to-many relations are joined.
+
+    See format_queryset_data for the other arguments.
+    """
+    (
+        rel_fields,
+        expanded_names,
+        related_columns,
+        build_row,
+    ) = get_row_handling(field_names, model, plan)
+    with phase(metrics, "related"):
+        # Only relations that are expanded need their rows loaded.
+        related_ids = collect_related_ids(
+            dataset_rows,
+            [
+                rel_name for rel_name in expanded_names
+                if rel_name in related_querysets
+            ],
+        ) if related_querysets else {}
+        related_datasets = resolve_related_datasets(
+            related_ids,
+            related_datasets,
+            related_querysets,
+            related_columns,
+            plan,
+            related_cache,
+            depth,
+            metrics,
+            workers,
+        )
+    if metrics is not None:
+        metrics.base_rows += len(dataset_rows)
+    with phase(metrics, "format"):
+        # Rows repeated by to-many joins are grouped by ID, collecting their
+        # related IDs in order and without duplicates, then built once.
+        to_many_names = [
+            field_name for field_name in field_names
+            if field_name in rel_fields
+        ]
+        grouped_rows = {}
+        grouped_ids = {}
+        for dataset_row in dataset_rows:
+            row_id = dataset_row["id"]
+            row_ids = grouped_ids.get(row_id, None)
+            if row_ids is None:
+                grouped_rows[row_id] = dataset_row
+                row_ids = grouped_ids[row_id] = {
+                    rel_name: {} for rel_name in to_many_names
+                }
+            for rel_name in to_many_names:
+                item = dataset_row.get(rel_name, None)
+                # Items are lists of IDs if relations were fetched
+                # separately. Dicts are used as ordered sets.
+                if isinstance(item, list):
+                    row_ids[rel_name].update(dict.fromkeys(item))
+                elif item is not None:
+                    row_ids[rel_name][item] = None
+        formatted_rows = [
+            build_row(
+                {
+                    **dataset_row,
+                    **{
+                        rel_name: list(ids)
+                        for rel_name, ids in grouped_ids[row_id].items()
+                    },
+                },
+                related_datasets,
+            )
+            for row_id, dataset_row in grouped_rows.items()
+        ]
+    if metrics is not None:
+        metrics.rows += len(formatted_rows)
+    return formatted_rows
+
+
+def get_value_lookups(
+    plan: Any,
+) -> tuple[list[str], dict[str, Field | ForeignObjectRel]]:
+    """
+    Get the lookups a plan's rows are fetched with by queryset.values_list(),
+    ending with "id", and the to-many relations that are fetched separately.
+    """
+    to_many_fields = {
+        field_name: plan.rel_fields[field_name]
+        for field_name in plan.field_names
+        if field_name in plan.rel_fields
+    }
+    lookups = [
+        field_name for field_name in plan.field_names
+        if field_name not in to_many_fields and field_name != "id"
+    ]
+    return [*lookups, "id"], to_many_fields
+
+
+def validate_fetch_strategy(fetch_strategy: str) -> None:
+    if fetch_strategy not in FETCH_STRATEGIES:
+        raise ValueError(
+            f"Invalid fetch strategy {fetch_strategy}, expected one of"
+            f" {FETCH_STRATEGIES}."
+        )
+
+
+def validate_engine(engine: str, plan: Any | None = None) -> None:
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Invalid engine {engine}, expected one of {ENGINES}."
+        )
+    if engine in ("columns", "json") and plan is None:
+        raise ValueError(f"The {engine} engine requires a plan.")
+
+
+def fetch_value_rows_to_many_ids(
+    value_rows: list[tuple],
+    to_many_fields: dict[str, Field | ForeignObjectRel],
+) -> dict[str, dict[int, list[int]]]:
+    """
+    Fetch the related IDs of to-many relations for rows fetched with
+    queryset.values_list(), whose last value is "id".
+    """
+    ids = [row[-1] for row in value_rows]
+    return {
+        rel_name: fetch_to_many_ids(field, ids)
+        for rel_name, field in to_many_fields.items()
+    }
+
+
+def collect_column_related_ids(
+    column_values: dict[str, tuple],
+    to_many_ids: dict[str, dict[int, list[int]]],
+    rel_names: list[str],
+) -> dict[str, set[int]]:
+    """
+    Collect the related IDs referenced by rows fetched with
+    queryset.values_list(), by column, per relation name.
+    """
+    related_ids = {}
+    for rel_name in rel_names:
+        if rel_name in to_many_ids:
+            related_ids[rel_name] = {
+                related_id
+                for row_ids in to_many_ids[rel_name].values()
+                for related_id in row_ids
+            }
+        else:
+            related_ids[rel_name] = set(
+                column_values.get(rel_name, ())
+            ) - {None}
+    return related_ids
+
+
+def format_value_rows(
+    value_rows: list[tuple],
+    lookups: list[str],
+    to_many_ids: dict[str, dict[int, list[int]]],
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+    workers: int = 1,
+) -> list[dict[str, Any]]:
+    """
+    Format rows fetched with queryset.values_list(*lookups) column by column,
+    rather than row by row, then build each row in one pass.
+
+    Each column is handled with a single comprehension, with no per-field
+    checks per row. to_many_ids are the related IDs of each row by to-many
+    relation, see fetch_to_many_ids. A plan is required.
+
+    See format_queryset_data for the other arguments.
+    """
+    if metrics is not None:
+        metrics.base_rows += len(value_rows)
+    # Rows repeated by joins from filters are dropped, the last is "id".
+    value_rows = list({row[-1]: row for row in value_rows}.values())
+    column_values = dict(zip(lookups, zip(*value_rows)))
+    ids = column_values.get("id", ())
+    with phase(metrics, "related"):
+        related_ids = collect_column_related_ids(
+            column_values,
+            to_many_ids,
+            [
+                rel_name for rel_name in plan.expanded_names
+                if rel_name in (related_querysets or {})
+            ],
+        )
+        related_datasets = resolve_related_datasets(
+            related_ids,
+            related_datasets,
+            related_querysets,
+            plan.related_columns,
+            plan,
+            related_cache,
+            depth,
+            metrics,
+            workers,
+        )
+    with phase(metrics, "format"):
+        names = ["id"]
+        output_columns = [ids]
+        for name, lookup, kind in plan.row_steps:
+            if kind is _RELATION:
+                dataset = related_datasets[lookup]
+                row_related_ids = to_many_ids[lookup]
+                values = [
+                    [dataset[i] for i in row_related_ids.get(row_id, ())]
+                    for row_id in ids
+                ]
+            elif kind is _RELATED_IDS:
+                row_related_ids = to_many_ids[lookup]
+                values = [
+                    list(row_related_ids.get(row_id, ())) for row_id in ids
+                ]
+            else:
+                column = column_values.get(lookup, ())
+                if kind is _VALUE:
+                    values = column
+                elif kind is _DATETIME:
+                    values = [
+                        None if v is None else v.strftime(DATETIME_FORMAT)
+                        for v in column
+                    ]
+                else:
+                    dataset = related_datasets[lookup]
+                    values = [None if v is None else dataset[v] for v in column]
+            names.append(name)
+            output_columns.append(values)
+        formatted_rows = [
+            dict(zip(names, values)) for values in zip(*output_columns)
+        ]
+    if metrics is not None:
+        metrics.rows += len(formatted_rows)
+    return formatted_rows
+
+
+def get_engine_json_relations(
+    engine: str,
+    queryset: QuerySet,
+    plan: Any | None = None,
+    depth: int = 1,
+) -> dict[str, Any] | None:
+    """
+    Get how relations are embedded if the "json" engine is used and can be
+    for the queryset, see drfwn_quick.jsonagg.get_json_relations. None
+    otherwise, the "rows" engine is used instead.
+    """
+    if engine != "json":
+        return None
+    # Avoids a circular import, the jsonagg module imports this one.
+    from drfwn_quick.jsonagg import get_json_relations
+    return get_json_relations(queryset, plan, depth)
+
+
+def format_json_rows(
+    dataset_rows: list[dict[str, Any]],
+    field_names: list[str],
+    model: Any,
+    related_datasets: dict[str, DATASET],
+    plan: Any,
+    metrics: QuickMetrics | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Format rows unpacked from the "json" engine's rows, whose related rows
+    are all in related_datasets, without loading anything.
+    """
+    if metrics is not None:
+        metrics.count_related_rows(
+            {
+                rel_name: related_datasets[rel_name]
+                for rel_name in plan.expanded_names
+            }
+        )
+    return format_dataset_rows(
+        dataset_rows,
+        field_names,
+        model,
+        related_datasets,
+        plan=plan,
+        metrics=metrics,
+    )
+
+
 def format_queryset_data(
     field_names: list[str],
     queryset: QuerySet,
     related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    fetch_strategy: str = "join",
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+    engine: str = "rows",
+    related_loaders: dict[str, Callable[[], DATASET]] | None = None,
+    workers: int = 1,
 ) -> list[dict[str, Any]]:
     """
     Ensure a queryset's data is formatted correctly, replacing relation IDs
     with real values.
+
+    If related_querysets is given, datasets for those relations are loaded
+    with only the rows referenced by the queryset's rows and added to
+    related_datasets, rather than expecting them to be loaded in full.
+
+    The fetch_strategy controls how to-many relations are fetched. "join"
+    fetches everything in one queryset.values() call, yielding a row per
+    combination of related IDs that is merged afterwards. "prefetch" fetches
+    each row once, then each to-many relation's IDs with a narrow query.
+
+    If the serializer's plan (see drfwn_quick.plan.QuickPlan) is given, its
+    precompiled metadata is used rather than worked out here. It also allows
+    related rows to be expanded in turn, to depth levels in total.
+
+    If a related_cache is given, referenced rows are loaded through it.
+
+    If metrics are given, phase timings and row counts are recorded to them.
+
+    The engine controls how rows are assembled. "rows" builds each row in
+    turn. "columns" fetches rows with queryset.values_list() and formats
+    them column by column, which is faster for large querysets, see
+    format_value_rows. It requires a plan, and always fetches to-many
+    relations as with the "prefetch" fetch strategy. "json" has the
+    database embed each row's relations as JSON, so related rows are
+    fetched with the rows, one row each, see drfwn_quick.jsonagg. It
+    requires a plan, and where the database or relations don't support it,
+    "rows" is used instead.
+
+    If related_loaders are given (see get_related_loaders), their datasets
+    are loaded and added to related_datasets. They are run along with the
+    queryset's own query, and any referenced rows' queries after it, on up
+    to workers threads, see drfwn_quick.parallel.run_parallel.
     """
-    rel_names = [
-        f.name for f in queryset.model._meta.get_fields() if rel_is_to_many(f)
-    ]
-    # Much faster to use queryset.values() instead of queryset iteration.
-    dataset_rows = list(queryset.values(*field_names, "id"))
-    formatted_rows = {}
-    ids_to_merge = set()
-    for dataset_row in dataset_rows:
-        row_id = dataset_row["id"]
-        formatted_row = prepare_row(
-            dataset_row,
+    validate_fetch_strategy(fetch_strategy)
+    validate_engine(engine, plan)
+    related_loaders = related_loaders or {}
+    json_relations = get_engine_json_relations(engine, queryset, plan, depth)
+    if json_relations is not None:
+        from drfwn_quick.jsonagg import fetch_json_rows
+
+        def fetch_rows() -> tuple[list[dict[str, Any]], dict[str, DATASET]]:
+            with phase(metrics, "base"):
+                return fetch_json_rows(queryset, plan, json_relations)
+        # Related rows are embedded, nothing is loaded separately.
+        related_loaders = {}
+    elif engine == "columns":
+        lookups, to_many_fields = get_value_lookups(plan)
+
+        def fetch_rows() -> tuple[list[tuple], dict[str, dict]]:
+            with phase(metrics, "base"):
+                value_rows = list(queryset.values_list(*lookups))
+                return value_rows, fetch_value_rows_to_many_ids(
+                    value_rows,
+                    to_many_fields,
+                )
+    else:
+        def fetch_rows() -> list[dict[str, Any]]:
+            with phase(metrics, "base"):
+                if fetch_strategy == "join":
+                    # Much faster to use queryset.values() instead of
+                    # queryset iteration.
+                    return list(queryset.values(*field_names, "id"))
+                rel_fields = get_row_handling(
+                    field_names,
+                    queryset.model,
+                    plan,
+                )[0]
+                to_many_fields = {
+                    field_name: rel_fields[field_name]
+                    for field_name in field_names
+                    if field_name in rel_fields
+                }
+                dataset_rows = list(
+                    queryset.values(
+                        *[
+                            field_name for field_name in field_names
+                            if field_name not in to_many_fields
+                        ],
+                        "id",
+                    )
+                )
+                add_to_many_ids(dataset_rows, to_many_fields)
+                return dataset_rows
+    # Related datasets don't depend on the queryset's rows, so are loaded
+    # along with them.
+    *loaded, fetched = run_parallel(
+        [*related_loaders.values(), fetch_rows],
+        workers,
+        metrics,
+    )
+    related_datasets = {
+        **related_datasets,
+        **dict(zip(related_loaders.keys(), loaded)),
+    }
+    if json_relations is not None:
+        dataset_rows, embedded_datasets = fetched
+        return format_json_rows(
+            dataset_rows,
+            field_names,
+            queryset.model,
+            {**related_datasets, **embedded_datasets},
+            plan,
+            metrics,
+        )
+    if engine == "columns":
+        value_rows, to_many_ids = fetched
+        return format_value_rows(
+            value_rows,
+            lookups,
+            to_many_ids,
+            related_datasets,
+            related_querysets,
+            plan,
+            related_cache,
+            depth,
+            metrics,
+            workers,
+        )
+    return format_dataset_rows(
+        fetched,
+        field_names,
+        queryset.model,
+        related_datasets,
+        related_querysets,
+        plan,
+        related_cache,
+        depth,
+        metrics,
+        workers,
+    )
+
+
+def iter_queryset_data(
+    field_names: list[str],
+    queryset: QuerySet,
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    chunk_size: int = ID_CHUNK_SIZE,
+    engine: str = "rows",
+    workers: int = 1,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield a queryset's formatted rows, fetching and formatting them in
+    chunks of chunk_size rows so that memory use doesn't grow with the size
+    of the queryset.
+
+    Rows are iterated with queryset.iterator(), to-many relations are always
+    fetched per chunk, as with the "prefetch" fetch strategy. See
+    format_queryset_data for the other arguments.
+    """
+    validate_engine(engine, plan)
+    json_relations = get_engine_json_relations(engine, queryset, plan, depth)
+    if json_relations is not None:
+        from drfwn_quick.jsonagg import get_json_queryset, unpack_json_rows
+        rows = get_json_queryset(
+            queryset,
+            plan,
+            json_relations,
+        ).iterator(chunk_size=chunk_size)
+        for chunk in chunked(rows, chunk_size):
+            dataset_rows, embedded_datasets = unpack_json_rows(
+                chunk,
+                json_relations,
+            )
+            yield from format_json_rows(
+                dataset_rows,
+                field_names,
+                queryset.model,
+                {**related_datasets, **embedded_datasets},
+                plan,
+            )
+        return
+    if engine == "columns":
+        lookups, to_many_fields = get_value_lookups(plan)
+        rows = queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+        for value_rows in chunked(rows, chunk_size):
+            yield from format_value_rows(
+                value_rows,
+                lookups,
+                fetch_value_rows_to_many_ids(value_rows, to_many_fields),
+                related_datasets,
+                related_querysets,
+                plan,
+                related_cache,
+                depth,
+                workers=workers,
+            )
+        return
+    rel_fields = get_row_handling(field_names, queryset.model, plan)[0]
+    to_many_fields = {
+        field_name: rel_fields[field_name] for field_name in field_names
+        if field_name in rel_fields
+    }
+    rows = queryset.values(
+        *[
+            field_name for field_name in field_names
+            if field_name not in to_many_fields
+        ],
+        "id",
+    ).iterator(chunk_size=chunk_size)
+    for dataset_rows in chunked(rows, chunk_size):
+        add_to_many_ids(dataset_rows, to_many_fields)
+        yield from format_dataset_rows(
+            dataset_rows,
             field_names,
-            rel_names,
+            queryset.model,
             related_datasets,
+            related_querysets,
+            plan,
+            related_cache,
+            depth,
+            workers=workers,
+        )
+
+
+async def aload_related_dataset(
+    queryset: QuerySet,
+    ids: set[int] | None = None,
+    chunk_size: int = ID_CHUNK_SIZE,
+    cache: RelatedDatasetCache | None = None,
+    columns: COLUMNS | None = None,
+    datetime_columns: Iterable[str] = (),
+) -> DATASET:
+    """
+    As load_related_dataset, fetching rows with async queryset iteration.
+
+    Loads through a cache run load_related_dataset in a thread instead, as
+    the cache's lookups are synchronous.
+    """
+    if cache is not None:
+        return await sync_to_async(load_related_dataset)(
+            queryset,
+            ids,
+            chunk_size,
+            cache,
+            columns,
+            datetime_columns,
+        )
+    lookups = get_dataset_lookups(columns)
+    if ids is None:
+        rows = [row async for row in queryset.values(*lookups)]
+    else:
+        rows = []
+        for ids_chunk in chunked(sorted(ids), chunk_size):
+            rows += [
+                row async for row in
+                queryset.filter(id__in=ids_chunk).values(*lookups)
+            ]
+    return build_dataset(rows, columns, datetime_columns)
+
+
+async def afetch_to_many_ids(
+    field: Field | ForeignObjectRel,
+    ids: list[int],
+    chunk_size: int = ID_CHUNK_SIZE,
+) -> dict[int, list[int]]:
+    """As fetch_to_many_ids, fetching with async queryset iteration."""
+    queryset, source, target = get_to_many_pairs(field)
+    grouped_ids = {}
+    for ids_chunk in chunked(ids, chunk_size):
+        pairs = queryset.filter(
+            **{f"{source}__in": ids_chunk}
+        ).values_list(source, target)
+        async for source_id, target_id in pairs:
+            grouped_ids.setdefault(source_id, []).append(target_id)
+    return grouped_ids
+
+
+async def afetch_all_to_many_ids(
+    ids: list[int],
+    to_many_fields: dict[str, Field | ForeignObjectRel],
+) -> dict[str, dict[int, list[int]]]:
+    """Fetch the related IDs of each to-many relation, by relation name."""
+    grouped_ids = await asyncio.gather(
+        *[afetch_to_many_ids(field, ids) for field in to_many_fields.values()]
+    )
+    return dict(zip(to_many_fields.keys(), grouped_ids))
+
+
+async def aexpand_dataset(
+    dataset: DATASET,
+    plan: Any,
+    depth: int,
+    related_cache: RelatedDatasetCache | None = None,
+) -> DATASET:
+    """As expand_dataset, fetching with async queryset iteration."""
+    nested_plans = plan.get_nested_plans()
+    if depth < 1 or not dataset or not nested_plans:
+        return dataset
+    ids = list(dataset.keys())
+    row_related_ids = {}
+    for rel_name in nested_plans.keys():
+        field = plan.relations[rel_name]
+        row_related_ids[rel_name] = get_row_related_ids(
+            dataset,
+            plan,
+            rel_name,
+            await afetch_to_many_ids(field, ids)
+            if fetches_row_related_ids(field) else None,
+        )
+    nested_datasets = {}
+    for rel_name, nested_plan in nested_plans.items():
+        nested_datasets[rel_name] = await aexpand_dataset(
+            await aload_related_dataset(
+                plan.related_querysets[rel_name],
+                collect_nested_ids(row_related_ids[rel_name]),
+                cache=related_cache,
+                columns=plan.related_columns.get(rel_name, None),
+                datetime_columns=plan.get_related_datetime_columns(rel_name),
+            ),
+            nested_plan,
+            depth - 1,
+            related_cache,
+        )
+    return merge_nested_datasets(
+        dataset,
+        plan,
+        row_related_ids,
+        nested_datasets,
+    )
+
+
+async def aresolve_related_datasets(
+    related_ids: dict[str, set[int]],
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    related_columns: dict[str, COLUMNS] | None = None,
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+) -> dict[str, DATASET]:
+    """As resolve_related_datasets, fetching with async queryset iteration."""
+    if related_querysets:
+        related_columns = related_columns or {}
+        loaded = await asyncio.gather(
+            *[
+                aload_related_dataset(
+                    related_querysets[rel_name],
+                    ids,
+                    cache=related_cache,
+                    columns=related_columns.get(rel_name, None),
+                    datetime_columns=(
+                        plan.get_related_datetime_columns(rel_name)
+                        if plan is not None else ()
+                    ),
+                )
+                for rel_name, ids in related_ids.items()
+            ]
+        )
+        referenced_datasets = dict(zip(related_ids.keys(), loaded))
+        if metrics is not None:
+            metrics.count_related_rows(referenced_datasets)
+        related_datasets = {**related_datasets, **referenced_datasets}
+    if plan is not None and depth > 1:
+        nested_plans = plan.get_nested_plans()
+        related_datasets = {
+            rel_name: await aexpand_dataset(
+                dataset,
+                nested_plans[rel_name],
+                depth - 1,
+                related_cache,
+            )
+            if rel_name in nested_plans else dataset
+            for rel_name, dataset in related_datasets.items()
+        }
+    return related_datasets
+
+
+async def aformat_queryset_data(
+    field_names: list[str],
+    queryset: QuerySet,
+    related_datasets: dict[str, DATASET],
+    related_querysets: dict[str, QuerySet] | None = None,
+    fetch_strategy: str = "join",
+    plan: Any | None = None,
+    related_cache: RelatedDatasetCache | None = None,
+    depth: int = 1,
+    metrics: QuickMetrics | None = None,
+    engine: str = "rows",
+) -> list[dict[str, Any]]:
+    """
+    As format_queryset_data, fetching with Django's async queryset methods
+    rather than holding a thread while waiting on the database.
+
+    Rows and related rows are fetched first, then formatted without any
+    further queries. Formatting runs on the event loop.
+    """
+    validate_fetch_strategy(fetch_strategy)
+    validate_engine(engine, plan)
+    (
+        rel_fields,
+        expanded_names,
+        related_columns,
+        _,
+    ) = get_row_handling(field_names, queryset.model, plan)
+    json_relations = None
+    if engine == "json":
+        # Checking the database's JSON support may query.
+        json_relations = await sync_to_async(get_engine_json_relations)(
+            engine,
+            queryset,
+            plan,
+            depth,
+        )
+    if json_relations is not None:
+        from drfwn_quick.jsonagg import get_json_queryset, unpack_json_rows
+        with phase(metrics, "base"):
+            dataset_rows, embedded_datasets = unpack_json_rows(
+                [
+                    row async for row
+                    in get_json_queryset(queryset, plan, json_relations)
+                ],
+                json_relations,
+            )
+        return format_json_rows(
+            dataset_rows,
+            field_names,
+            queryset.model,
+            {**related_datasets, **embedded_datasets},
+            plan,
+            metrics,
         )
-        if row_id not in formatted_rows.keys():
-            formatted_rows[row_id] = formatted_row
+    with phase(metrics, "base"):
+        if engine == "columns":
+            lookups, to_many_fields = get_value_lookups(plan)
+            value_rows = [
+                row async for row in queryset.values_list(*lookups)
+            ]
+            to_many_ids = await afetch_all_to_many_ids(
+                [row[-1] for row in value_rows],
+                to_many_fields,
+            )
+        elif fetch_strategy == "join":
+            dataset_rows = [
+                row async for row in queryset.values(*field_names, "id")
+            ]
         else:
-            ids_to_merge.add(row_id)
-            for rel_name in rel_names:
-                existing_row = formatted_rows[row_id]
-                if rel_name in existing_row.keys():
-                    old_val = existing_row[rel_name]
-                    new_val = formatted_row[rel_name]
-                    if new_val:
-                        formatted_rows[row_id][rel_name] = old_val + new_val
-    return list(formatted_rows.values())
+            to_many_fields = {
+                field_name: rel_fields[field_name]
+                for field_name in field_names
+                if field_name in rel_fields
+            }
+            dataset_rows = [
+                row async for row in queryset.values(
+                    *[
+                        field_name for field_name in field_names
+                        if field_name not in to_many_fields
+                    ],
+                    "id",
+                )
+            ]
+            grouped_ids = await afetch_all_to_many_ids(
+                [dataset_row["id"] for dataset_row in dataset_rows],
+                to_many_fields,
+            )
+            for rel_name, row_ids in grouped_ids.items():
+                for dataset_row in dataset_rows:
+                    dataset_row[rel_name] = row_ids.get(dataset_row["id"], [])
+    rel_names = [
+        rel_name for rel_name in expanded_names
+        if rel_name in (related_querysets or {})
+    ]
+    with phase(metrics, "related"):
+        if engine == "columns":
+            related_ids = collect_column_related_ids(
+                dict(zip(lookups, zip(*value_rows))),
+                to_many_ids,
+                rel_names,
+            )
+        else:
+            related_ids = collect_related_ids(dataset_rows, rel_names)
+        related_datasets = await aresolve_related_datasets(
+            related_ids,
+            related_datasets,
+            related_querysets,
+            related_columns,
+            plan,
+            related_cache,
+            depth,
+            metrics,
+        )
+    # Related datasets are complete and expanded, so formatting won't query.
+    if engine == "columns":
+        return format_value_rows(
+            value_rows,
+            lookups,
+            to_many_ids,
+            related_datasets,
+            plan=plan,
+            metrics=metrics,
+        )
+    return format_dataset_rows(
+        dataset_rows,
+        field_names,
+        queryset.model,
+        related_datasets,
+        plan=plan,
+        metrics=metrics,
+    )
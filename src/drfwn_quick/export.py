@@ -0,0 +1,176 @@
+import csv
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Sequence
+
+import django
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.module_loading import import_string
+
+from drfwn_quick.data import chunked
+from drfwn_quick.renderers import encode_json
+from drfwn_quick.settings import STREAMING_CHUNK_SIZE
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# An ID range, from its first ID to the next range's, None for the last.
+ID_RANGE = tuple[int, int | None]
+
+
+def validate_export_format(export_format: str) -> None:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Invalid format {export_format}, expected one of"
+            f" {EXPORT_FORMATS}."
+        )
+
+
+def encode_csv(rows: Iterable[Sequence[Any]]) -> str:
+    """Encode rows of values as CSV lines."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def get_csv_value(value: Any) -> Any:
+    """Get a value for a CSV cell, with related rows and IDs as JSON."""
+    if isinstance(value, (dict, list, bool)):
+        return encode_json(value).decode()
+    return value
+
+
+def encode_rows(
+    rows: Iterable[dict[str, Any]],
+    export_format: str,
+    columns: Sequence[str],
+) -> str:
+    """
+    Encode quick rows as NDJSON, a JSON object per line, or as CSV lines of
+    the given columns, without a header.
+    """
+    if export_format == "ndjson":
+        return "".join(f"{encode_json(row).decode()}\n" for row in rows)
+    return encode_csv(
+        [get_csv_value(row.get(column, None)) for column in columns]
+        for row in rows
+    )
+
+
+def get_id_ranges(queryset: QuerySet, size: int) -> list[ID_RANGE]:
+    """
+    Get ranges of about size of a queryset's rows each, in ID order, see
+    ID_RANGE. Only IDs are fetched, a chunk at a time.
+    """
+    ids = queryset.order_by("id").values_list("id", flat=True)
+    starts = [chunk[0] for chunk in chunked(ids.iterator(size), size)]
+    return list(zip(starts, [*starts[1:], None]))
+
+
+def export_id_range(
+    serializer_path: str,
+    id_range: ID_RANGE,
+    export_format: str,
+    columns: Sequence[str],
+    chunk_size: int = STREAMING_CHUNK_SIZE,
+    fields: frozenset[str] | None = None,
+    expand: frozenset[str] | None = None,
+) -> str:
+    """
+    Encode the quick data for an ID range of a serializer's rows, see
+    encode_rows. Run in worker processes, so the serializer is given by its
+    dotted path.
+    """
+    serializer_class = import_string(serializer_path)
+    start, stop = id_range
+    queryset = serializer_class.get_quick_plan(fields, expand).queryset
+    queryset = queryset.filter(id__gte=start)
+    if stop is not None:
+        queryset = queryset.filter(id__lt=stop)
+    return encode_rows(
+        serializer_class.iter_quick_data(
+            queryset.order_by("id"),
+            chunk_size,
+            fields,
+            expand,
+            referenced_only=True,
+        ),
+        export_format,
+        columns,
+    )
+
+
+def iter_export(
+    serializer_class: type,
+    export_format: str = "ndjson",
+    chunk_size: int = STREAMING_CHUNK_SIZE,
+    fields: frozenset[str] | None = None,
+    expand: frozenset[str] | None = None,
+    workers: int = 1,
+) -> Iterator[str]:
+    """
+    Yield the quick data for all of a quick serializer's rows, encoded as
+    NDJSON or CSV with a header (see encode_rows), a chunk of chunk_size
+    rows at a time. Related rows are loaded per chunk, only those
+    referenced, so memory use stays flat regardless of the number of rows.
+
+    With over one worker, rows are split into ranges of chunk_size IDs (see
+    get_id_ranges) that are exported on that many processes, and yielded in
+    ID order. The serializer must then be importable by its module and name.
+    """
+    validate_export_format(export_format)
+    # Output names, rather than field_names' lookups, which renamed fields
+    # share with their source.
+    columns = list(
+        dict.fromkeys(
+            name for name, _ in
+            serializer_class.get_quick_plan(fields, expand).columns
+        )
+    )
+    if export_format == "csv":
+        yield encode_csv([columns])
+    if workers < 2:
+        rows = serializer_class.iter_quick_data(
+            None,
+            chunk_size,
+            fields,
+            expand,
+            referenced_only=True,
+        )
+        for chunk in chunked(rows, chunk_size):
+            yield encode_rows(chunk, export_format, columns)
+        return
+    id_ranges = get_id_ranges(
+        serializer_class.get_quick_plan(fields, expand).queryset,
+        chunk_size,
+    )
+    # Forked workers would otherwise share this process's connections.
+    connections.close_all()
+    serializer_path = (
+        f"{serializer_class.__module__}.{serializer_class.__qualname__}"
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=django.setup,
+    ) as executor:
+        pending = deque()
+        for id_range in id_ranges:
+            pending.append(
+                executor.submit(
+                    export_id_range,
+                    serializer_path,
+                    id_range,
+                    export_format,
+                    columns,
+                    chunk_size,
+                    fields,
+                    expand,
+                )
+            )
+            # Bound how many exported ranges wait in memory to be yielded.
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
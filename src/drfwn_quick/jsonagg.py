@@ -0,0 +1,417 @@
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.db import NotSupportedError, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import (
+    Aggregate,
+    BooleanField,
+    CharField,
+    DateField,
+    DateTimeField,
+    DecimalField,
+    F,
+    FloatField,
+    IntegerField,
+    JSONField,
+    Model,
+    OuterRef,
+    Subquery,
+    TextField,
+    TimeField,
+    UUIDField,
+)
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import Expression
+from django.db.models.fields import Field
+from django.db.models.functions import Cast, JSONObject
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from drfwn_quick.data import (
+    COLUMNS,
+    DATASET,
+    get_dataset_lookups,
+    get_to_many_pairs,
+)
+from drfwn_quick.settings import DATETIME_FORMAT
+
+
+# Backends that can build JSON in queries, see JSONArrayAgg.
+JSON_ENGINE_VENDORS = ("postgresql", "sqlite")
+# Under both backends' limits on function arguments, two per key.
+MAX_JSON_OBJECT_KEYS = 50
+# Annotations of embedded relations are named with this prefix.
+JSON_PREFIX = "quick_json_"
+
+# A relation's embedding expression, and a function that unpacks a row's
+# embedded value into the relation's dataset, returning its related ID(s).
+JSON_RELATION = tuple[Expression, Callable[[Any, DATASET], Any]]
+
+
+class JSONArrayAgg(Aggregate):
+    """Aggregate values into a JSON array, in the database's order."""
+    function = "JSON_GROUP_ARRAY"
+    output_field = JSONField()
+
+    def as_postgresql(
+        self,
+        compiler: Any,
+        connection: BaseDatabaseWrapper,
+        **extra_context,
+    ) -> tuple[str, tuple]:
+        return super().as_sql(
+            compiler,
+            connection,
+            function="JSONB_AGG",
+            **extra_context,
+        )
+
+
+def get_lookup_field(model: type[Model], lookup: str) -> Field:
+    """Get the field a queryset.values() lookup ends at."""
+    for part in lookup.split(LOOKUP_SEP):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    # Relations are output as their related IDs.
+    return field.target_field if field.is_relation else field
+
+
+def get_json_converter(
+    field: Field,
+    connection: BaseDatabaseWrapper,
+    format_datetimes: bool = False,
+) -> Callable[[Any], Any] | None:
+    """
+    Get a function to convert a field's values from JSON to what
+    queryset.values() gives, or None if they are the same.
+
+    Raises NotSupportedError for fields whose values can't be converted.
+    """
+    if isinstance(field, DateTimeField):
+        def convert_datetime(value: str) -> Any:
+            value = parse_datetime(value)
+            if settings.USE_TZ and timezone.is_naive(value):
+                value = timezone.make_aware(value, connection.timezone)
+            if format_datetimes:
+                return value.strftime(DATETIME_FORMAT)
+            return value
+        return convert_datetime
+    elif isinstance(field, DateField):
+        return parse_date
+    elif isinstance(field, TimeField):
+        return parse_time
+    elif isinstance(field, BooleanField):
+        # SQLite gives 1 and 0.
+        return bool
+    elif isinstance(field, DecimalField):
+        # Embedded as text, see get_json_value.
+        exponent = Decimal(1).scaleb(-field.decimal_places)
+        return lambda value: Decimal(value).quantize(exponent)
+    elif isinstance(field, UUIDField):
+        return uuid.UUID
+    elif isinstance(field, (IntegerField, FloatField, CharField, TextField)):
+        return None
+    raise NotSupportedError(
+        f"{field.__class__.__name__} values can't be embedded as JSON."
+    )
+
+
+def get_json_value(
+    model: type[Model],
+    lookup: str,
+    path: str | None = None,
+) -> Expression:
+    """
+    Get the expression of a model's column, by lookup, to embed in a JSON
+    object, through path if given, e.g. from a through model.
+
+    Decimals are embedded as text, as JSON numbers are decoded as floats,
+    which lose the digits of larger decimals.
+    """
+    value = F(lookup if path is None else path)
+    if isinstance(get_lookup_field(model, lookup), DecimalField):
+        return Cast(value, TextField())
+    return value
+
+
+def get_json_columns(
+    model: type[Model],
+    columns: COLUMNS | None = None,
+) -> tuple[tuple[str, str], ...]:
+    """
+    Get the keys and lookups of a relation's related rows, as
+    load_related_dataset keys them.
+    """
+    if columns is None:
+        return tuple(
+            (f.attname, f.attname) for f in model._meta.concrete_fields
+        )
+    if any(name != lookup for name, lookup in columns):
+        return (
+            ("id", "id"),
+            *((name, lookup) for name, lookup in columns if name != "id"),
+        )
+    return tuple((lookup, lookup) for lookup in get_dataset_lookups(columns))
+
+
+def make_json_unpacker(
+    model: type[Model],
+    json_columns: tuple[tuple[str, str], ...],
+    datetime_columns: Iterable[str],
+    connection: BaseDatabaseWrapper,
+    many: bool = True,
+) -> Callable[[Any, DATASET], Any]:
+    """
+    Make a function that adds a row's embedded related rows to a dataset,
+    converted and keyed as load_related_dataset would, and returns their
+    ID(s).
+    """
+    datetime_columns = set(datetime_columns)
+    keys = tuple(dict.fromkeys(key for key, _ in json_columns))
+    converters = {}
+    for key, lookup in json_columns:
+        converter = get_json_converter(
+            get_lookup_field(model, lookup),
+            connection,
+            lookup in datetime_columns,
+        )
+        if converter is not None:
+            converters[key] = converter
+
+    def add_row(item: dict[str, Any], dataset: DATASET) -> int:
+        item_id = item["id"]
+        if item_id not in dataset:
+            row = {}
+            for key in keys:
+                value = item.get(key, None)
+                converter = converters.get(key, None)
+                if value is not None and converter is not None:
+                    value = converter(value)
+                row[key] = value
+            dataset[item_id] = row
+        return item_id
+
+    def unpack(value: Any, dataset: DATASET) -> Any:
+        if not many:
+            return None if value is None else add_row(value, dataset)
+        return [add_row(item, dataset) for item in value or ()]
+
+    return unpack
+
+
+def get_json_related_queryset(
+    plan: Any,
+    rel_name: str,
+    connection: BaseDatabaseWrapper,
+) -> QuerySet:
+    """
+    Get the related queryset of a plan's relation, that its embedded rows
+    are queried from, as the other engines load them.
+
+    Raises NotSupportedError for related querysets that can't be queried
+    in a subquery of each row, e.g. sliced or on another database.
+    """
+    related_queryset = plan.related_querysets[rel_name]
+    query = related_queryset.query
+    if (
+        related_queryset.db != connection.alias
+        or query.is_sliced
+        or query.combinator
+        or query.distinct
+        or any(
+            annotation.contains_aggregate
+            for annotation in query.annotations.values()
+        )
+    ):
+        raise NotSupportedError(
+            f"Related queryset of \"{rel_name}\" can't be embedded as JSON."
+        )
+    return related_queryset
+
+
+def get_json_relation(
+    plan: Any,
+    rel_name: str,
+    connection: BaseDatabaseWrapper,
+) -> JSON_RELATION:
+    """
+    Get the expression that embeds a relation in each of a plan's rows, as
+    a JSON array of related rows (or related IDs, if collapsed) for to-many
+    relations, or a related row for to-one relations, see JSON_RELATION.
+
+    Related rows are queried from the relation's related queryset, see
+    get_json_related_queryset. Collapsed related IDs are not, as the other
+    engines fetch them.
+    """
+    field = plan.relations[rel_name]
+    related_model = field.related_model
+    json_columns = get_json_columns(
+        related_model,
+        plan.related_columns.get(rel_name, None),
+    )
+    if len(json_columns) > MAX_JSON_OBJECT_KEYS:
+        raise NotSupportedError("Too many columns to embed as JSON.")
+    if rel_name in plan.rel_fields:
+        pairs, source, target = get_to_many_pairs(field)
+        if rel_name in plan.collapsed_names:
+            value = F(target)
+
+            def unpack(ids: Any, dataset: DATASET) -> list[Any]:
+                return list(ids or ())
+        else:
+            related_queryset = get_json_related_queryset(
+                plan,
+                rel_name,
+                connection,
+            )
+            if pairs.model is related_model:
+                # Reverse foreign key, related rows are the pairs.
+                pairs, prefix = related_queryset, ""
+            else:
+                pairs = pairs.filter(
+                    **{f"{target}__in": related_queryset.values("pk")}
+                )
+                prefix = f"{target}{LOOKUP_SEP}"
+            value = JSONObject(
+                **{
+                    key: get_json_value(
+                        related_model,
+                        lookup,
+                        f"{prefix}{lookup}",
+                    )
+                    for key, lookup in json_columns
+                }
+            )
+            unpack = make_json_unpacker(
+                related_model,
+                json_columns,
+                plan.get_related_datetime_columns(rel_name),
+                connection,
+            )
+        expression = Subquery(
+            pairs.filter(**{source: OuterRef("pk")})
+            .order_by()
+            .values(source)
+            .annotate(json=JSONArrayAgg(value))
+            .values("json"),
+            output_field=JSONField(),
+        )
+        return expression, unpack
+    related_queryset = get_json_related_queryset(plan, rel_name, connection)
+    expression = Subquery(
+        related_queryset.filter(pk=OuterRef(rel_name))
+        .order_by()
+        .values(
+            json=JSONObject(
+                **{
+                    key: get_json_value(related_model, lookup)
+                    for key, lookup in json_columns
+                }
+            )
+        )[:1],
+        output_field=JSONField(),
+    )
+    return expression, make_json_unpacker(
+        related_model,
+        json_columns,
+        plan.get_related_datetime_columns(rel_name),
+        connection,
+        many=False,
+    )
+
+
+def get_json_relations(
+    queryset: QuerySet,
+    plan: Any,
+    depth: int = 1,
+) -> dict[str, JSON_RELATION] | None:
+    """
+    Get how each relation of a plan's rows is embedded, by relation name,
+    see get_json_relation. Relations that are neither to-many nor expanded
+    are fetched as they are.
+
+    None if the queryset's database can't build JSON, or the relations
+    can't be embedded, e.g. related rows would be expanded further or have
+    columns that can't be converted back from JSON.
+    """
+    connection = connections[queryset.db]
+    if (
+        connection.vendor not in JSON_ENGINE_VENDORS
+        or not connection.features.has_json_object_function
+        or queryset.query.combinator
+    ):
+        return None
+    if depth > 1:
+        nested_plans = plan.get_nested_plans()
+        for rel_name in plan.expanded_names:
+            nested_plan = nested_plans.get(rel_name, None)
+            if nested_plan is not None and nested_plan.nested_serializers:
+                return None
+    try:
+        return {
+            rel_name: get_json_relation(plan, rel_name, connection)
+            for rel_name in plan.field_names
+            if rel_name in plan.rel_fields or rel_name in plan.expanded_names
+        }
+    except NotSupportedError:
+        return None
+
+
+def get_json_queryset(
+    queryset: QuerySet,
+    plan: Any,
+    json_relations: dict[str, JSON_RELATION],
+) -> QuerySet:
+    """
+    Get a queryset.values() of a plan's rows, with their relations embedded
+    as JSON, see unpack_json_rows.
+    """
+    return queryset.values(
+        *[
+            field_name for field_name in plan.field_names
+            if field_name not in plan.rel_fields
+        ],
+        "id",
+        **{
+            f"{JSON_PREFIX}{rel_name}": expression
+            for rel_name, (expression, _) in json_relations.items()
+        },
+    )
+
+
+def unpack_json_rows(
+    rows: Iterable[dict[str, Any]],
+    json_relations: dict[str, JSON_RELATION],
+) -> tuple[list[dict[str, Any]], dict[str, DATASET]]:
+    """
+    Unpack rows fetched with get_json_queryset into rows with related IDs,
+    and the related datasets they reference, by relation name, as the
+    other engines fetch them.
+    """
+    datasets = {rel_name: {} for rel_name in json_relations.keys()}
+    dataset_rows = []
+    for row in rows:
+        for rel_name, (_, unpack) in json_relations.items():
+            row[rel_name] = unpack(
+                row.pop(f"{JSON_PREFIX}{rel_name}"),
+                datasets[rel_name],
+            )
+        dataset_rows.append(row)
+    return dataset_rows, datasets
+
+
+def fetch_json_rows(
+    queryset: QuerySet,
+    plan: Any,
+    json_relations: dict[str, JSON_RELATION],
+) -> tuple[list[dict[str, Any]], dict[str, DATASET]]:
+    """Fetch a plan's rows with their relations embedded, and unpack them."""
+    return unpack_json_rows(
+        get_json_queryset(queryset, plan, json_relations),
+        json_relations,
+    )
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils.module_loading import import_string
+
+from drfwn_quick.export import EXPORT_FORMATS, iter_export
+from drfwn_quick.serializers import QuickableNestedModelSerializer
+from drfwn_quick.settings import STREAMING_CHUNK_SIZE
+from drfwn_quick.utils import parse_names
+
+
+class Command(BaseCommand):
+    help = (
+        "Export all rows of a quick serializer as NDJSON or CSV, streamed a"
+        " chunk at a time, see drfwn_quick.export.iter_export."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "serializer",
+            help="Dotted path to a QuickableNestedModelSerializer.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            default="ndjson",
+            help="Output format, a JSON object per line or CSV.",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            default="-",
+            help="File to write to, - for stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=STREAMING_CHUNK_SIZE,
+            help="Rows fetched, formatted and written at a time.",
+        )
+        parser.add_argument(
+            "--fields",
+            help="Comma separated fields to output, as the fields URL arg.",
+        )
+        parser.add_argument(
+            "--expand",
+            help="Comma separated relations to expand, as the expand URL arg.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes to export ID ranges on, in ID order if over 1.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        try:
+            serializer_class = import_string(options["serializer"])
+        except ImportError as exc:
+            raise CommandError(str(exc))
+        if not (
+            isinstance(serializer_class, type)
+            and issubclass(serializer_class, QuickableNestedModelSerializer)
+        ):
+            raise CommandError(
+                f"{options['serializer']} is not a"
+                " QuickableNestedModelSerializer."
+            )
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        chunks = iter_export(
+            serializer_class,
+            options["format"],
+            options["chunk_size"],
+            parse_names(options["fields"]),
+            parse_names(options["expand"]),
+            options["workers"],
+        )
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        # CSV lines end as the csv module writes them.
+        with open(options["output"], "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Iterator
+
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from drfwn_quick.settings import METRICS_CALLBACK
+
+
+logger = logging.getLogger("drfwn_quick")
+
+
+@dataclass
+class QuickMetrics:
+    """
+    Measurements of one quick serialization, for diagnosing slow endpoints.
+
+    Phases are "related" (loading related datasets), "base" (fetching the
+    serialized rows), "format" (building and merging rows) and, for
+    viewsets, "render". Durations are in seconds and accumulate if a phase
+    is entered more than once, e.g. when expanding nested relations, or on
+    several threads at once when loading in parallel.
+    """
+    serializer: str
+    timings: dict[str, float] = field(default_factory=dict)
+    queries: int = 0
+    # Rows fetched for the serializer, including rows repeated by joins.
+    base_rows: int = 0
+    # Rows after merging, as serialized.
+    rows: int = 0
+    related_rows: dict[str, int] = field(default_factory=dict)
+    # Measurements may be added from worker threads, see drfwn_quick.parallel.
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock,
+        repr=False,
+        compare=False,
+    )
+
+    @property
+    def fan_out(self) -> float:
+        """Fetched rows per serialized row, above 1 if joins repeat rows."""
+        return self.base_rows / self.rows if self.rows else 0.0
+
+    def count_related_rows(self, datasets: dict[str, dict]) -> None:
+        with self._lock:
+            for rel_name, dataset in datasets.items():
+                self.related_rows[rel_name] = (
+                    self.related_rows.get(rel_name, 0) + len(dataset)
+                )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase, adding to any time already spent in it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    @contextmanager
+    def count_queries(self) -> Iterator[None]:
+        """Count the SQL queries run on every database connection."""
+        def counter(execute: Callable, *args) -> Any:
+            with self._lock:
+                self.queries += 1
+            return execute(*args)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "serializer": self.serializer,
+            "timings": dict(self.timings),
+            "queries": self.queries,
+            "base_rows": self.base_rows,
+            "rows": self.rows,
+            "related_rows": dict(self.related_rows),
+            "fan_out": self.fan_out,
+        }
+
+    def server_timing(self) -> str:
+        """Get the phase timings as a Server-Timing header value."""
+        return ", ".join(
+            f"quick-{name};dur={duration * 1000:.1f}"
+            for name, duration in self.timings.items()
+        )
+
+
+def phase(metrics: QuickMetrics | None, name: str) -> ContextManager:
+    """Time a phase if metrics are being collected, otherwise do nothing."""
+    return metrics.phase(name) if metrics is not None else nullcontext()
+
+
+def report_metrics(metrics: QuickMetrics) -> None:
+    """
+    Log metrics to the "drfwn_quick" logger, at debug level, and pass them
+    to the DRFWN_QUICK_METRICS_CALLBACK callable, if set.
+    """
+    logger.debug("Quick metrics: %s", metrics.as_dict())
+    if METRICS_CALLBACK:
+        callback = METRICS_CALLBACK
+        if isinstance(callback, str):
+            callback = import_string(callback)
+        callback(metrics)
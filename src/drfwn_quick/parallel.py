@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+from typing import Callable, TypeVar
+
+from django.db import connections
+
+from drfwn_quick.metrics import QuickMetrics
+
+
+T = TypeVar("T")
+
+
+def can_run_in_parallel() -> bool:
+    """
+    Check if queries can be run on other threads' connections, which can't
+    see this thread's uncommitted writes or in-memory SQLite databases.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.in_atomic_block:
+            return False
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            return False
+    return True
+
+
+def run_task(task: Callable[[], T], metrics: QuickMetrics | None) -> T:
+    """Run a task on a worker thread, closing its connections after."""
+    try:
+        with metrics.count_queries() if metrics else nullcontext():
+            return task()
+    finally:
+        # Connections are per thread, they'd be left open otherwise.
+        connections.close_all()
+
+
+def run_parallel(
+    tasks: list[Callable[[], T]],
+    workers: int = 1,
+    metrics: QuickMetrics | None = None,
+) -> list[T]:
+    """
+    Run tasks on up to workers threads, each with its own connections, and
+    get their results in order.
+
+    Tasks run in order on this thread if workers is below 2, there is only
+    one task, or can_run_in_parallel is false, e.g. in a transaction. If
+    metrics are given, queries on worker threads are counted to them. Tasks
+    run in copies of this thread's context, e.g. so reads are routed alike.
+    """
+    if workers < 2 or len(tasks) < 2 or not can_run_in_parallel():
+        return [task() for task in tasks]
+    with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = [
+            executor.submit(copy_context().run, run_task, task, metrics)
+            for task in tasks
+        ]
+        return [future.result() for future in futures]
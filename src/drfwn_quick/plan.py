@@ -0,0 +1,389 @@
+import warnings
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import DateTimeField, Model
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.fields import Field
+from django.db.models.fields.reverse_related import ForeignObjectRel
+from django.db.models.query import QuerySet
+from rest_framework.fields import HiddenField, SerializerMethodField
+from rest_framework.serializers import ListSerializer
+
+from drfwn_quick.data import (
+    COLUMNS,
+    DATASET,
+    ROW_STEPS,
+    get_row_steps,
+    make_row_builder,
+    rel_is_to_many,
+)
+from drfwn_quick.settings import HANDLE_DATETIMES
+
+
+@dataclass(frozen=True)
+class QuickPlan:
+    """
+    Model metadata used by a quick serializer, compiled once per class.
+
+    Holds everything that would otherwise be recomputed from the model's
+    _meta on every request. Use describe() to inspect it when debugging.
+    """
+    model: type[Model]
+    queryset: QuerySet = field(repr=False)
+    # Output field name and queryset.values() lookup pairs, from the
+    # serializer's declared fields.
+    columns: COLUMNS
+    # Lookups fetched with queryset.values().
+    field_names: tuple[str, ...]
+    # Relation name to relation kind, e.g. "many_to_many".
+    relation_kinds: Mapping[str, str]
+    related_models: Mapping[str, type[Model]]
+    related_querysets: Mapping[str, QuerySet] = field(repr=False)
+    relations: Mapping[str, Field | ForeignObjectRel] = field(repr=False)
+    # To-many relations, which are expanded to full data.
+    rel_fields: Mapping[str, Field | ForeignObjectRel] = field(repr=False)
+    # Relations declared with nested quick serializers, which are followed
+    # to expand related rows' relations in turn.
+    nested_serializers: Mapping[str, type]
+    # Columns of related rows, for relations declared with nested
+    # serializers. Otherwise, every column of related rows is used.
+    related_columns: Mapping[str, COLUMNS]
+    datetime_columns: frozenset[str]
+    related_datetime_columns: Mapping[str, frozenset[str]]
+    build_row: Callable[
+        [dict[str, Any], dict[str, DATASET]],
+        dict[str, Any],
+    ] = field(repr=False)
+    # How each field is output, for the columns engine.
+    row_steps: ROW_STEPS = field(repr=False)
+    # Relations that aren't expanded, only output as related IDs, see
+    # narrow().
+    collapsed_names: frozenset[str] = frozenset()
+
+    @property
+    def rel_names(self) -> tuple[str, ...]:
+        return tuple(self.rel_fields.keys())
+
+    @property
+    def output_names(self) -> dict[str, str]:
+        """Output field names by lookup."""
+        return {lookup: name for name, lookup in self.columns}
+
+    @property
+    def expanded_names(self) -> tuple[str, ...]:
+        """
+        Relations that are fetched and expanded to full data.
+
+        To-many relations are expanded unless collapsed, to-one relations
+        only if they are declared with a nested quick serializer.
+        """
+        return tuple(
+            name for name in self.field_names
+            if (name in self.rel_fields or name in self.nested_serializers)
+            and name not in self.collapsed_names
+        )
+
+    @property
+    def expandable_names(self) -> frozenset[str]:
+        """Output names of the relations that can be expanded or not."""
+        expandable = {*self.rel_fields, *self.nested_serializers}
+        return frozenset(
+            name for name, lookup in self.columns if lookup in expandable
+        )
+
+    def get_related_datetime_columns(self, rel_name: str) -> tuple[str, ...]:
+        """
+        Get the datetime columns to format in a relation's rows, none if
+        datetimes aren't handled.
+        """
+        if not HANDLE_DATETIMES:
+            return ()
+        return tuple(sorted(self.related_datetime_columns.get(rel_name, ())))
+
+    def get_nested_plans(self) -> dict[str, "QuickPlan"]:
+        """Get the plans of the nested quick serializers, by relation name."""
+        # Looked up when needed, nested serializers may nest this one.
+        return {
+            name: serializer_class.get_quick_plan()
+            for name, serializer_class in self.nested_serializers.items()
+        }
+
+    def narrow(
+        self,
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+    ) -> "QuickPlan":
+        """
+        Get a copy of the plan that only outputs the fields (by output name)
+        in fields, and only expands the relations in expand, outputting the
+        related ID(s) of the rest. None for either is all of them.
+
+        Left out fields and relations are never fetched. Only this plan's
+        own relations are collapsed, expanded related rows are as before.
+        """
+        columns = self.columns
+        if fields is not None:
+            columns = tuple(
+                (name, lookup) for name, lookup in columns if name in fields
+            )
+        field_names = tuple(dict.fromkeys(lookup for _, lookup in columns))
+        collapsed_names = frozenset()
+        if expand is not None:
+            expandable = {*self.rel_fields, *self.nested_serializers}
+            collapsed_names = frozenset(
+                lookup for name, lookup in columns
+                if lookup in expandable and name not in expand
+            )
+        nested_serializers = {
+            name: serializer_class
+            for name, serializer_class in self.nested_serializers.items()
+            if name not in collapsed_names
+        }
+        row_args = (
+            field_names,
+            self.rel_names,
+            self.datetime_columns,
+            tuple(
+                name for name in nested_serializers.keys()
+                if name not in self.rel_fields
+            ),
+            columns,
+            tuple(name for name in collapsed_names if name in self.rel_fields),
+        )
+        return replace(
+            self,
+            columns=columns,
+            field_names=field_names,
+            nested_serializers=MappingProxyType(nested_serializers),
+            build_row=make_row_builder(*row_args),
+            row_steps=get_row_steps(*row_args),
+            collapsed_names=collapsed_names,
+        )
+
+    def describe(self) -> dict[str, Any]:
+        """Return the plan as plain data, for debugging."""
+        return {
+            "model": self.model._meta.label,
+            "columns": [list(column) for column in self.columns],
+            "field_names": list(self.field_names),
+            "rel_names": list(self.rel_names),
+            "expanded_names": list(self.expanded_names),
+            "collapsed_names": sorted(self.collapsed_names),
+            "nested_serializers": {
+                k: v.__name__ for k, v in self.nested_serializers.items()
+            },
+            "relation_kinds": dict(self.relation_kinds),
+            "related_models": {
+                k: v._meta.label for k, v in self.related_models.items()
+            },
+            "related_querysets": {
+                k: v.model._meta.label
+                for k, v in self.related_querysets.items()
+            },
+            "related_columns": {
+                k: [list(column) for column in v]
+                for k, v in self.related_columns.items()
+            },
+            "datetime_columns": sorted(self.datetime_columns),
+            "related_datetime_columns": {
+                k: sorted(v) for k, v in self.related_datetime_columns.items()
+            },
+        }
+
+
+def relation_kind(field: Field | ForeignObjectRel) -> str:
+    """Get the kind of a relation, e.g. "many_to_many"."""
+    for kind in ("many_to_many", "one_to_many", "many_to_one", "one_to_one"):
+        if getattr(field, kind):
+            return kind
+
+
+def get_datetime_columns(model: type[Model]) -> frozenset[str]:
+    """Get the names of a model's datetime.datetime columns."""
+    return frozenset(
+        f.attname for f in model._meta.get_fields()
+        if isinstance(f, DateTimeField)
+    )
+
+
+def get_serializer_columns(
+    serializer_class: type,
+    model: type[Model],
+) -> COLUMNS:
+    """
+    Get the columns a model serializer exposes, from its declared fields.
+
+    Follows ModelSerializer's use of Meta.fields, Meta.exclude and declared
+    fields, with each field's source= as its queryset.values() lookup.
+    Write only fields are left out, as are fields that aren't backed by a
+    database column (e.g. SerializerMethodField), with a warning.
+    """
+    meta = serializer_class.Meta
+    fields = getattr(meta, "fields", None)
+    exclude = getattr(meta, "exclude", None)
+    extra_kwargs = getattr(meta, "extra_kwargs", None)
+    if not isinstance(extra_kwargs, dict):
+        extra_kwargs = {}
+    declared_fields = serializer_class._declared_fields
+    if isinstance(fields, (list, tuple)):
+        names = list(fields)
+    else:
+        names = [
+            f.name for f in model._meta.get_fields() if isinstance(f, Field)
+        ]
+        names += [name for name in declared_fields if name not in names]
+        if isinstance(exclude, (list, tuple)):
+            names = [name for name in names if name not in exclude]
+    columns = []
+    for name in names:
+        declared = declared_fields.get(name, None)
+        if declared is None:
+            if extra_kwargs.get(name, {}).get("write_only", False):
+                continue
+            source = extra_kwargs.get(name, {}).get("source", name)
+        elif declared.write_only or isinstance(declared, HiddenField):
+            continue
+        else:
+            source = declared.source or name
+            if isinstance(declared, SerializerMethodField) or source == "*":
+                source = None
+        lookup = source.replace(".", LOOKUP_SEP) if source else None
+        try:
+            if lookup is None:
+                raise FieldDoesNotExist()
+            model._meta.get_field(lookup.split(LOOKUP_SEP)[0])
+        except FieldDoesNotExist:
+            warnings.warn(
+                f"Field \"{name}\" in serializer {serializer_class} is not"
+                " a database column and is left out of quick data."
+            )
+            continue
+        columns.append((name, lookup))
+    return tuple(columns)
+
+
+def get_nested_serializers(serializer_class: type) -> dict[str, Any]:
+    """
+    Get a serializer's declared nested model serializers, by source.
+
+    Values are the nested serializer instances, rather than classes, as
+    they are declared.
+    """
+    nested_serializers = {}
+    for name, declared in serializer_class._declared_fields.items():
+        source = declared.source or name
+        if isinstance(declared, ListSerializer):
+            declared = declared.child
+        if hasattr(declared, "Meta") and hasattr(declared.Meta, "model"):
+            nested_serializers[source] = declared
+    return nested_serializers
+
+
+def build_quick_plan(serializer_class: type) -> QuickPlan:
+    """
+    Compile a QuickPlan for a quick serializer class.
+
+    Warnings about querysets that are not defined on the serializer are
+    given here, once per serializer class, rather than on every request.
+    """
+    model = serializer_class.Meta.model
+    model_fields = model._meta.get_fields()
+    queryset = getattr(serializer_class, "queryset", None)
+    if queryset is None:
+        warnings.warn(
+            f"Queryset not defined for model {model}"
+            f" in serializer {serializer_class}. Setting it now,"
+            " define it in the serializer to be explicit."
+        )
+        queryset = model.objects.all()
+    related_querysets = dict(
+        getattr(serializer_class, "related_querysets", {})
+    )
+    relations = {f.name: f for f in model_fields if f.is_relation}
+    for rel_name, rel_field in relations.items():
+        if rel_name not in related_querysets.keys():
+            warnings.warn(
+                f"Relation \"{rel_name}\" in serializer"
+                f" {serializer_class} for {model}"
+                " is not defined in the serializer's related_querysets."
+                " Setting it now, define it in the serializer to be"
+                " explicit."
+            )
+            related_querysets[rel_name] = (
+                rel_field.related_model.objects.all()
+            )
+    columns = get_serializer_columns(serializer_class, model)
+    field_names = tuple(dict.fromkeys(lookup for _, lookup in columns))
+    rel_fields = {
+        name: f for name, f in relations.items() if rel_is_to_many(f)
+    }
+    # Avoids a circular import, the serializer module imports this one.
+    from drfwn_quick.serializers import QuickableNestedModelSerializer
+    declared_nested = {
+        name: nested for name, nested
+        in get_nested_serializers(serializer_class).items()
+        if name in relations
+    }
+    nested_serializers = {
+        name: nested.__class__ for name, nested in declared_nested.items()
+        if isinstance(nested, QuickableNestedModelSerializer)
+    }
+    related_columns = {}
+    for name, nested in declared_nested.items():
+        related_model = relations[name].related_model
+        # To-many columns would fan out related rows, they are only
+        # fetched when expanded, see data.expand_dataset.
+        related_columns[name] = tuple(
+            (column_name, lookup)
+            for column_name, lookup
+            in get_serializer_columns(nested.__class__, related_model)
+            if not rel_is_to_many(
+                related_model._meta.get_field(lookup.split(LOOKUP_SEP)[0])
+            )
+        )
+    to_one_names = tuple(
+        name for name in nested_serializers.keys()
+        if name not in rel_fields
+    )
+    datetime_columns = get_datetime_columns(model)
+    related_datetime_columns = {
+        name: get_datetime_columns(f.related_model)
+        for name, f in relations.items()
+        if name in rel_fields or name in to_one_names
+    }
+    return QuickPlan(
+        model=model,
+        queryset=queryset,
+        columns=columns,
+        field_names=field_names,
+        relation_kinds=MappingProxyType(
+            {name: relation_kind(f) for name, f in relations.items()}
+        ),
+        related_models=MappingProxyType(
+            {name: f.related_model for name, f in relations.items()}
+        ),
+        related_querysets=MappingProxyType(related_querysets),
+        relations=MappingProxyType(relations),
+        rel_fields=MappingProxyType(rel_fields),
+        nested_serializers=MappingProxyType(nested_serializers),
+        related_columns=MappingProxyType(related_columns),
+        datetime_columns=datetime_columns,
+        related_datetime_columns=MappingProxyType(related_datetime_columns),
+        build_row=make_row_builder(
+            field_names,
+            tuple(rel_fields.keys()),
+            datetime_columns,
+            to_one_names,
+            columns,
+        ),
+        row_steps=get_row_steps(
+            field_names,
+            tuple(rel_fields.keys()),
+            datetime_columns,
+            to_one_names,
+            columns,
+        ),
+    )
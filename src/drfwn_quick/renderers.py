@@ -0,0 +1,86 @@
+import json
+from typing import Any, Mapping
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# As DRF's JSONEncoder, which gives "Z" for UTC and compact output.
+ORJSON_OPTIONS = (
+    orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+)
+
+_encoder = JSONEncoder()
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Encode data as compact, non-ASCII escaped JSON, as DRF's JSONRenderer
+    does by default.
+
+    Uses orjson if it's installed, falling back to DRF's JSONEncoder for
+    types orjson doesn't encode natively (e.g. decimal.Decimal), and
+    entirely for data it can't encode (e.g. integers over 64 bits).
+
+    Unlike DRF, orjson encodes NaN and infinite floats as null, rather than
+    raising a ValueError (or with STRICT_JSON off, encoding them as NaN and
+    Infinity), as finding them first would cost about as much as encoding.
+    Without orjson, they're handled as DRF does.
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            # As DRF, escaped for use in JavaScript.
+            return encoded.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9",
+                b"\\u2029",
+            )
+    encoded = json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        allow_nan=not api_settings.STRICT_JSON,
+    )
+    return encoded.replace("\u2028", "\\u2028").replace(
+        "\u2029",
+        "\\u2029",
+    ).encode()
+
+
+class QuickJSONRenderer(JSONRenderer):
+    """
+    A JSON renderer for quick data, encoding with orjson if it's installed.
+
+    Quick data is plain dicts and lists of database values, so orjson can
+    encode nearly all of it natively. Responses that need DRF's own
+    options, e.g. indented or ASCII escaped, are rendered by JSONRenderer.
+    NaN and infinite floats are rendered as null by orjson, see
+    encode_json.
+    """
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        return encode_json(data)
@@ -0,0 +1,159 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, TypeVar
+
+from django.conf import settings
+from django.core import checks
+from django.db import router
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponseBase
+from rest_framework.permissions import SAFE_METHODS
+
+from drfwn_quick.settings import (
+    READ_ALIAS,
+    READ_STICKY_COOKIE_NAME,
+    READ_STICKY_SECONDS,
+)
+
+
+T = TypeVar("T")
+
+ROUTER_PATH = "drfwn_quick.routers.QuickReadRouter"
+STICKY_COOKIE_SALT = "drfwn_quick.routers.make_sticky"
+
+# The database alias reads are routed to, see reading_from.
+_read_alias: ContextVar[str | None] = ContextVar(
+    "drfwn_quick_read_alias",
+    default=None,
+)
+
+
+class QuickReadRouter:
+    """
+    A database router that routes reads to the alias set by reading_from,
+    e.g. a replica, and leaves everything else to the next routers. List it
+    first in DATABASE_ROUTERS.
+    """
+
+    def db_for_read(self, model: type[Model], **hints) -> str | None:
+        return _read_alias.get()
+
+
+@contextmanager
+def reading_from(alias: str | None) -> Iterator[None]:
+    """
+    Route reads in this context to a database alias, through
+    QuickReadRouter. If alias is None, reads are routed as they were.
+    """
+    if alias is None:
+        yield
+        return
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def iter_reading_from(alias: str | None, items: Iterable[T]) -> Iterator[T]:
+    """
+    Iterate items, routing reads to a database alias only while each item
+    is fetched, e.g. for a streamed response, which is iterated after its
+    view returns.
+    """
+    iterator = iter(items)
+    while True:
+        with reading_from(alias):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def get_read_alias(
+    alias: str | None,
+    model: type[Model],
+    request: HttpRequest | None = None,
+) -> str | None:
+    """
+    Get the database alias to read a request's quick data for a model from.
+    That is alias, e.g. a replica, unless the request writes or its client
+    wrote recently (see is_sticky), then the model's write alias, so that
+    clients read their own writes rather than a lagging replica. None if
+    alias is None, to read as Django's routers do.
+    """
+    if alias is None:
+        return None
+    if request is not None and (
+        request.method not in SAFE_METHODS or is_sticky(request)
+    ):
+        return router.db_for_write(model)
+    return alias
+
+
+def is_sticky(request: HttpRequest) -> bool:
+    """
+    Check if a request's client wrote recently, see make_sticky. Cookies
+    that are unsigned, tampered with, or expired aren't sticky.
+    """
+    value = request.get_signed_cookie(
+        READ_STICKY_COOKIE_NAME,
+        default=None,
+        salt=STICKY_COOKIE_SALT,
+        max_age=READ_STICKY_SECONDS,
+    )
+    try:
+        expires = float(value)
+    except (TypeError, ValueError):
+        return False
+    now = time.time()
+    return now < expires <= now + READ_STICKY_SECONDS
+
+
+def make_sticky(response: HttpResponseBase) -> None:
+    """
+    Set a signed cookie so that the response's client reads from the
+    primary for DRFWN_QUICK_READ_STICKY_SECONDS, as replicas may not have
+    its writes yet.
+    """
+    if READ_STICKY_SECONDS <= 0:
+        return
+    response.set_signed_cookie(
+        READ_STICKY_COOKIE_NAME,
+        str(time.time() + READ_STICKY_SECONDS),
+        salt=STICKY_COOKIE_SALT,
+        max_age=READ_STICKY_SECONDS,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def check_read_router(app_configs: Any = None, **kwargs) -> list:
+    """
+    Check that DRFWN_QUICK_READ_ALIAS is a database, and that
+    QuickReadRouter is installed to route reads to it.
+    """
+    if READ_ALIAS is None:
+        return []
+    messages = []
+    if READ_ALIAS not in settings.DATABASES:
+        messages.append(
+            checks.Error(
+                f"DRFWN_QUICK_READ_ALIAS {READ_ALIAS!r} is not in DATABASES.",
+                id="drfwn_quick.E001",
+            )
+        )
+    if not any(
+        router == ROUTER_PATH or isinstance(router, QuickReadRouter)
+        for router in settings.DATABASE_ROUTERS
+    ):
+        messages.append(
+            checks.Warning(
+                "Quick reads aren't routed to DRFWN_QUICK_READ_ALIAS.",
+                hint=f"Add {ROUTER_PATH!r} to DATABASE_ROUTERS.",
+                id="drfwn_quick.W001",
+            )
+        )
+    return messages
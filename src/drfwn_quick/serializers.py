@@ -1,82 +1,438 @@
-import warnings
-from typing import Any
+import asyncio
+import functools
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Callable, Iterator, Mapping
 
 from django.db.models import Model
-from django.db.models.fields import Field
+from django.db.models.query import QuerySet
 from drf_writable_nested import WritableNestedModelSerializer
 from rest_framework.fields import empty
 from rest_framework.utils.serializer_helpers import ReturnDict
 
-from drfwn_quick.data import format_queryset_data
-from drfwn_quick.utils import determine_quick
+from drfwn_quick.bulk import make_bulk_serializer_class
+from drfwn_quick.cache import RelatedDatasetCache, related_dataset_cache
+from drfwn_quick.conditional import get_fingerprint, get_fingerprint_querysets
+from drfwn_quick.data import (
+    DATASET,
+    aformat_queryset_data,
+    aload_related_dataset,
+    chunked,
+    format_queryset_data,
+    get_related_loaders,
+    iter_queryset_data,
+)
+from drfwn_quick.metrics import QuickMetrics, phase, report_metrics
+from drfwn_quick.parallel import run_parallel
+from drfwn_quick.plan import QuickPlan, build_quick_plan
+from drfwn_quick.routers import get_read_alias, reading_from
+from drfwn_quick.settings import (
+    CACHE_RELATED,
+    ENGINE,
+    FETCH_STRATEGY,
+    MAX_DEPTH,
+    METRICS,
+    PARALLEL_WORKERS,
+    READ_ALIAS,
+    REFERENCED_ONLY,
+    STREAMING_CHUNK_SIZE,
+)
+from drfwn_quick.utils import (
+    aget_instance_ids,
+    determine_fields,
+    determine_quick,
+    get_instance_ids,
+    order_by_ids,
+)
+
+
+# Narrowed plans kept at most, across serializers, see get_quick_plan.
+NARROWED_PLANS_MAX_SIZE = 256
+
+
+@functools.lru_cache(maxsize=NARROWED_PLANS_MAX_SIZE)
+def get_narrowed_quick_plan(
+    serializer_class: type["QuickableNestedModelSerializer"],
+    fields: frozenset[str] | None,
+    expand: frozenset[str] | None,
+) -> QuickPlan:
+    """Get a serializer's QuickPlan narrowed to fields and expand."""
+    return serializer_class.get_quick_plan().narrow(fields, expand)
 
 
 class QuickableNestedModelSerializer(WritableNestedModelSerializer):
+    # If true, only related rows referenced by the serialized rows are loaded.
+    load_referenced_only = REFERENCED_ONLY
+    # Either "join" or "prefetch", see format_queryset_data.
+    fetch_strategy = FETCH_STRATEGY
+    # Either "rows" or "columns", see format_queryset_data.
+    quick_engine = ENGINE
+    # If true, related datasets are cached between requests, see
+    # drfwn_quick.cache.RelatedDatasetCache.
+    cache_related = CACHE_RELATED
+    # Levels of relations to expand, following nested quick serializers.
+    quick_depth = MAX_DEPTH
+    # If true, quick serialization is measured, see drfwn_quick.metrics.
+    collect_metrics = METRICS
+    # Threads to run related and base queries on, see drfwn_quick.parallel.
+    parallel_workers = PARALLEL_WORKERS
+    # The database alias quick data is read from, e.g. a replica, see
+    # get_quick_read_alias. None to read as Django's routers do.
+    quick_read_alias = READ_ALIAS
+
     def __init__(
         self,
-        instance: list[Model] | int | None = None,
+        instance: list[Model | dict | int] | Model | int | None = None,
         data: dict | empty = empty,
         force_quick: bool = False,
         **kwargs,
     ) -> None:
         request = kwargs.get("context", {}).get("request", None)
+        # Fields and relations to expand, see get_quick_plan.
+        self.quick_fields, self.quick_expand = (
+            (None, None) if request is None else determine_fields(request)
+        )
         self.quick = force_quick or (
-            determine_quick(request)
+            # No request when declared as a nested serializer.
+            request is not None
+            and determine_quick(request)
             # Only use quick on GET unless forced.
             and request.method == "GET"
         )
+        self.quick_metrics = None
         if self.quick:
-            field_names = [
-                f.name for f in self.Meta.model._meta.get_fields()
-                if isinstance(f, Field)
-            ]
-            self._ensure_related_querysets()
-            related_datasets = {
-                k: {i["id"]: i for i in qs.values()}
-                for k, qs in self.related_querysets.items()
-            }
-            if not hasattr(self, "queryset"):
-                warnings.warn(
-                    f"Queryset not defined for model {self.Meta.model}"
-                    f" in serializer {self.__class__}. Setting it now"
-                    " for this request, define it in the serializer to"
-                    " increase performance."
-                )
-                self.queryset = self.Meta.model.objects.all()
-            queryset = self.queryset
-            # If given an instance, filter by IDs.
-            if instance:
-                if type(instance) is int:
-                    ids = [instance]
-                else:
-                    try:
-                        ids = [instance.id]
-                    except AttributeError:
-                        ids = [i.id for i in instance]
-                queryset = queryset.filter(id__in=ids)
-            data = format_queryset_data(field_names, queryset, related_datasets)
+            metrics = (
+                QuickMetrics(self.__class__.__name__)
+                if self.collect_metrics else None
+            )
+            with (
+                metrics.count_queries() if metrics else nullcontext(),
+                reading_from(self.get_quick_read_alias(request)),
+            ):
+                data = self.get_quick_data(instance, metrics)
+            if metrics is not None:
+                self.quick_metrics = metrics
+                # Viewsets report after rendering, to include it.
+                context = kwargs.get("context", {})
+                if not context.get("defer_quick_metrics", False):
+                    report_metrics(metrics)
         super().__init__(instance, data, **kwargs)
         if data is not empty:
             self.is_valid()
         self._quick_data = data
 
-    def _ensure_related_querysets(self) -> None:
-        """Check if related querysets are defined, if not, set them."""
-        self.related_querysets = getattr(self, "related_querysets", {})
-        rels = {
-            f.name: f.related_model for f in self.Meta.model._meta.get_fields()
-            if f.is_relation
-        }
-        for rel_name, rel_model in rels.items():
-            if rel_name not in self.related_querysets.keys():
-                warnings.warn(
-                    f"Relation \"{rel_name}\" in serializer"
-                    f" {self.__class__} for {self.Meta.model}"
-                    " is not defined in the serializer's related_querysets."
-                    " Setting it now for this request, define it in the"
-                    " serializer to increase performance."
+    def get_quick_data(
+        self,
+        instance: list[Model | dict | int] | Model | int | None = None,
+        metrics: QuickMetrics | None = None,
+        referenced_only: bool | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get quick data, for the instance's rows if given. If referenced_only
+        is given, it overrides load_referenced_only, e.g. for a few rows.
+        """
+        plan = self.get_quick_plan(self.quick_fields, self.quick_expand)
+        related_cache = self.get_related_cache()
+        # Related datasets are loaded along with the serialized rows.
+        related_loaders, related_querysets = self.get_related_loaders(
+            plan,
+            related_cache,
+            metrics,
+            referenced_only,
+        )
+        queryset = plan.queryset
+        # If given an instance, filter by IDs.
+        ids = get_instance_ids(instance) if instance is not None else None
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        data = format_queryset_data(
+            list(plan.field_names),
+            queryset,
+            {},
+            related_querysets,
+            self.fetch_strategy,
+            plan=plan,
+            related_cache=related_cache,
+            depth=self.quick_depth,
+            metrics=metrics,
+            engine=self.quick_engine,
+            related_loaders=related_loaders,
+            workers=self.parallel_workers,
+        )
+        # Keep the instance's order, e.g. a page's, rather than the
+        # serializer queryset's.
+        if ids is not None:
+            order_by_ids(data, ids)
+        return data
+
+    @classmethod
+    async def aget_quick_data(
+        cls,
+        instance: list[Model | dict | int] | Model | int | None = None,
+        metrics: QuickMetrics | None = None,
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        As get_quick_data, fetching with Django's async queryset methods,
+        see drfwn_quick.data.aformat_queryset_data. See get_quick_plan for
+        fields and expand.
+        """
+        plan = cls.get_quick_plan(fields, expand)
+        related_cache = cls.get_related_cache()
+        related_datasets = {}
+        related_querysets = None
+        if cls.load_referenced_only:
+            related_querysets = plan.related_querysets
+        else:
+            with phase(metrics, "related"):
+                loaded = await asyncio.gather(
+                    *[
+                        aload_related_dataset(
+                            plan.related_querysets[k],
+                            cache=related_cache,
+                            columns=plan.related_columns.get(k, None),
+                            datetime_columns=(
+                                plan.get_related_datetime_columns(k)
+                            ),
+                        )
+                        for k in plan.expanded_names
+                    ]
                 )
-                self.related_querysets[rel_name] = rel_model.objects.all()
+            related_datasets = dict(zip(plan.expanded_names, loaded))
+            if metrics is not None:
+                metrics.count_related_rows(related_datasets)
+        queryset = plan.queryset
+        ids = None
+        if instance is not None:
+            ids = await aget_instance_ids(instance)
+            queryset = queryset.filter(id__in=ids)
+        data = await aformat_queryset_data(
+            list(plan.field_names),
+            queryset,
+            related_datasets,
+            related_querysets,
+            cls.fetch_strategy,
+            plan=plan,
+            related_cache=related_cache,
+            depth=cls.quick_depth,
+            metrics=metrics,
+            engine=cls.quick_engine,
+        )
+        if ids is not None:
+            order_by_ids(data, ids)
+        return data
+
+    @classmethod
+    def get_quick_fingerprint(
+        cls,
+        instance: QuerySet | list[Model | dict | int] | Model | int,
+        key: tuple = (),
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+    ) -> tuple[str, datetime | None] | None:
+        """
+        Get a fingerprint of the quick data for an instance's rows, and
+        when they were last modified, with aggregate queries only, see
+        drfwn_quick.conditional.get_fingerprint. None if it can't be.
+        """
+        plan = cls.get_quick_plan(fields, expand)
+        if isinstance(instance, QuerySet):
+            ids = None
+            queryset = plan.queryset.filter(id__in=instance.values("id"))
+        else:
+            # The order of the rows is only given by their IDs.
+            ids = get_instance_ids(instance)
+            queryset = plan.queryset.filter(id__in=ids)
+        return get_fingerprint(
+            plan,
+            queryset,
+            cls.quick_depth,
+            (cls.__qualname__, ids, *key),
+        )
+
+    @classmethod
+    def get_quick_read_alias(cls, request: Any | None = None) -> str | None:
+        """
+        Get the database alias to read a request's quick data from, routed
+        by drfwn_quick.routers.QuickReadRouter, see
+        drfwn_quick.routers.get_read_alias.
+        """
+        return get_read_alias(cls.quick_read_alias, cls.Meta.model, request)
+
+    @classmethod
+    def get_quick_models(
+        cls,
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+    ) -> list[type[Model]]:
+        """
+        Get the models quick data is built from, including through models,
+        as get_quick_fingerprint covers them, whose changes invalidate
+        cached responses.
+        """
+        plan = cls.get_quick_plan(fields, expand)
+        querysets = get_fingerprint_querysets(
+            plan,
+            plan.queryset,
+            cls.quick_depth,
+        )
+        return list(dict.fromkeys(queryset.model for queryset, _ in querysets))
+
+    @classmethod
+    def get_quick_plan(
+        cls,
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+    ) -> QuickPlan:
+        """
+        Get the class's QuickPlan, compiling it on first use.
+
+        If fields or expand are given, the plan is narrowed to them, see
+        QuickPlan.narrow. Unknown names are ignored. Narrowed plans are
+        cached, least recently used first out, see get_narrowed_quick_plan.
+        """
+        # Checked in the class's own namespace, plans aren't inherited.
+        plan = cls.__dict__.get("_quick_plan", None)
+        if plan is None:
+            plan = build_quick_plan(cls)
+            cls._quick_plan = plan
+        if fields is None and expand is None:
+            return plan
+        # Known names only, so that unknown ones don't make new entries.
+        return get_narrowed_quick_plan(
+            cls,
+            None if fields is None else (
+                frozenset(fields) & {name for name, _ in plan.columns}
+            ),
+            None if expand is None else (
+                frozenset(expand) & plan.expandable_names
+            ),
+        )
+
+    @classmethod
+    def get_bulk_serializer_class(
+        cls,
+    ) -> type["QuickableNestedModelSerializer"]:
+        """Get the class's bulk write serializer, making it on first use."""
+        # As plans, bulk serializers aren't inherited.
+        bulk_class = cls.__dict__.get("_bulk_serializer_class", None)
+        if bulk_class is None:
+            bulk_class = make_bulk_serializer_class(cls)
+            cls._bulk_serializer_class = bulk_class
+        return bulk_class
+
+    @classmethod
+    def get_related_cache(cls) -> RelatedDatasetCache | None:
+        """Get the cache for related datasets, if caching is enabled."""
+        return related_dataset_cache if cls.cache_related else None
+
+    @classmethod
+    def get_related_loaders(
+        cls,
+        plan: QuickPlan,
+        related_cache: RelatedDatasetCache | None = None,
+        metrics: QuickMetrics | None = None,
+        referenced_only: bool | None = None,
+    ) -> tuple[
+        dict[str, Callable[[], DATASET]],
+        Mapping[str, QuerySet] | None,
+    ]:
+        """
+        Get functions to load the related datasets that are loaded in full,
+        up front. If only referenced rows are loaded, there are none, and the
+        related querysets to load them from are given instead.
+
+        If referenced_only is given, it overrides load_referenced_only.
+        """
+        if referenced_only is None:
+            referenced_only = cls.load_referenced_only
+        if referenced_only:
+            return {}, plan.related_querysets
+        return get_related_loaders(plan, related_cache, metrics), None
+
+    @classmethod
+    def get_related_datasets(
+        cls,
+        plan: QuickPlan,
+        related_cache: RelatedDatasetCache | None = None,
+        metrics: QuickMetrics | None = None,
+        referenced_only: bool | None = None,
+    ) -> tuple[dict[str, DATASET], Mapping[str, QuerySet] | None]:
+        """Load the related datasets given by get_related_loaders."""
+        related_loaders, related_querysets = cls.get_related_loaders(
+            plan,
+            related_cache,
+            metrics,
+            referenced_only,
+        )
+        related_datasets = dict(
+            zip(
+                related_loaders.keys(),
+                run_parallel(
+                    list(related_loaders.values()),
+                    cls.parallel_workers,
+                    metrics,
+                ),
+            )
+        )
+        return related_datasets, related_querysets
+
+    @classmethod
+    def iter_quick_data(
+        cls,
+        queryset: QuerySet | None = None,
+        chunk_size: int = STREAMING_CHUNK_SIZE,
+        fields: frozenset[str] | None = None,
+        expand: frozenset[str] | None = None,
+        referenced_only: bool | None = None,
+        ids: list[int] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield quick data for a queryset (or the serializer's queryset),
+        fetched and formatted in chunks of chunk_size rows. See
+        get_quick_plan for fields and expand. If referenced_only is given,
+        it overrides load_referenced_only, e.g. to load related rows per
+        chunk rather than in full.
+
+        If ids are given, e.g. a page's, only those rows are yielded, in
+        the order of ids rather than the queryset's, a chunk of ids at a
+        time.
+        """
+        plan = cls.get_quick_plan(fields, expand)
+        related_cache = cls.get_related_cache()
+        related_datasets, related_querysets = cls.get_related_datasets(
+            plan,
+            related_cache,
+            referenced_only=referenced_only,
+        )
+        if queryset is None:
+            queryset = plan.queryset
+        querysets = [(queryset, None)]
+        if ids is not None:
+            querysets = [
+                (queryset.filter(id__in=ids_chunk), ids_chunk)
+                for ids_chunk in chunked(ids, chunk_size)
+            ]
+        for chunk_queryset, ids_chunk in querysets:
+            rows = iter_queryset_data(
+                list(plan.field_names),
+                chunk_queryset,
+                related_datasets,
+                related_querysets,
+                plan=plan,
+                related_cache=related_cache,
+                depth=cls.quick_depth,
+                chunk_size=chunk_size,
+                engine=cls.quick_engine,
+                workers=cls.parallel_workers,
+            )
+            if ids_chunk is None:
+                yield from rows
+                continue
+            rows = list(rows)
+            order_by_ids(rows, ids_chunk)
+            yield from rows
 
     @property
     def data(self) -> list[dict[str, Any]] | ReturnDict:
@@ -3,9 +3,84 @@ from django.conf import settings
 
 ALWAYS_QUICK = getattr(settings, "DRFWN_QUICK_ALWAYS", False)
 
+BULK_WRITES = getattr(settings, "DRFWN_QUICK_BULK_WRITES", False)
+
+CACHE_RELATED = getattr(settings, "DRFWN_QUICK_CACHE_RELATED", False)
+RELATED_CACHE_ALIAS = getattr(settings, "DRFWN_QUICK_RELATED_CACHE_ALIAS", None)
+RELATED_CACHE_MAX_SIZE = getattr(
+    settings,
+    "DRFWN_QUICK_RELATED_CACHE_MAX_SIZE",
+    1024,
+)
+RELATED_CACHE_TIMEOUT = getattr(
+    settings,
+    "DRFWN_QUICK_RELATED_CACHE_TIMEOUT",
+    300,
+)
+
+CONDITIONAL = getattr(settings, "DRFWN_QUICK_CONDITIONAL", False)
+
+READ_ALIAS = getattr(settings, "DRFWN_QUICK_READ_ALIAS", None)
+READ_STICKY_COOKIE_NAME = getattr(
+    settings,
+    "DRFWN_QUICK_READ_STICKY_COOKIE_NAME",
+    "quick_read_primary",
+)
+READ_STICKY_SECONDS = getattr(settings, "DRFWN_QUICK_READ_STICKY_SECONDS", 5)
+
+RESPONSE_CACHE = getattr(settings, "DRFWN_QUICK_RESPONSE_CACHE", False)
+RESPONSE_CACHE_ALIAS = getattr(
+    settings,
+    "DRFWN_QUICK_RESPONSE_CACHE_ALIAS",
+    None,
+)
+RESPONSE_CACHE_MAX_SIZE = getattr(
+    settings,
+    "DRFWN_QUICK_RESPONSE_CACHE_MAX_SIZE",
+    256,
+)
+RESPONSE_CACHE_TIMEOUT = getattr(
+    settings,
+    "DRFWN_QUICK_RESPONSE_CACHE_TIMEOUT",
+    300,
+)
+
 DATETIME_FORMAT = getattr(settings, "DRFWN_QUICK_DATETIME_FORMAT", "%Y/%m/%d")
 HANDLE_DATETIMES = getattr(settings, "DRFWN_QUICK_HANDLE_DATETIMES", True)
 
+ENGINE = getattr(settings, "DRFWN_QUICK_ENGINE", "rows")
+FETCH_STRATEGY = getattr(settings, "DRFWN_QUICK_FETCH_STRATEGY", "join")
+ID_CHUNK_SIZE = getattr(settings, "DRFWN_QUICK_ID_CHUNK_SIZE", 500)
+MAX_DEPTH = getattr(settings, "DRFWN_QUICK_MAX_DEPTH", 1)
+PARALLEL_WORKERS = getattr(settings, "DRFWN_QUICK_PARALLEL_WORKERS", 1)
+REFERENCED_ONLY = getattr(settings, "DRFWN_QUICK_REFERENCED_ONLY", False)
+
+METRICS = getattr(settings, "DRFWN_QUICK_METRICS", False)
+METRICS_CALLBACK = getattr(settings, "DRFWN_QUICK_METRICS_CALLBACK", None)
+SERVER_TIMING = getattr(settings, "DRFWN_QUICK_SERVER_TIMING", False)
+
+STREAMING = getattr(settings, "DRFWN_QUICK_STREAMING", False)
+STREAMING_CHUNK_SIZE = getattr(
+    settings,
+    "DRFWN_QUICK_STREAMING_CHUNK_SIZE",
+    2000,
+)
+STREAMING_MIN_PAGE_SIZE = getattr(
+    settings,
+    "DRFWN_QUICK_STREAMING_MIN_PAGE_SIZE",
+    1000,
+)
+
+URL_EXPAND_PARAM_NAME = getattr(
+    settings,
+    "DRFWN_QUICK_URL_EXPAND_PARAM_NAME",
+    "expand",
+)
+URL_FIELDS_PARAM_NAME = getattr(
+    settings,
+    "DRFWN_QUICK_URL_FIELDS_PARAM_NAME",
+    "fields",
+)
 URL_PAGE_PARAM_NAME = getattr(
     settings,
     "DRFWN_QUICK_URL_PAGE_PARAM_NAME",
@@ -1,9 +1,18 @@
 import json
 import warnings
+from typing import Any, Iterable, Iterator
 
+from django.db.models import Model
+from django.db.models.query import QuerySet
 from rest_framework.request import Request
 
-from drfwn_quick.settings import ALWAYS_QUICK, URL_QUICK_PARAM_NAME
+from drfwn_quick.renderers import encode_json
+from drfwn_quick.settings import (
+    ALWAYS_QUICK,
+    URL_EXPAND_PARAM_NAME,
+    URL_FIELDS_PARAM_NAME,
+    URL_QUICK_PARAM_NAME,
+)
 
 
 def determine_quick(request: Request) -> bool:
@@ -19,3 +28,103 @@ def determine_quick(request: Request) -> bool:
         return True
     else:
         return False
+
+
+def parse_names(value: str | None) -> frozenset[str] | None:
+    """Parse comma separated names, None if not given."""
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+
+def determine_fields(
+    request: Request,
+) -> tuple[frozenset[str] | None, frozenset[str] | None]:
+    """
+    Get the fields to output, and relations to expand, that a request asks
+    for with URL args of comma separated names. None for either if not
+    given, for all of them.
+    """
+    return (
+        parse_names(request.query_params.get(URL_FIELDS_PARAM_NAME, None)),
+        parse_names(request.query_params.get(URL_EXPAND_PARAM_NAME, None)),
+    )
+
+
+def get_instance_ids(
+    instance: int | Model | dict[str, Any] | Iterable[Any],
+) -> list[int]:
+    """
+    Get the IDs of a serializer's instance, in order.
+
+    The instance may be an ID, a model instance, a row from
+    queryset.values(), or an iterable of any of those, e.g. a page. Querysets
+    are read for their IDs only, without building model instances.
+    """
+    if isinstance(instance, QuerySet):
+        return list(instance.values_list("id", flat=True))
+    if isinstance(instance, (int, dict)):
+        instance = [instance]
+    elif hasattr(instance, "id"):
+        return [instance.id]
+    return [
+        item if isinstance(item, int)
+        else item["id"] if isinstance(item, dict)
+        else item.id
+        for item in instance
+    ]
+
+
+async def aget_instance_ids(
+    instance: int | Model | dict[str, Any] | Iterable[Any],
+) -> list[int]:
+    """As get_instance_ids, reading querysets with async iteration."""
+    if isinstance(instance, QuerySet):
+        return [
+            row_id async for row_id in instance.values_list("id", flat=True)
+        ]
+    return get_instance_ids(instance)
+
+
+def order_by_ids(rows: list[dict[str, Any]], ids: list[int]) -> None:
+    """Sort rows in place into the order of their IDs in ids."""
+    if len(ids) > 1:
+        positions = {row_id: i for i, row_id in enumerate(ids)}
+        rows.sort(key=lambda row: positions.get(row.get("id"), 0))
+
+
+def stream_json(
+    rows: Iterable[Any],
+    envelope: dict[str, Any] | None = None,
+    results_key: str = "results",
+    batch_size: int = 100,
+) -> Iterator[bytes]:
+    """
+    Encode rows as a JSON list incrementally, as DRF's JSONRenderer would.
+
+    If an envelope is given (e.g. a paginated response's data), the list
+    is placed under its results_key instead, which must be its last key.
+    Rows are yielded in batches of batch_size to avoid many tiny writes.
+    """
+    if envelope is None:
+        prefix = b"["
+        suffix = b"]"
+    else:
+        if list(envelope.keys())[-1] != results_key:
+            raise ValueError(f"Envelope must end with {results_key}.")
+        head = encode_json(
+            {k: v for k, v in envelope.items() if k != results_key}
+        )
+        prefix = head[:-1] + (b"," if len(head) > 2 else b"")
+        prefix += encode_json(results_key) + b":["
+        suffix = b"]}"
+    batch = [prefix]
+    separator = b""
+    for row in rows:
+        batch.append(separator + encode_json(row))
+        separator = b","
+        if len(batch) >= batch_size:
+            yield b"".join(batch)
+            batch = []
+    batch.append(suffix)
+    yield b"".join(batch)
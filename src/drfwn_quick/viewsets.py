@@ -1,18 +1,106 @@
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Sequence
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.decorators import classonlymethod
+from django.utils.http import http_date
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import BaseRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import ListSerializer
 from rest_framework.viewsets import ModelViewSet
 
+from drfwn_quick.bulk import bulk_save, check_related_ids, check_unique_rows
+from drfwn_quick.cache import response_cache
+from drfwn_quick.metrics import QuickMetrics, report_metrics
+from drfwn_quick.renderers import QuickJSONRenderer
+from drfwn_quick.routers import (
+    get_read_alias,
+    iter_reading_from,
+    make_sticky,
+    reading_from,
+)
 from drfwn_quick.serializers import QuickableNestedModelSerializer
-from drfwn_quick.settings import URL_PAGE_PARAM_NAME
-from drfwn_quick.utils import determine_quick
+from drfwn_quick.settings import (
+    BULK_WRITES,
+    CONDITIONAL,
+    READ_ALIAS,
+    RESPONSE_CACHE,
+    SERVER_TIMING,
+    STREAMING,
+    STREAMING_CHUNK_SIZE,
+    STREAMING_MIN_PAGE_SIZE,
+    URL_PAGE_PARAM_NAME,
+)
+from drfwn_quick.utils import (
+    determine_fields,
+    determine_quick,
+    get_instance_ids,
+    stream_json,
+)
 
 
 class QuickPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that, on quick requests, pages IDs from
+    queryset.values_list() rather than model instances. The quick serializer
+    fetches its data for those IDs.
+    """
+    page_size_query_param = URL_PAGE_PARAM_NAME
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        view: Any | None = None,
+    ) -> list[Model | int] | None:
+        if determine_quick(request):
+            queryset = queryset.values_list("id", flat=True)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class QuickCursorPagination(CursorPagination):
+    """
+    Cursor pagination, which pages on an indexed ordering key rather than
+    an offset, so deep pages cost the same as the first, and never counts.
+
+    On quick requests, pages are of rows with only the ID and the ordering
+    key, from queryset.values(), rather than model instances. The quick
+    serializer fetches its data for those IDs.
+    """
     page_size_query_param = URL_PAGE_PARAM_NAME
+    ordering = "-id"
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        view: Any | None = None,
+    ) -> list[Model | dict[str, Any]] | None:
+        if determine_quick(request):
+            ordering = self.get_ordering(request, queryset, view)
+            queryset = queryset.values(
+                *dict.fromkeys(["id", ordering[0].lstrip("-")])
+            )
+        return super().paginate_queryset(queryset, request, view)
 
 
 class QuickableNestedModelViewSet(ModelViewSet):
@@ -23,6 +111,27 @@ class QuickableNestedModelViewSet(ModelViewSet):
     raise errors attempting to handled nested representations.
     """
     pagination_class = QuickPageNumberPagination
+    # If true, large quick list responses are streamed, see stream_list.
+    quick_streaming = STREAMING
+    # Preferred for quick requests, see get_renderers. None to disable.
+    quick_renderer_class = QuickJSONRenderer
+    # If true, lists of rows can be written at once, see bulk.
+    bulk_writes = BULK_WRITES
+    # If true, quick list and retrieve responses carry an ETag, and are
+    # answered with 304 Not Modified if unchanged, see
+    # get_quick_fingerprint.
+    quick_conditional = CONDITIONAL
+    # If true, rendered quick list and retrieve responses are cached until
+    # a row they are built from changes, see get_cached_response.
+    quick_response_cache = RESPONSE_CACHE
+    # If true, cached responses are per user, for views whose rows or
+    # fields depend on who asks.
+    quick_response_cache_per_user = False
+    # Response headers cached along with the rendered content.
+    quick_response_cache_headers = ("Content-Type", "ETag", "Last-Modified")
+    # The database alias quick requests are read from, e.g. a replica, see
+    # get_quick_read_alias. None to read as Django's routers do.
+    quick_read_alias = READ_ALIAS
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -35,11 +144,267 @@ class QuickableNestedModelViewSet(ModelViewSet):
                 " QuickableNestedModelSerializer serializer."
             )
 
+    def list(
+        self,
+        request: Request,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        """
+        Standard list, unless streaming is enabled and the request is quick
+        and either unpaginated or for a large page, then it is streamed.
+
+        If quick_response_cache is set and the request is quick, a cached
+        response is returned if there is one, see get_cached_response.
+
+        If quick_conditional is set and the request is quick, the rows are
+        fingerprinted before their quick data is fetched, and if unchanged,
+        answered with 304 Not Modified instead.
+
+        Quick requests are read from get_quick_read_alias.
+        """
+        quick = determine_quick(request)
+        with reading_from(self.get_quick_read_alias() if quick else None):
+            if self.quick_streaming and quick:
+                page_size = (
+                    None if self.paginator is None
+                    else self.paginator.get_page_size(request)
+                )
+                if page_size is None or page_size >= STREAMING_MIN_PAGE_SIZE:
+                    return self.stream_list(request)
+            if self.quick_response_cache and quick:
+                response = self.get_cached_response()
+                if response is not None:
+                    return response
+            if not (self.quick_conditional and quick):
+                return super().list(request, *args, **kwargs)
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            instance = queryset if page is None else page
+            fingerprint = self.get_quick_fingerprint(
+                instance,
+                page is not None,
+            )
+            response = self.get_not_modified_response(fingerprint)
+            if response is not None:
+                return response
+            serializer = self.get_serializer(instance, many=True)
+            if page is not None:
+                response = self.get_paginated_response(serializer.data)
+            else:
+                response = Response(serializer.data)
+            self.set_validators(response, fingerprint)
+            return response
+
+    def retrieve(
+        self,
+        request: Request,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        """
+        Standard retrieve, unless quick_response_cache or quick_conditional
+        is set and the request is quick, then handled as list is. The object
+        is fetched first so that its permissions are always checked. Quick
+        requests are read from get_quick_read_alias.
+        """
+        quick = determine_quick(request)
+        with reading_from(self.get_quick_read_alias() if quick else None):
+            if not (
+                (self.quick_response_cache or self.quick_conditional)
+                and quick
+            ):
+                return super().retrieve(request, *args, **kwargs)
+            instance = self.get_object()
+            if self.quick_response_cache:
+                response = self.get_cached_response()
+                if response is not None:
+                    return response
+            fingerprint = None
+            if self.quick_conditional:
+                fingerprint = self.get_quick_fingerprint(instance)
+            response = self.get_not_modified_response(fingerprint)
+            if response is not None:
+                return response
+            response = Response(self.get_serializer(instance).data)
+            self.set_validators(response, fingerprint)
+            return response
+
+    def get_quick_read_alias(self) -> str | None:
+        """
+        Get the database alias to read the request's quick data from, see
+        drfwn_quick.routers.get_read_alias.
+        """
+        if self.quick_read_alias is None:
+            return None
+        return get_read_alias(
+            self.quick_read_alias,
+            self.get_serializer_class().Meta.model,
+            self.request,
+        )
+
+    def get_response_cache_key(self) -> tuple[str, str]:
+        """
+        Get the response cache key of the request, covering its serializer
+        class, URL (so its filters, page, fields and expansion), media type
+        and, if quick_response_cache_per_user is set, user, along with the
+        generations of every model its quick data is built from.
+        """
+        serializer_class = self.get_serializer_class()
+        user = getattr(self.request, "user", None)
+        parts = (
+            f"{serializer_class.__module__}.{serializer_class.__qualname__}",
+            self.request.get_full_path(),
+            self.request.accepted_media_type,
+            (
+                getattr(user, "pk", None)
+                if self.quick_response_cache_per_user else None
+            ),
+        )
+        return response_cache.get_key(
+            serializer_class.get_quick_models(*determine_fields(self.request)),
+            parts,
+        )
+
+    def get_cached_response(self) -> HttpResponseBase | None:
+        """
+        Get the cached rendered response to the request, if any, or if
+        quick_conditional is set and its ETag matches, 304 Not Modified.
+
+        On a miss, the key is kept so that finalize_response caches the
+        response once rendered. Entries are invalidated whenever a row of a
+        model the quick data is built from is saved or deleted, or links
+        change, see drfwn_quick.cache.
+        """
+        self.response_cache_key = key = self.get_response_cache_key()
+        cached = response_cache.get(key)
+        if cached is None:
+            return None
+        self.response_cache_key = None
+        content, headers = cached
+        response = None
+        if self.quick_conditional and "ETag" in headers:
+            response = get_conditional_response(
+                self.request,
+                etag=headers["ETag"],
+            )
+        if response is None:
+            response = HttpResponse(content)
+        for name, value in headers.items():
+            if response.status_code == 200 or name != "Content-Type":
+                response[name] = value
+        return response
+
+    def cache_response(self, response: Response) -> None:
+        """Render a response and cache it, if it is successful."""
+        key = getattr(self, "response_cache_key", None)
+        self.response_cache_key = None
+        if key is None or response.status_code != status.HTTP_200_OK:
+            return
+        response.render()
+        response_cache.set(
+            key,
+            (
+                response.content,
+                {
+                    name: response[name]
+                    for name in self.quick_response_cache_headers
+                    if response.has_header(name)
+                },
+            ),
+        )
+
+    def get_quick_fingerprint(
+        self,
+        instance: QuerySet | Sequence[Model | dict | int] | Model,
+        paginated: bool = False,
+    ) -> tuple[str, datetime | None] | None:
+        """
+        Get a fingerprint of the quick data for an instance's rows, see
+        QuickableNestedModelSerializer.get_quick_fingerprint, that also
+        covers the request's URL and media type, and if paginated, the rest
+        of the page's response, e.g. its count.
+        """
+        key = (self.request.get_full_path(), self.request.accepted_media_type)
+        if paginated:
+            key += (self.get_paginated_response([]).data,)
+        return self.get_serializer_class().get_quick_fingerprint(
+            instance,
+            key,
+            *determine_fields(self.request),
+        )
+
+    def get_not_modified_response(
+        self,
+        fingerprint: tuple[str, datetime | None] | None,
+    ) -> HttpResponseNotModified | None:
+        """
+        Get a 304 Not Modified response if the request's If-None-Match
+        matches the fingerprint's ETag.
+
+        If-Modified-Since isn't checked, as removing a row doesn't change the
+        latest time rows were modified, only the ETag.
+        """
+        if fingerprint is None:
+            return None
+        response = get_conditional_response(
+            self.request,
+            etag=quote_etag(fingerprint[0]),
+        )
+        if response is not None:
+            self.set_validators(response, fingerprint)
+        return response
+
+    def set_validators(
+        self,
+        response: HttpResponseBase,
+        fingerprint: tuple[str, datetime | None] | None,
+    ) -> None:
+        """Set a response's ETag and Last-Modified from a fingerprint."""
+        if fingerprint is None:
+            return
+        etag, last_modified = fingerprint
+        response["ETag"] = quote_etag(etag)
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+
+    def stream_list(self, request: Request) -> StreamingHttpResponse:
+        """
+        List quick data as a streamed JSON response.
+
+        Rows are fetched, formatted and encoded in chunks as the response is
+        sent, so memory use stays flat regardless of the number of rows.
+        """
+        self.quick = True
+        queryset = self.filter_queryset(self.get_queryset())
+        envelope = None
+        ids = None
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            # Fetched in the page's order, as cursor pages aren't
+            # necessarily in the queryset's.
+            ids = get_instance_ids(page)
+            envelope = self.get_paginated_response([]).data
+        # Rows are fetched as the response is sent, after list returns.
+        rows = iter_reading_from(
+            self.get_quick_read_alias(),
+            self.get_serializer_class().iter_quick_data(
+                queryset,
+                STREAMING_CHUNK_SIZE,
+                *determine_fields(request),
+                ids=ids,
+            ),
+        )
+        return StreamingHttpResponse(
+            stream_json(rows, envelope),
+            content_type="application/json",
+        )
+
     def update(self, request: Request, *args, **kwargs) -> Response:
         """
         Slightly modified version of update that follows standard logic but
-        if self.quick is set, instantiates a serializer forcing quick after
-        update is finished, so that the returned data is detailed.
+        if self.quick is set, returns the updated row in quick format, see
+        get_written_quick_data.
         """
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -54,36 +419,143 @@ class QuickableNestedModelViewSet(ModelViewSet):
             # If 'prefetch_related' has been applied to a queryset, we need to
             # forcibly invalidate the prefetch cache on the instance.
             instance._prefetched_objects_cache = {}
-        data = serializer.data
-        # Re-serializer data, forcing quick format, if given.
+        # Quick format the written row, if given, rather than serializing it.
         if self.quick:
-            data = serializer.__class__(
-                instance=instance,
-                data=data,
-                force_quick=True,
-            ).data
+            data = self.get_written_quick_data(serializer)
+        else:
+            data = serializer.data
         return Response(data)
 
     def create(self, request: Request, *args, **kwargs) -> Response:
         """
         Slightly modified version of create that follows standard logic but
-        if self.quick is set, instantiates a serializer forcing quick after
-        create is finished, so that the returned data is detailed.
+        if self.quick is set, returns the created row in quick format, see
+        get_written_quick_data.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        data = serializer.data
-        # Re-serializer data, forcing quick format, if given.
+        # Quick format the written row, if given, rather than serializing it.
         if self.quick:
-            data = serializer.__class__(
-                instance=data["id"],
-                data=data,
-                force_quick=True,
-            ).data
+            data = self.get_written_quick_data(serializer)
+            headers = self.get_success_headers(data[0] if data else {})
+        else:
+            data = serializer.data
+            headers = self.get_success_headers(data)
         return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @action(detail=False, methods=["post", "put", "patch"], url_path="bulk")
+    def bulk(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Create (POST) or update (PUT, PATCH) a list of rows at once, if
+        bulk_writes is set. Rows to update are identified by their "id".
+
+        Rows are validated in one pass, with relations given as related IDs
+        (or rows with IDs) that are linked rather than written, then saved
+        with bulk queries in one transaction, see drfwn_quick.bulk. If quick
+        is set, the rows are returned in quick format with one fetch.
+        """
+        if not self.bulk_writes:
+            raise NotFound()
+        serializer_class = self.get_serializer_class()
+        instances = None
+        if request.method != "POST":
+            instances = self.get_bulk_instances(request.data)
+        serializer = serializer_class.get_bulk_serializer_class()(
+            instances,
+            data=request.data,
+            many=True,
+            partial=request.method == "PATCH",
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        plan = serializer_class.get_quick_plan()
+        if instances is not None:
+            instances = [instances[row["id"]] for row in request.data]
+        check_related_ids(serializer.validated_data, plan.related_querysets)
+        check_unique_rows(plan.model, serializer.validated_data, instances)
+        objs = bulk_save(plan.model, serializer.validated_data, instances)
+        self.quick = determine_quick(request)
+        if self.quick:
+            data = self.get_written_quick_data(
+                serializer_class(objs, context=self.get_serializer_context())
+            )
+        else:
+            data = serializer_class(
+                objs,
+                many=True,
+                context=self.get_serializer_context(),
+            ).data
+        return Response(
+            data,
+            status=(
+                status.HTTP_201_CREATED if instances is None
+                else status.HTTP_200_OK
+            ),
+        )
+
+    def get_bulk_instances(self, data: Any) -> dict[int, Model]:
+        """
+        Get the instances a bulk update's rows are for, by ID, with one
+        query, checking object permissions for each.
+        """
+        if not isinstance(data, list):
+            raise ValidationError(
+                {"non_field_errors": ["Expected a list of rows."]}
+            )
+        ids = []
+        errors = []
+        for row in data:
+            row_id = row.get("id", None) if isinstance(row, dict) else None
+            if not isinstance(row_id, int) or isinstance(row_id, bool):
+                errors.append({"id": ["An ID is required."]})
+            elif row_id in ids:
+                errors.append({"id": ["Duplicate ID."]})
+            else:
+                errors.append({})
+            ids.append(row_id)
+        valid_ids = [
+            row_id for row_id, row_errors in zip(ids, errors)
+            if not row_errors
+        ]
+        instances = self.filter_queryset(self.get_queryset()).in_bulk(
+            valid_ids
+        )
+        for row_id, row_errors in zip(ids, errors):
+            if not row_errors and row_id not in instances:
+                row_errors["id"] = ["Not found."]
+        if any(errors):
+            raise ValidationError(errors)
+        for instance in instances.values():
+            self.check_object_permissions(self.request, instance)
+        return instances
+
+    def get_written_quick_data(
+        self,
+        serializer: QuickableNestedModelSerializer,
+    ) -> Sequence[dict[str, Any]]:
+        """
+        Get quick data for a serializer's just written instance, loading only
+        the related rows it references, without serializing or validating it
+        again. Measured as get_serializer is, and read from the model's write
+        alias, see get_quick_read_alias.
+        """
+        metrics = (
+            QuickMetrics(serializer.__class__.__name__)
+            if serializer.collect_metrics else None
+        )
+        with (
+            metrics.count_queries() if metrics else nullcontext(),
+            reading_from(self.get_quick_read_alias()),
+        ):
+            data = serializer.get_quick_data(
+                serializer.instance,
+                metrics,
+                referenced_only=True,
+            )
+        self.quick_metrics = metrics
+        return data
+
     def get_serializer(
         self,
         *args,
@@ -102,4 +574,214 @@ class QuickableNestedModelViewSet(ModelViewSet):
                 and self.request.method == "GET"
             ):
                 kwargs.pop("many")
-        return super().get_serializer(*args, **kwargs)
+        serializer = super().get_serializer(*args, **kwargs)
+        self.quick_metrics = getattr(serializer, "quick_metrics", None)
+        return serializer
+
+    def get_renderers(self) -> Sequence[BaseRenderer]:
+        """Prepend quick_renderer_class on quick requests."""
+        renderers = super().get_renderers()
+        request = getattr(self, "request", None)
+        if (
+            self.quick_renderer_class is not None
+            and hasattr(request, "query_params")
+            and determine_quick(request)
+        ):
+            renderers.insert(0, self.quick_renderer_class())
+        return renderers
+
+    def get_serializer_context(self) -> dict[str, Any]:
+        # Quick metrics are reported in finalize_response, after rendering.
+        return {**super().get_serializer_context(), "defer_quick_metrics": True}
+
+    def finalize_response(
+        self,
+        request: Request,
+        response: Response | StreamingHttpResponse,
+        *args,
+        **kwargs,
+    ) -> Response | StreamingHttpResponse:
+        """
+        If quick metrics were collected, render the response here rather
+        than later so that rendering is measured, then report them, adding
+        a Server-Timing header if DRFWN_QUICK_SERVER_TIMING is set.
+
+        Responses missing from the response cache are cached here, after
+        rendering, see get_cached_response. Successful writes keep their
+        client reading from the primary for a while, if quick data is read
+        from a replica, see drfwn_quick.routers.make_sticky.
+        """
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+        metrics = getattr(self, "quick_metrics", None)
+        if metrics is not None and isinstance(response, Response):
+            with metrics.count_queries(), metrics.phase("render"):
+                response.render()
+            if SERVER_TIMING:
+                response["Server-Timing"] = metrics.server_timing()
+            report_metrics(metrics)
+        if isinstance(response, Response):
+            self.cache_response(response)
+        if (
+            self.quick_read_alias is not None
+            and request.method not in SAFE_METHODS
+            and response.status_code < status.HTTP_400_BAD_REQUEST
+        ):
+            make_sticky(response)
+        return response
+
+
+class AsyncQuickableNestedModelViewSet(QuickableNestedModelViewSet):
+    """
+    A QuickableNestedModelViewSet for ASGI deployments, whose views are
+    async.
+
+    Quick list and retrieve requests are handled by alist and aretrieve,
+    which fetch with Django's async queryset methods so that slow requests
+    don't each hold a thread. Everything else, including streamed lists,
+    runs the usual synchronous dispatch in a thread.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions: dict[str, str] | None = None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        # Django awaits views marked as coroutine functions.
+        return markcoroutinefunction(view)
+
+    async def dispatch(
+        self,
+        request: HttpRequest,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        """
+        As DRF's dispatch, awaiting the async handler given by
+        get_async_handler, if any, reading from get_quick_read_alias.
+        Responses to cache are finalized in a thread, see cache_response.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        handler = self.get_async_handler(drf_request)
+        if handler is None:
+            return await sync_to_async(super().dispatch)(
+                request,
+                *args,
+                **kwargs,
+            )
+        self.request = drf_request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication, permissions and throttling may query.
+            await sync_to_async(self.initial)(drf_request, *args, **kwargs)
+            with reading_from(self.get_quick_read_alias()):
+                response = await handler(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        if getattr(self, "response_cache_key", None) is None:
+            self.response = self.finalize_response(
+                drf_request,
+                response,
+                *args,
+                **kwargs,
+            )
+        else:
+            # Caching the response may query, e.g. for a database cache, so
+            # it can't run in the event loop.
+            self.response = await sync_to_async(self.finalize_response)(
+                drf_request,
+                response,
+                *args,
+                **kwargs,
+            )
+        return self.response
+
+    def get_async_handler(
+        self,
+        request: Request,
+    ) -> Callable[..., Awaitable[Response]] | None:
+        """Get the async handler for a request, if it has one."""
+        if (
+            request.method != "GET"
+            or not determine_quick(request)
+            or self.quick_streaming
+            or self.action not in ("list", "retrieve")
+        ):
+            return None
+        return getattr(self, f"a{self.action}")
+
+    async def alist(
+        self,
+        request: Request,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        """As list, for quick requests."""
+        if self.quick_response_cache:
+            response = await sync_to_async(self.get_cached_response)()
+            if response is not None:
+                return response
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        instance = queryset if page is None else page
+        fingerprint = None
+        if self.quick_conditional:
+            fingerprint = await sync_to_async(self.get_quick_fingerprint)(
+                instance,
+                page is not None,
+            )
+        response = self.get_not_modified_response(fingerprint)
+        if response is not None:
+            return response
+        data = await self.aget_quick_data(instance)
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        self.set_validators(response, fingerprint)
+        return response
+
+    async def aretrieve(
+        self,
+        request: Request,
+        *args,
+        **kwargs,
+    ) -> HttpResponseBase:
+        """As retrieve, for quick requests."""
+        instance = await sync_to_async(self.get_object)()
+        if self.quick_response_cache:
+            response = await sync_to_async(self.get_cached_response)()
+            if response is not None:
+                return response
+        fingerprint = None
+        if self.quick_conditional:
+            fingerprint = await sync_to_async(self.get_quick_fingerprint)(
+                instance,
+            )
+        response = self.get_not_modified_response(fingerprint)
+        if response is not None:
+            return response
+        response = Response(await self.aget_quick_data(instance))
+        self.set_validators(response, fingerprint)
+        return response
+
+    async def aget_quick_data(
+        self,
+        instance: QuerySet | Sequence[Model | dict | int] | Model,
+    ) -> list[dict[str, Any]]:
+        """Get quick data for an instance, measured as get_serializer is."""
+        self.quick = True
+        serializer_class = self.get_serializer_class()
+        self.quick_metrics = (
+            QuickMetrics(serializer_class.__name__)
+            if serializer_class.collect_metrics else None
+        )
+        return await serializer_class.aget_quick_data(
+            instance,
+            self.quick_metrics,
+            *determine_fields(self.request),
+        )
@@ -1,3 +1,10 @@
+SECRET_KEY = 'drfwn_quick-tests'
 INSTALLED_APPS = [
     'django.contrib.contenttypes',
-]
\ No newline at end of file
+]
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
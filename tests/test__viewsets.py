@@ -2,20 +2,41 @@
 Not certain why but if this test case runs after others, it may fail.
 Needs more investigation, for now, naming this test__viewsets.py.
 """
+import json
 import os
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import django
+from asgiref.sync import sync_to_async
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
 django.setup()
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.utils.asyncio import async_unsafe
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.serializers import ListSerializer
 
 import drfwn_quick.viewsets
+from drfwn_quick.cache import ResponseCache
+from drfwn_quick.renderers import QuickJSONRenderer
 from drfwn_quick.settings import URL_QUICK_PARAM_NAME
 from drfwn_quick.serializers import QuickableNestedModelSerializer
-from drfwn_quick.viewsets import QuickableNestedModelViewSet
+from drfwn_quick.viewsets import (
+    AsyncQuickableNestedModelViewSet,
+    QuickableNestedModelViewSet,
+    QuickCursorPagination,
+    QuickPageNumberPagination,
+)
+
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+
+class SyncOnlyCache(LocMemCache):
+    """A cache that, like a database cache, can't be used in an event loop."""
+    get_many = async_unsafe(LocMemCache.get_many)
+    set_many = async_unsafe(LocMemCache.set_many)
 
 
 class ChildQuickableNestedModelSerializer(QuickableNestedModelSerializer):
@@ -49,14 +70,22 @@ class TestQuickableNestedModelViewSet(unittest.TestCase):
             patch.object(drfwn_quick.viewsets, "Response"),
         ):
             viewset = _vset()
-            # Verifying that when quick is set, a new instance of the
-            # serializer is spawned, and if not, it isn't.
+            # Verifying that when quick is set, the updated row is fetched
+            # in quick format, and if not, it isn't.
+            mock_serializer.collect_metrics = False
             viewset.quick = False
             viewset.update(MagicMock())
-            mock_serializer.__class__.assert_not_called()
+            mock_serializer.get_quick_data.assert_not_called()
             viewset.quick = True
             viewset.update(MagicMock())
-            mock_serializer.__class__.assert_called_once()
+            # Ensure only referenced related rows are loaded, without a new
+            # serializer to validate the data again.
+            mock_serializer.get_quick_data.assert_called_once_with(
+                mock_serializer.instance,
+                None,
+                referenced_only=True,
+            )
+            mock_serializer.__class__.assert_not_called()
 
     def test_create(self) -> None:
         mock_serializer = MagicMock()
@@ -70,14 +99,61 @@ class TestQuickableNestedModelViewSet(unittest.TestCase):
             patch.object(drfwn_quick.viewsets, "Response"),
         ):
             viewset = _vset()
-            # Similar to create, check that when quick is set, a new instance
-            # of the serializer is spawned, and if not, it isn't.
+            # Similar to update, check that when quick is set, the created
+            # row is fetched in quick format, and if not, it isn't.
+            mock_serializer.collect_metrics = False
             viewset.quick = False
             viewset.create(MagicMock())
-            mock_serializer.__class__.assert_not_called()
+            mock_serializer.get_quick_data.assert_not_called()
             viewset.quick = True
             viewset.create(MagicMock())
-            mock_serializer.__class__.assert_called_once()
+            mock_serializer.get_quick_data.assert_called_once_with(
+                mock_serializer.instance,
+                None,
+                referenced_only=True,
+            )
+            mock_serializer.__class__.assert_not_called()
+
+    def test_bulk(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        with patch.object(_vset, "__init__", return_value=None):
+            viewset = _vset()
+            # Ensure bulk writes must be enabled.
+            viewset.bulk_writes = False
+            with self.assertRaises(NotFound):
+                viewset.bulk(MagicMock())
+
+    def test_get_bulk_instances(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        instances = {1: MagicMock(), 2: MagicMock()}
+        queryset = MagicMock()
+        queryset.in_bulk.return_value = instances
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "filter_queryset", return_value=queryset),
+            patch.object(_vset, "get_queryset"),
+            patch.object(_vset, "check_object_permissions") as mock_check,
+        ):
+            viewset = _vset()
+            viewset.request = MagicMock()
+            # Ensure instances are fetched at once, with permissions checked.
+            self.assertEqual(
+                viewset.get_bulk_instances([{"id": 1}, {"id": 2}]),
+                instances,
+            )
+            queryset.in_bulk.assert_called_once_with([1, 2])
+            self.assertEqual(mock_check.call_count, 2)
+            # Ensure errors are given per row.
+            with self.assertRaises(ValidationError) as context:
+                viewset.get_bulk_instances(
+                    [{"id": 1}, {}, {"id": 1}, {"id": 3}],
+                )
+            self.assertEqual(
+                [list(row.keys()) for row in context.exception.detail],
+                [[], ["id"], ["id"], ["id"]],
+            )
+            with self.assertRaises(ValidationError):
+                viewset.get_bulk_instances({"id": 1})
 
     def test_get_serializer(self) -> None:
         request = MagicMock()
@@ -107,3 +183,414 @@ class TestQuickableNestedModelViewSet(unittest.TestCase):
             request.query_params = {URL_QUICK_PARAM_NAME: "true"}
             serializer = nested_viewset.get_serializer(many=True)
             self.assertTrue(isinstance(serializer, serializer_class))
+
+    def test_list(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        paginator = MagicMock()
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "stream_list") as mock_stream_list,
+            patch.object(_vset, "paginator", new=paginator),
+            patch.object(drfwn_quick.viewsets, "STREAMING_MIN_PAGE_SIZE", 10),
+            patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ),
+            patch("rest_framework.mixins.ListModelMixin.list") as mock_list,
+        ):
+            viewset = _vset()
+            # Ensure only large or unpaginated quick pages are streamed.
+            viewset.quick_streaming = True
+            paginator.get_page_size.return_value = 5
+            viewset.list(MagicMock())
+            mock_stream_list.assert_not_called()
+            mock_list.assert_called_once()
+            paginator.get_page_size.return_value = None
+            viewset.list(MagicMock())
+            mock_stream_list.assert_called_once()
+            paginator.get_page_size.return_value = 10
+            viewset.list(MagicMock())
+            self.assertEqual(mock_stream_list.call_count, 2)
+            # Ensure nothing is streamed unless enabled.
+            viewset.quick_streaming = False
+            viewset.list(MagicMock())
+            self.assertEqual(mock_stream_list.call_count, 2)
+
+    def test_stream_list(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        queryset = MagicMock()
+        rows = [{"id": 3}, {"id": 1}]
+        serializer_class = MagicMock()
+        serializer_class.iter_quick_data.side_effect = (
+            lambda *args, **kwargs: iter(rows)
+        )
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "get_queryset"),
+            patch.object(_vset, "filter_queryset", return_value=queryset),
+            patch.object(
+                _vset,
+                "paginate_queryset",
+                return_value=[{"id": 3, "name": "c"}, {"id": 1, "name": "a"}],
+            ),
+            patch.object(_vset, "get_paginated_response") as mock_paginated,
+            patch.object(
+                _vset,
+                "get_serializer_class",
+                return_value=serializer_class,
+            ),
+        ):
+            mock_paginated.return_value.data = {"next": None, "results": []}
+            viewset = _vset()
+            viewset.quick_read_alias = None
+            response = viewset.stream_list(MagicMock(query_params={}))
+            # Ensure a cursor page's rows are fetched in the page's order,
+            # rather than the queryset's.
+            queryset.filter.assert_not_called()
+            self.assertIs(
+                serializer_class.iter_quick_data.call_args.args[0],
+                queryset,
+            )
+            self.assertEqual(
+                serializer_class.iter_quick_data.call_args.kwargs["ids"],
+                [3, 1],
+            )
+            self.assertEqual(
+                json.loads(b"".join(response.streaming_content)),
+                {"next": None, "results": rows},
+            )
+
+    def test_list_conditional(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        request = MagicMock(method="GET", META={})
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "filter_queryset"),
+            patch.object(_vset, "get_queryset"),
+            patch.object(_vset, "paginate_queryset", return_value=[1, 2]),
+            patch.object(
+                _vset,
+                "get_quick_fingerprint",
+                return_value=("abc", None),
+            ),
+            patch.object(_vset, "get_serializer") as mock_get_serializer,
+            patch.object(_vset, "get_paginated_response") as mock_paginated,
+            patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ),
+        ):
+            viewset = _vset()
+            viewset.request = request
+            viewset.quick_streaming = False
+            viewset.quick_conditional = True
+            # Ensure a page is listed with its ETag, without a match.
+            response = viewset.list(request)
+            self.assertEqual(response, mock_paginated.return_value)
+            response.__setitem__.assert_called_once_with("ETag", '"abc"')
+            # Ensure a matching ETag is answered with 304 Not Modified,
+            # without getting the page's data.
+            mock_get_serializer.reset_mock()
+            request.META["HTTP_IF_NONE_MATCH"] = '"abc"'
+            response = viewset.list(request)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], '"abc"')
+            mock_get_serializer.assert_not_called()
+
+    def test_list_response_cache(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        request = MagicMock(method="GET", META={})
+        response = drfwn_quick.viewsets.Response([{"id": 1}])
+        response.accepted_renderer = QuickJSONRenderer()
+        response.accepted_media_type = "application/json"
+        response.renderer_context = {}
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(
+                _vset,
+                "get_response_cache_key",
+                return_value=("response", "abc"),
+            ),
+            patch(
+                "rest_framework.mixins.ListModelMixin.list",
+                return_value=response,
+            ) as mock_list,
+            patch.object(
+                drfwn_quick.viewsets,
+                "response_cache",
+                new=drfwn_quick.viewsets.response_cache.__class__(),
+            ),
+            patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ),
+        ):
+            viewset = _vset()
+            viewset.request = request
+            viewset.quick_streaming = False
+            viewset.quick_conditional = False
+            viewset.quick_response_cache = True
+            # Ensure a miss is listed, then cached once rendered.
+            self.assertEqual(viewset.list(request), response)
+            viewset.cache_response(response)
+            # Ensure a hit is answered with the rendered content.
+            cached = viewset.list(request)
+            mock_list.assert_called_once()
+            self.assertEqual(cached.status_code, 200)
+            self.assertEqual(cached.content, b'[{"id":1}]')
+            self.assertEqual(cached["Content-Type"], "application/json")
+            # Ensure hits aren't cached again.
+            viewset.cache_response(response)
+            self.assertEqual(
+                drfwn_quick.viewsets.response_cache.stats()["size"],
+                1,
+            )
+
+    def test_finalize_response(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        response = MagicMock(spec=drfwn_quick.viewsets.Response)
+        metrics = MagicMock()
+        metrics.server_timing.return_value = "quick-base;dur=1.0"
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch(
+                "rest_framework.views.APIView.finalize_response",
+                return_value=response,
+            ),
+            patch.object(drfwn_quick.viewsets, "SERVER_TIMING", True),
+            patch.object(drfwn_quick.viewsets, "report_metrics") as mock_report,
+        ):
+            viewset = _vset()
+            # Ensure nothing is done without metrics.
+            viewset.finalize_response(MagicMock(), response)
+            response.render.assert_not_called()
+            mock_report.assert_not_called()
+            # Ensure rendering is measured, then metrics are reported.
+            viewset.quick_metrics = metrics
+            viewset.finalize_response(MagicMock(), response)
+            response.render.assert_called_once()
+            metrics.phase.assert_called_once_with("render")
+            response.__setitem__.assert_called_once_with(
+                "Server-Timing",
+                "quick-base;dur=1.0",
+            )
+            mock_report.assert_called_once_with(metrics)
+
+    def test_get_renderers(self) -> None:
+        _vset = QuickableNestedModelViewSet
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch(
+                "rest_framework.views.APIView.get_renderers",
+                side_effect=lambda: [MagicMock()],
+            ),
+        ):
+            viewset = _vset()
+            viewset.request = MagicMock()
+            # Ensure the quick renderer is preferred for quick requests only.
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ):
+                renderers = viewset.get_renderers()
+                self.assertIsInstance(renderers[0], QuickJSONRenderer)
+                self.assertEqual(len(renderers), 2)
+                viewset.quick_renderer_class = None
+                self.assertEqual(len(viewset.get_renderers()), 1)
+            viewset.quick_renderer_class = QuickJSONRenderer
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=False,
+            ):
+                self.assertEqual(len(viewset.get_renderers()), 1)
+
+
+class TestAsyncQuickableNestedModelViewSet(unittest.IsolatedAsyncioTestCase):
+    def test_get_async_handler(self) -> None:
+        _vset = AsyncQuickableNestedModelViewSet
+        request = MagicMock(method="GET")
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ) as mock_determine,
+        ):
+            viewset = _vset()
+            viewset.quick_streaming = False
+            # Ensure quick list and retrieve requests are handled async.
+            viewset.action = "list"
+            self.assertEqual(viewset.get_async_handler(request), viewset.alist)
+            viewset.action = "retrieve"
+            self.assertEqual(
+                viewset.get_async_handler(request),
+                viewset.aretrieve,
+            )
+            # Ensure anything else isn't.
+            viewset.action = "update"
+            self.assertIsNone(viewset.get_async_handler(request))
+            viewset.action = "list"
+            viewset.quick_streaming = True
+            self.assertIsNone(viewset.get_async_handler(request))
+            viewset.quick_streaming = False
+            mock_determine.return_value = False
+            self.assertIsNone(viewset.get_async_handler(request))
+            mock_determine.return_value = True
+            request.method = "POST"
+            self.assertIsNone(viewset.get_async_handler(request))
+
+    async def test_dispatch(self) -> None:
+        _vset = AsyncQuickableNestedModelViewSet
+        request = MagicMock()
+        response = MagicMock()
+        handler = AsyncMock(return_value=response)
+        with (
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "initialize_request"),
+            patch.object(_vset, "initial") as mock_initial,
+            patch.object(
+                _vset,
+                "finalize_response",
+                side_effect=lambda request, response, *args: response,
+            ),
+            patch.object(_vset, "get_async_handler", return_value=handler),
+            patch(
+                "rest_framework.views.APIView.dispatch",
+                return_value=response,
+            ) as mock_dispatch,
+        ):
+            viewset = _vset()
+            # Ensure async handlers are awaited, after checks.
+            self.assertIs(await viewset.dispatch(request), response)
+            mock_initial.assert_called_once()
+            handler.assert_awaited_once()
+            mock_dispatch.assert_not_called()
+            # Ensure other requests are dispatched as usual.
+            viewset.get_async_handler.return_value = None
+            self.assertIs(await viewset.dispatch(request), response)
+            mock_dispatch.assert_called_once_with(request)
+            # Ensure errors are handled as usual.
+            viewset.get_async_handler.return_value = AsyncMock(
+                side_effect=ValueError
+            )
+            with patch.object(_vset, "handle_exception") as mock_handle:
+                await viewset.dispatch(request)
+            self.assertIsInstance(mock_handle.call_args.args[0], ValueError)
+
+    async def test_dispatch_response_cache(self) -> None:
+        _vset = AsyncQuickableNestedModelViewSet
+        request = MagicMock(method="GET", META={})
+        response = drfwn_quick.viewsets.Response([{"id": 1}])
+        response.accepted_renderer = QuickJSONRenderer()
+        response.accepted_media_type = "application/json"
+        response.renderer_context = {}
+
+        async def handler(request, *args, **kwargs):
+            cached = await sync_to_async(viewset.get_cached_response)()
+            return response if cached is None else cached
+
+        with (
+            override_settings(
+                CACHES={
+                    "default": {"BACKEND": LOCMEM_CACHE},
+                    "quick": {"BACKEND": f"{__name__}.SyncOnlyCache"},
+                }
+            ),
+            patch.object(_vset, "__init__", return_value=None),
+            patch.object(_vset, "initialize_request", return_value=request),
+            patch.object(_vset, "initial"),
+            patch.object(_vset, "get_async_handler", return_value=handler),
+            patch.object(
+                _vset,
+                "get_response_cache_key",
+                return_value=("response", "abc"),
+            ),
+            patch(
+                "rest_framework.views.APIView.finalize_response",
+                side_effect=lambda request, response, *args: response,
+            ),
+            patch.object(
+                drfwn_quick.viewsets,
+                "response_cache",
+                new=ResponseCache(alias="quick"),
+            ),
+        ):
+            viewset = _vset()
+            # Ensure a miss is cached outside the event loop, as a database
+            # cache requires.
+            self.assertIs(await viewset.dispatch(request), response)
+            # Ensure a hit is answered with the rendered content.
+            cached = await viewset.dispatch(request)
+            self.assertIsNot(cached, response)
+            self.assertEqual(cached.content, b'[{"id":1}]')
+
+
+class TestQuickCursorPagination(unittest.TestCase):
+    def test_paginate_queryset(self) -> None:
+        queryset = MagicMock()
+        paginator = QuickCursorPagination()
+        with (
+            patch.object(
+                paginator,
+                "get_ordering",
+                return_value=("-created",),
+            ),
+            patch(
+                "rest_framework.pagination.CursorPagination.paginate_queryset"
+            ) as mock_paginate,
+        ):
+            # Ensure quick pages are of rows with the ID and ordering key.
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ):
+                paginator.paginate_queryset(queryset, MagicMock())
+            queryset.values.assert_called_once_with("id", "created")
+            self.assertEqual(
+                mock_paginate.call_args.args[0],
+                queryset.values.return_value,
+            )
+            # Ensure other pages are of model instances, as standard.
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=False,
+            ):
+                paginator.paginate_queryset(queryset, MagicMock())
+            self.assertEqual(mock_paginate.call_args.args[0], queryset)
+
+
+class TestQuickPageNumberPagination(unittest.TestCase):
+    def test_paginate_queryset(self) -> None:
+        queryset = MagicMock()
+        paginator = QuickPageNumberPagination()
+        with patch(
+            "rest_framework.pagination.PageNumberPagination.paginate_queryset"
+        ) as mock_paginate:
+            # Ensure quick pages are of IDs only.
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=True,
+            ):
+                paginator.paginate_queryset(queryset, MagicMock())
+            queryset.values_list.assert_called_once_with("id", flat=True)
+            self.assertEqual(
+                mock_paginate.call_args.args[0],
+                queryset.values_list.return_value,
+            )
+            # Ensure other pages are of model instances, as standard.
+            with patch.object(
+                drfwn_quick.viewsets,
+                "determine_quick",
+                return_value=False,
+            ):
+                paginator.paginate_queryset(queryset, MagicMock())
+            self.assertEqual(mock_paginate.call_args.args[0], queryset)
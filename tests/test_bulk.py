@@ -0,0 +1,167 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, models
+from rest_framework.exceptions import ValidationError
+
+import drfwn_quick.bulk
+from drfwn_quick.bulk import (
+    BulkRelatedIdsField,
+    bulk_save,
+    check_related_ids,
+    check_unique_rows,
+)
+
+
+class BulkMeal(models.Model):
+    code = models.CharField(max_length=16, unique=True)
+    name = models.CharField(max_length=256)
+    day = models.IntegerField()
+
+    class Meta:
+        app_label = "contenttypes"
+        unique_together = [("name", "day")]
+
+
+class TestBulk(unittest.TestCase):
+    def test_bulk_related_ids_field(self) -> None:
+        field = BulkRelatedIdsField(many=True)
+        # Ensure IDs and rows with IDs are accepted, without duplicates.
+        self.assertEqual(
+            field.to_internal_value([1, {"id": 2, "name": "x"}, "3", 1]),
+            [1, 2, 3],
+        )
+        for data in ([{"name": "x"}], [True], 1):
+            with self.assertRaises(ValidationError):
+                field.to_internal_value(data)
+        self.assertEqual(BulkRelatedIdsField().to_internal_value({"id": 4}), 4)
+        # Ensure relations that can't be written in bulk are rejected.
+        with self.assertRaises(ValidationError):
+            BulkRelatedIdsField(supported=False).to_internal_value(1)
+
+    def test_check_related_ids(self) -> None:
+        vendors = MagicMock()
+        vendors.filter.return_value.values_list.return_value = [1, 2]
+        region = MagicMock()
+        region.filter.return_value.values_list.return_value = [5]
+        related_querysets = {"vendors": vendors, "region": region}
+        rows = [
+            {"name": "Breakfast", "vendors": [1, 2], "region": 5},
+            {"name": "Lunch", "vendors": [2, 3], "region": None},
+        ]
+        # Ensure IDs are checked with one query per relation, and errors
+        # given per row.
+        with self.assertRaises(ValidationError) as context:
+            check_related_ids(rows, related_querysets)
+        vendors.filter.assert_called_once_with(pk__in=[1, 2, 3])
+        region.filter.assert_called_once_with(pk__in=[5])
+        self.assertEqual(
+            [
+                {name: [str(e) for e in errors] for name, errors in row.items()}
+                for row in context.exception.detail
+            ],
+            [{}, {"vendors": ["Invalid pk \"3\" - object does not exist."]}],
+        )
+        check_related_ids(rows[:1], related_querysets)
+
+    def test_bulk_save(self) -> None:
+        name = MagicMock(is_relation=False, many_to_many=False)
+        region = MagicMock(
+            is_relation=True,
+            many_to_many=False,
+            attname="region_id",
+        )
+        vendors = MagicMock(is_relation=True, many_to_many=True)
+        updated = MagicMock(auto_now=True)
+        updated.name = "updated"
+        fields = {"name": name, "region": region, "vendors": vendors}
+
+        def get_field(field_name):
+            if field_name not in fields:
+                raise FieldDoesNotExist()
+            return fields[field_name]
+
+        model = MagicMock(side_effect=lambda: MagicMock())
+        model._meta.get_field = get_field
+        model._meta.concrete_fields = [updated]
+        rows = [
+            {"name": "Breakfast", "region": 5, "vendors": [1, 2]},
+            {"name": "Lunch", "region": None, "vendors": []},
+        ]
+        with (
+            patch.object(drfwn_quick.bulk, "router"),
+            patch.object(drfwn_quick.bulk, "connections"),
+            patch.object(drfwn_quick.bulk, "transaction"),
+            patch.object(drfwn_quick.bulk, "save_links") as mock_links,
+            patch.object(drfwn_quick.bulk, "invalidate_model") as mock_inv,
+        ):
+            # Ensure rows are created at once, with relations set by ID and
+            # many-to-many links saved separately.
+            objs = bulk_save(model, rows)
+            bulk_create = model.objects.using.return_value.bulk_create
+            bulk_create.assert_called_once_with(objs)
+            self.assertEqual(objs[0].name, "Breakfast")
+            self.assertEqual(objs[0].region_id, 5)
+            self.assertEqual(
+                mock_links.call_args.args[2],
+                [{"vendors": [1, 2]}, {"vendors": []}],
+            )
+            # Ensure caches are invalidated, as no signals are sent.
+            mock_inv.assert_called_once_with(model)
+            # Ensure instances are updated at once, with auto_now fields.
+            instances = [MagicMock(), MagicMock()]
+            objs = bulk_save(model, rows, instances)
+            self.assertEqual(objs, instances)
+            updated.pre_save.assert_any_call(instances[0], False)
+            bulk_update = model.objects.using.return_value.bulk_update
+            bulk_update.assert_called_once_with(
+                instances,
+                {"name", "region", "updated"},
+            )
+
+    def test_bulk_save_integrity_error(self) -> None:
+        model = MagicMock(side_effect=lambda: MagicMock())
+        model._meta.get_field.side_effect = FieldDoesNotExist()
+        using = model.objects.using.return_value
+        using.bulk_create.side_effect = IntegrityError()
+        # Ensure rows the database rejects are a validation error, not a
+        # server error.
+        with (
+            patch.object(drfwn_quick.bulk, "router"),
+            patch.object(drfwn_quick.bulk, "connections"),
+            patch.object(drfwn_quick.bulk, "transaction"),
+            patch.object(drfwn_quick.bulk, "invalidate_model") as mock_inv,
+            self.assertRaises(ValidationError),
+        ):
+            bulk_save(model, [{"name": "Breakfast"}])
+        mock_inv.assert_not_called()
+
+    def test_check_unique_rows(self) -> None:
+        rows = [
+            {"code": "a", "name": "Breakfast", "day": 1},
+            {"code": "b", "name": "Breakfast", "day": 2},
+            {"code": "a", "name": "Breakfast", "day": 1},
+        ]
+        # Ensure rows colliding with an earlier row in the batch are
+        # rejected, on unique fields and unique_together.
+        with self.assertRaises(ValidationError) as cm:
+            check_unique_rows(BulkMeal, rows)
+        errors = cm.exception.detail
+        self.assertEqual(errors[:2], [{}, {}])
+        self.assertEqual(set(errors[2]), {"code", "non_field_errors"})
+        check_unique_rows(BulkMeal, rows[:2])
+        # Ensure nulls and omitted fields don't collide, unless updated
+        # instances have the same values.
+        check_unique_rows(BulkMeal, [{"code": None}, {"code": None}])
+        check_unique_rows(BulkMeal, [{"name": "Lunch"}, {"name": "Lunch"}])
+        instances = [
+            BulkMeal(code="a", name="Lunch", day=1),
+            BulkMeal(code="b", name="Lunch", day=2),
+        ]
+        with self.assertRaises(ValidationError):
+            check_unique_rows(BulkMeal, [{}, {"day": 1}], instances)
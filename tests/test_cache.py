@@ -0,0 +1,159 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_save
+from django.test import override_settings
+
+import drfwn_quick.cache
+from drfwn_quick.cache import RelatedDatasetCache, ResponseCache
+
+
+def get_queryset(query: str = "SELECT 1") -> MagicMock:
+    queryset = MagicMock()
+    queryset.query = query
+    queryset.model = ContentType
+    return queryset
+
+
+class TestRelatedDatasetCache(unittest.TestCase):
+    def test_get_dataset(self) -> None:
+        cache = RelatedDatasetCache()
+        queryset = get_queryset()
+        dataset = {1: {"id": 1}}
+        load = MagicMock(return_value=dataset)
+        # Ensure the dataset is loaded once, then served from the cache.
+        self.assertEqual(cache.get_dataset(queryset, load), dataset)
+        self.assertEqual(cache.get_dataset(queryset, load), dataset)
+        load.assert_called_once()
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+        # Ensure differing querysets don't share entries.
+        cache.get_dataset(get_queryset("SELECT 2"), load)
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_rows(self) -> None:
+        cache = RelatedDatasetCache()
+        queryset = get_queryset()
+        load = MagicMock(side_effect=lambda ids: {i: {"id": i} for i in ids})
+        cache.get_rows(queryset, {1, 2}, load)
+        # Ensure only missing rows are loaded.
+        dataset = cache.get_rows(queryset, {2, 3}, load)
+        self.assertEqual(dataset, {2: {"id": 2}, 3: {"id": 3}})
+        load.assert_called_with({3})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "size": 3})
+
+    def test_eviction(self) -> None:
+        cache = RelatedDatasetCache(max_size=2, timeout=10)
+        load = MagicMock(side_effect=lambda ids: {i: {"id": i} for i in ids})
+        queryset = get_queryset()
+        cache.get_rows(queryset, {1}, load)
+        cache.get_rows(queryset, {2}, load)
+        # Using 1 makes 2 the least recently used, evicted when 3 is added.
+        cache.get_rows(queryset, {1}, load)
+        cache.get_rows(queryset, {3}, load)
+        load.reset_mock()
+        cache.get_rows(queryset, {1, 2, 3}, load)
+        load.assert_called_once_with({2})
+        # Ensure entries expire after the timeout.
+        load.reset_mock()
+        with patch.object(
+            drfwn_quick.cache.time,
+            "monotonic",
+            return_value=drfwn_quick.cache.time.monotonic() + 11,
+        ):
+            cache.get_rows(queryset, {1}, load)
+        load.assert_called_once_with({1})
+
+    def test_invalidation(self) -> None:
+        cache = RelatedDatasetCache()
+        queryset = get_queryset()
+        load = MagicMock(return_value={})
+        cache.get_dataset(queryset, load)
+        # Ensure saves and many-to-many changes invalidate entries.
+        post_save.send(sender=ContentType, instance=MagicMock())
+        cache.get_dataset(queryset, load)
+        self.assertEqual(load.call_count, 2)
+        m2m_changed.send(
+            sender=MagicMock(),
+            instance=ContentType(),
+            action="post_add",
+            model=ContentType,
+        )
+        cache.get_dataset(queryset, load)
+        self.assertEqual(load.call_count, 3)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_invalidation_keyed_only(self) -> None:
+        cache = RelatedDatasetCache()
+        # Ensure models that were never keyed aren't given generations.
+        post_save.send(sender=ContentType, instance=MagicMock())
+        self.assertEqual(cache._generations, {})
+        # Ensure migrations' historical models are left alone.
+        historical = MagicMock()
+        with patch.object(drfwn_quick.cache, "invalidate_model") as mock_inv:
+            post_save.send(sender=historical, instance=MagicMock())
+        mock_inv.assert_not_called()
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            },
+            "quick": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "quick",
+            },
+        }
+    )
+    def test_invalidation_backend(self) -> None:
+        cache = RelatedDatasetCache(alias="quick")
+        key = "drfwn_quick:generation:contenttypes.ContentType"
+        # Ensure changes to models that were never keyed, by any process,
+        # don't write to the backend.
+        cache.invalidate(ContentType)
+        self.assertIsNone(cache.backend.get(key))
+        # Ensure keyed models' generations are bumped.
+        self.assertEqual(cache.get_generation(ContentType), 0)
+        cache.invalidate(ContentType)
+        self.assertEqual(cache.get_generation(ContentType), 1)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_get_key(self) -> None:
+        cache = ResponseCache()
+        key = cache.get_key([ContentType], ("/items/", "application/json"))
+        # Ensure keys are stable, and differ by parts.
+        self.assertEqual(
+            cache.get_key([ContentType], ("/items/", "application/json")),
+            key,
+        )
+        self.assertNotEqual(
+            cache.get_key([ContentType], ("/items/?page=2", "text/html")),
+            key,
+        )
+        # Ensure changes to a model give new keys.
+        cache.invalidate(ContentType)
+        self.assertNotEqual(
+            cache.get_key([ContentType], ("/items/", "application/json")),
+            key,
+        )
+
+    def test_get(self) -> None:
+        cache = ResponseCache()
+        key = cache.get_key([ContentType], ("/items/",))
+        self.assertIsNone(cache.get(key))
+        cache.set(key, (b"[]", {"Content-Type": "application/json"}))
+        self.assertEqual(
+            cache.get(key),
+            (b"[]", {"Content-Type": "application/json"}),
+        )
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+        # Ensure saves make responses unreachable.
+        post_save.send(sender=ContentType, instance=MagicMock())
+        self.assertIsNone(
+            cache.get(cache.get_key([ContentType], ("/items/",)))
+        )
@@ -0,0 +1,93 @@
+import datetime
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.db.models import DateTimeField
+
+import drfwn_quick.conditional
+from drfwn_quick.conditional import get_fingerprint, get_modified_field
+
+
+class TestConditional(unittest.TestCase):
+    def test_get_modified_field(self) -> None:
+        model = MagicMock()
+        created = DateTimeField(auto_now_add=True)
+        created.name = "created"
+        model._meta.concrete_fields = [created]
+        # Ensure only auto_now fields are used, others don't change on save.
+        self.assertIsNone(get_modified_field(model))
+        modified = DateTimeField(auto_now=True)
+        modified.name = "modified"
+        model._meta.concrete_fields = [created, modified]
+        self.assertEqual(get_modified_field(model), "modified")
+
+    def test_get_fingerprint(self) -> None:
+        base = MagicMock()
+        through = MagicMock()
+        earlier = datetime.datetime(2024, 1, 1)
+        later = datetime.datetime(2024, 1, 2)
+        base.order_by().aggregate.return_value = {
+            "count": 2,
+            "max_pk": 5,
+            "modified": later,
+        }
+        through.order_by().aggregate.return_value = {
+            "count": 3,
+            "max_pk": 9,
+            "sum": 12,
+            "source_sum": 6,
+            "link_sum": 24,
+        }
+        related = MagicMock()
+        related.order_by().aggregate.return_value = {
+            "count": 1,
+            "max_pk": 1,
+            "modified": earlier,
+        }
+        querysets = [(base, None), (related, None), (through, ("product", "tag"))]
+
+        def get_modified_field(model: MagicMock) -> str | None:
+            return None if model is through.model else "updated_at"
+
+        with (
+            patch.object(
+                drfwn_quick.conditional,
+                "get_fingerprint_querysets",
+                return_value=querysets,
+            ),
+            patch.object(
+                drfwn_quick.conditional,
+                "get_modified_field",
+                side_effect=get_modified_field,
+            ),
+        ):
+            etag, last_modified = get_fingerprint(MagicMock(), base)
+            # Ensure the latest modification is given, and through rows are
+            # summed rather than needing a modified field.
+            self.assertEqual(last_modified, later)
+            self.assertIn("sum", through.order_by().aggregate.call_args[1])
+            # Ensure links' sources count too, so moved links change it.
+            self.assertLessEqual(
+                {"source_sum", "link_sum"},
+                through.order_by().aggregate.call_args[1].keys(),
+            )
+            # Ensure the fingerprint is stable, and changes with the rows
+            # or key.
+            self.assertEqual(get_fingerprint(MagicMock(), base)[0], etag)
+            self.assertNotEqual(
+                get_fingerprint(MagicMock(), base, key=("other",))[0],
+                etag,
+            )
+            through.order_by().aggregate.return_value["sum"] = 13
+            self.assertNotEqual(get_fingerprint(MagicMock(), base)[0], etag)
+            through.order_by().aggregate.return_value["sum"] = 12
+            through.order_by().aggregate.return_value["link_sum"] = 25
+            self.assertNotEqual(get_fingerprint(MagicMock(), base)[0], etag)
+            # Ensure models without a modified field can't be fingerprinted,
+            # their updates wouldn't change it.
+            querysets.append((through, None))
+            self.assertIsNone(get_fingerprint(MagicMock(), base))
@@ -1,16 +1,43 @@
 import datetime
 import os
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
 django.setup()
 
-from drfwn_quick.data import rel_is_to_many, prepare_row, format_queryset_data
+import drfwn_quick.data
+from drfwn_quick.data import (
+    aformat_queryset_data,
+    aload_related_dataset,
+    chunked,
+    collect_related_ids,
+    expand_dataset,
+    fetch_to_many_ids,
+    format_datetime_columns,
+    format_queryset_data,
+    format_value_rows,
+    get_row_steps,
+    iter_queryset_data,
+    load_related_dataset,
+    make_row_builder,
+    prepare_row,
+    rel_is_to_many,
+)
 from drfwn_quick.settings import DATETIME_FORMAT
 
 
+class AsyncRows(list):
+    """Rows that can be iterated as async querysets are."""
+    async def _aiter(self):
+        for row in self:
+            yield row
+
+    def __aiter__(self):
+        return self._aiter()
+
+
 class TestData(unittest.TestCase):
     def test_rel_is_to_many(self) -> None:
         field = MagicMock()
@@ -36,6 +63,82 @@ class TestData(unittest.TestCase):
         field.one_to_one = True
         self.assertFalse(rel_is_to_many(field))
 
+    def test_chunked(self) -> None:
+        # Ensure items are split into lists no longer than size.
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+    def test_collect_related_ids(self) -> None:
+        dataset_rows = [
+            {"id": 1, "related_field_a": 1, "related_field_b": None},
+            {"id": 1, "related_field_a": 2, "related_field_b": [11]},
+            {"id": 2, "related_field_a": 1},
+        ]
+        # Ensure only referenced, non-null IDs are collected per relation.
+        self.assertEqual(
+            collect_related_ids(
+                dataset_rows,
+                ["related_field_a", "related_field_b"],
+            ),
+            {"related_field_a": {1, 2}, "related_field_b": {11}},
+        )
+
+    def test_fetch_to_many_ids(self) -> None:
+        field = MagicMock()
+        field.many_to_many = True
+        field.m2m_field_name.return_value = "product"
+        field.m2m_reverse_field_name.return_value = "vendor"
+        through_queryset = field.remote_field.through.objects.all.return_value
+        through_queryset.filter.return_value.values_list.return_value = [
+            (1, 10),
+            (1, 11),
+            (2, 10),
+        ]
+        # Ensure the through table is queried for ID pairs only, grouped by
+        # the source ID.
+        self.assertEqual(
+            fetch_to_many_ids(field, [1, 2, 3]),
+            {1: [10, 11], 2: [10]},
+        )
+        through_queryset.filter.assert_called_once_with(product__in=[1, 2, 3])
+        through_queryset.filter.return_value.values_list.assert_called_once_with(
+            "product",
+            "vendor",
+        )
+
+    def test_load_related_dataset(self) -> None:
+        rows = [{"id": 1, "name": "beans"}, {"id": 2, "name": "bacon"}]
+        queryset = MagicMock()
+        queryset.values = lambda: rows
+        queryset.filter.return_value.values = lambda: rows[:1]
+        # Ensure all rows are loaded when no IDs are given.
+        self.assertEqual(
+            load_related_dataset(queryset),
+            {1: rows[0], 2: rows[1]},
+        )
+        queryset.filter.assert_not_called()
+        # Ensure only the given IDs are loaded, in chunks.
+        self.assertEqual(
+            load_related_dataset(queryset, {1, 3, 5}, chunk_size=2),
+            {1: rows[0]},
+        )
+        queryset.filter.assert_any_call(id__in=[1, 3])
+        queryset.filter.assert_any_call(id__in=[5])
+        # Ensure given columns are loaded and named by their output names.
+        queryset.values = MagicMock(return_value=[{"id": 1, "name": "beans"}])
+        self.assertEqual(
+            load_related_dataset(queryset, columns=(("title", "name"),)),
+            {1: {"id": 1, "title": "beans"}},
+        )
+        queryset.values.assert_called_once_with("name", "id")
+        # Ensure datetime columns are formatted once, as rows are loaded.
+        now = datetime.datetime.now()
+        queryset.values = lambda *args: [{"id": 1, "created": now}]
+        self.assertEqual(
+            load_related_dataset(queryset, datetime_columns=("created",)),
+            {1: {"id": 1, "created": now.strftime(DATETIME_FORMAT)}},
+        )
+
     def test_prepare_row(self) -> None:
         # Ensure relations are expanded if "quick" and datetime.datetime
         # is serialised, if desired.
@@ -125,6 +228,120 @@ class TestData(unittest.TestCase):
                 ],
             )
 
+    def test_make_row_builder(self) -> None:
+        now = datetime.datetime.now()
+        related_datasets = {
+            "related_field_a": {
+                1: {"id": 1, "name": "panko", "created": now},
+                2: {"id": 2, "name": "breck", "created": None},
+            },
+        }
+        dataset_rows = [
+            {
+                "id": 6,
+                "none_field": None,
+                "datetime_field": now,
+                "other_field_str": "test",
+                "related_field_a": 1,
+            },
+            {"id": 7, "datetime_field": None, "related_field_a": [1, 2]},
+            {"id": 8, "related_field_a": None},
+        ]
+        field_names = [
+            "none_field",
+            "datetime_field",
+            "other_field_str",
+            "related_field_a",
+        ]
+        build_row = make_row_builder(
+            field_names,
+            ("related_field_a",),
+            frozenset({"datetime_field"}),
+        )
+        # Related rows are formatted when loaded, not when built.
+        formatted_datasets = {
+            "related_field_a": {
+                k: format_datetime_columns(v, ("created",))
+                for k, v in related_datasets["related_field_a"].items()
+            },
+        }
+        # Ensure built rows are identical to prepare_row's, in order.
+        for dataset_row in dataset_rows:
+            expected = prepare_row(
+                dataset_row,
+                field_names,
+                ["related_field_a"],
+                related_datasets,
+            )
+            row = build_row(dataset_row, formatted_datasets)
+            self.assertEqual(row, expected)
+            self.assertEqual(list(row.keys()), list(expected.keys()))
+        # Ensure related rows are shared, not copied per reference.
+        row_a = build_row(dataset_rows[0], formatted_datasets)
+        row_b = build_row(dataset_rows[1], formatted_datasets)
+        self.assertIs(row_a["related_field_a"][0], row_b["related_field_a"][0])
+
+    def test_expand_dataset(self) -> None:
+        to_one_field = MagicMock(attname="region_id")
+        to_one_field.many_to_many = False
+        to_one_field.one_to_many = False
+        to_many_field = MagicMock()
+        to_many_field.many_to_many = True
+        region_plan = MagicMock(datetime_columns=frozenset())
+        region_plan.get_nested_plans.return_value = {}
+        tag_plan = MagicMock(datetime_columns=frozenset())
+        tag_plan.get_nested_plans.return_value = {}
+        plan = MagicMock()
+        plan.relations = {"region": to_one_field, "tags": to_many_field}
+        plan.related_querysets = {"region": "regions", "tags": "tags"}
+        plan.related_columns = {}
+        plan.output_names = {}
+        plan.get_nested_plans.return_value = {
+            "region": region_plan,
+            "tags": tag_plan,
+        }
+        dataset = {
+            1: {"id": 1, "name": "beans", "region_id": 5},
+            2: {"id": 2, "name": "bacon", "region_id": None},
+        }
+        nested_datasets = {
+            "regions": {5: {"id": 5, "name": "north"}},
+            "tags": {7: {"id": 7, "label": "tasty"}},
+        }
+        with (
+            patch.object(
+                drfwn_quick.data,
+                "fetch_to_many_ids",
+                return_value={1: [7]},
+            ) as mock_fetch,
+            patch.object(
+                drfwn_quick.data,
+                "load_related_dataset",
+                side_effect=lambda qs, ids, **kwargs: nested_datasets[qs],
+            ) as mock_load,
+        ):
+            # Ensure no expansion happens below depth 1.
+            self.assertIs(expand_dataset(dataset, plan, 0), dataset)
+            expanded = expand_dataset(dataset, plan, 1)
+            # Ensure one query per relation, not per row.
+            mock_fetch.assert_called_once_with(to_many_field, [1, 2])
+            self.assertEqual(mock_load.call_count, 2)
+        # Ensure relations are expanded, replacing ID columns.
+        self.assertEqual(
+            expanded,
+            {
+                1: {
+                    "id": 1,
+                    "name": "beans",
+                    "region": {"id": 5, "name": "north"},
+                    "tags": [{"id": 7, "label": "tasty"}],
+                },
+                2: {"id": 2, "name": "bacon", "region": None, "tags": []},
+            },
+        )
+        # Ensure the original rows are untouched, they may be cached.
+        self.assertEqual(dataset[1]["region_id"], 5)
+
     def test_format_queryset_data(self) -> None:
         related_field_a = MagicMock()
         related_field_b = MagicMock()
@@ -171,3 +388,409 @@ class TestData(unittest.TestCase):
                 ]
             ]
         )
+        # Ensure that given related querysets, only referenced rows are
+        # loaded and used.
+        related_queryset = MagicMock()
+        related_queryset.filter.return_value.values = lambda: [
+            related_datasets["related_field_b"][11],
+        ]
+        formatted_data = format_queryset_data(
+            field_names,
+            queryset,
+            {"related_field_a": related_datasets["related_field_a"]},
+            {"related_field_b": related_queryset},
+        )
+        related_queryset.filter.assert_called_once_with(id__in=[11])
+        self.assertEqual(
+            formatted_data[1]["related_field_b"],
+            [related_datasets["related_field_b"][11]],
+        )
+        # Ensure datasets from related loaders are loaded along with the rows,
+        # on worker threads if parallel.
+        with patch.object(
+            drfwn_quick.data,
+            "run_parallel",
+            side_effect=lambda tasks, workers, metrics: [
+                task() for task in tasks
+            ],
+        ) as mock_run:
+            loaded_data = format_queryset_data(
+                field_names,
+                queryset,
+                {"related_field_a": related_datasets["related_field_a"]},
+                related_loaders={
+                    "related_field_b": lambda: related_datasets[
+                        "related_field_b"
+                    ],
+                },
+                workers=4,
+            )
+        self.assertEqual(len(mock_run.call_args.args[0]), 2)
+        self.assertEqual(mock_run.call_args.args[1], 4)
+        self.assertEqual(loaded_data, formatted_data)
+        # Ensure the prefetch strategy fetches each relation separately and
+        # gives the same data as joining.
+        queryset.values = lambda *args: [
+            {"name": "Breakfast", "id": 1},
+            {"name": "Lunch", "id": 2},
+        ]
+        grouped_ids = {
+            related_field_a: {1: [1, 2]},
+            related_field_b: {2: [11]},
+        }
+        with patch.object(
+            drfwn_quick.data,
+            "fetch_to_many_ids",
+            side_effect=lambda field, ids: grouped_ids[field],
+        ):
+            prefetched_data = format_queryset_data(
+                field_names,
+                queryset,
+                related_datasets,
+                fetch_strategy="prefetch",
+            )
+        self.assertEqual(
+            prefetched_data,
+            format_queryset_data(
+                field_names,
+                MagicMock(values=lambda *args: db_rows, model=queryset.model),
+                related_datasets,
+            ),
+        )
+        # Ensure joined to-many relations don't duplicate each other's rows.
+        queryset.values = lambda *args: [
+            {
+                "name": "Breakfast",
+                "id": 1,
+                "related_field_a": related_id,
+                "related_field_b": 11,
+            }
+            for related_id in (1, 1, 2, 2)
+        ]
+        self.assertEqual(
+            format_queryset_data(field_names, queryset, related_datasets),
+            [
+                {
+                    "id": 1,
+                    "name": "Breakfast",
+                    "related_field_a": list(
+                        related_datasets["related_field_a"].values()
+                    ),
+                    "related_field_b": [
+                        related_datasets["related_field_b"][11],
+                    ],
+                },
+            ],
+        )
+        # Ensure unknown strategies are rejected.
+        with self.assertRaises(ValueError):
+            format_queryset_data(
+                field_names,
+                queryset,
+                related_datasets,
+                fetch_strategy="bogus",
+            )
+
+    def test_iter_queryset_data(self) -> None:
+        related_field = MagicMock()
+        related_field.name = "related_field"
+        related_field.many_to_many = True
+        queryset = MagicMock()
+        queryset.model._meta.get_fields = lambda: [related_field]
+        db_rows = [
+            {"name": "Breakfast", "id": 1},
+            {"name": "Lunch", "id": 2},
+            {"name": "Dinner", "id": 3},
+        ]
+        queryset.values.return_value.iterator.return_value = iter(db_rows)
+        related_datasets = {
+            "related_field": {
+                1: {"id": 1, "name": "beans"},
+                2: {"id": 2, "name": "bacon"},
+            },
+        }
+        grouped_ids = {1: [1, 2], 3: [2]}
+        with patch.object(
+            drfwn_quick.data,
+            "fetch_to_many_ids",
+            side_effect=lambda field, ids: {
+                i: grouped_ids[i] for i in ids if i in grouped_ids
+            },
+        ) as mock_fetch:
+            rows = iter_queryset_data(
+                ["name", "related_field"],
+                queryset,
+                related_datasets,
+                chunk_size=2,
+            )
+            # Ensure nothing is fetched until iterated.
+            queryset.values.assert_not_called()
+            data = list(rows)
+        # Ensure to-many relations are left out of the values() call and
+        # fetched per chunk instead.
+        queryset.values.assert_called_once_with("name", "id")
+        self.assertEqual(
+            [call.args[1] for call in mock_fetch.call_args_list],
+            [[1, 2], [3]],
+        )
+        self.assertEqual(
+            data,
+            [
+                {
+                    "name": "Breakfast",
+                    "id": 1,
+                    "related_field": list(
+                        related_datasets["related_field"].values()
+                    ),
+                },
+                {"name": "Lunch", "id": 2, "related_field": []},
+                {
+                    "name": "Dinner",
+                    "id": 3,
+                    "related_field": [related_datasets["related_field"][2]],
+                },
+            ],
+        )
+
+    def test_format_value_rows(self) -> None:
+        now = datetime.datetime.now()
+        related_datasets = {
+            "vendors": {
+                1: {"id": 1, "name": "beans"},
+                2: {"id": 2, "name": "bacon"},
+            },
+            "region": {5: {"id": 5, "name": "north"}},
+        }
+        field_names = ("name", "created", "region", "vendors")
+        columns = (
+            ("title", "name"),
+            ("created", "created"),
+            ("region", "region"),
+            ("vendors", "vendors"),
+        )
+        plan = MagicMock()
+        plan.expanded_names = ("region", "vendors")
+        plan.row_steps = get_row_steps(
+            field_names,
+            ("vendors",),
+            frozenset({"created"}),
+            ("region",),
+            columns,
+        )
+        lookups = ["name", "created", "region", "id"]
+        value_rows = [
+            ("Breakfast", now, 5, 1),
+            ("Lunch", None, None, 2),
+            # Repeated by a join, e.g. from filtering on a to-many relation.
+            ("Breakfast", now, 5, 1),
+        ]
+        to_many_ids = {"vendors": {1: [1, 2]}}
+        rows = format_value_rows(
+            value_rows,
+            lookups,
+            to_many_ids,
+            related_datasets,
+            plan=plan,
+        )
+        # Ensure rows are identical to the row builder's.
+        build_row = make_row_builder(
+            field_names,
+            ("vendors",),
+            frozenset({"created"}),
+            ("region",),
+            columns,
+        )
+        expected = [
+            build_row(
+                {
+                    **dict(zip(lookups, value_row)),
+                    "vendors": to_many_ids["vendors"].get(value_row[-1], []),
+                },
+                related_datasets,
+            )
+            for value_row in value_rows[:2]
+        ]
+        self.assertEqual(rows, expected)
+        self.assertEqual(
+            [list(row.keys()) for row in rows],
+            [list(row.keys()) for row in expected],
+        )
+        # Ensure only referenced rows are loaded given related querysets.
+        with patch.object(
+            drfwn_quick.data,
+            "load_related_dataset",
+            side_effect=lambda qs, ids, **kwargs: {
+                i: related_datasets[qs][i] for i in ids
+            },
+        ) as mock_load:
+            referenced_rows = format_value_rows(
+                value_rows,
+                lookups,
+                to_many_ids,
+                {},
+                {"region": "region", "vendors": "vendors"},
+                plan=plan,
+            )
+        self.assertEqual(referenced_rows, rows)
+        self.assertEqual(
+            {
+                call.args[0]: call.args[1]
+                for call in mock_load.call_args_list
+            },
+            {"region": {5}, "vendors": {1, 2}},
+        )
+        # Ensure the columns and json engines require a plan.
+        for engine in ("columns", "json"):
+            with self.assertRaises(ValueError):
+                format_queryset_data(
+                    ["name"],
+                    MagicMock(),
+                    {},
+                    engine=engine,
+                )
+        with self.assertRaises(ValueError):
+            format_queryset_data(
+                ["name"],
+                MagicMock(),
+                {},
+                plan=plan,
+                engine="bogus",
+            )
+
+
+class TestAsyncData(unittest.IsolatedAsyncioTestCase):
+    async def test_aload_related_dataset(self) -> None:
+        rows = AsyncRows([{"id": 1, "name": "beans"}, {"id": 2, "name": "bacon"}])
+        queryset = MagicMock()
+        queryset.values = lambda: rows
+        queryset.filter.return_value.values = lambda: AsyncRows(rows[:1])
+        # Ensure all rows are loaded when no IDs are given.
+        self.assertEqual(
+            await aload_related_dataset(queryset),
+            {1: rows[0], 2: rows[1]},
+        )
+        # Ensure only the given IDs are loaded, in chunks.
+        self.assertEqual(
+            await aload_related_dataset(queryset, {1, 3, 5}, chunk_size=2),
+            {1: rows[0]},
+        )
+        queryset.filter.assert_any_call(id__in=[1, 3])
+        queryset.filter.assert_any_call(id__in=[5])
+        # Ensure cached loads are run by load_related_dataset.
+        cache = MagicMock()
+        with patch.object(
+            drfwn_quick.data,
+            "load_related_dataset",
+            return_value={1: rows[0]},
+        ) as mock_load:
+            self.assertEqual(
+                await aload_related_dataset(queryset, {1}, cache=cache),
+                {1: rows[0]},
+            )
+        self.assertIs(mock_load.call_args.args[3], cache)
+
+    async def test_aformat_queryset_data(self) -> None:
+        related_field_a = MagicMock()
+        related_field_b = MagicMock()
+        related_field_a.name = "related_field_a"
+        related_field_b.name = "related_field_b"
+        related_field_a.many_to_many = True
+        related_field_b.many_to_many = True
+        queryset = MagicMock()
+        queryset.model._meta.get_fields = lambda: [
+            related_field_a,
+            related_field_b,
+        ]
+        related_datasets = {
+            "related_field_a": {
+                1: {"id": 1, "name": "beans"},
+                2: {"id": 2, "name": "bacon"},
+            },
+            "related_field_b": {11: {"id": 11, "name": "eggs"}},
+        }
+        queryset.values = lambda *args: AsyncRows(
+            [
+                {"name": "Breakfast", "id": 1, "related_field_a": 1},
+                {"name": "Breakfast", "id": 1, "related_field_a": 2},
+                {"name": "Lunch", "id": 2, "related_field_b": 11},
+            ]
+        )
+        field_names = ["name", "related_field_a", "related_field_b"]
+        # Ensure data is as format_queryset_data's.
+        self.assertEqual(
+            await aformat_queryset_data(
+                field_names,
+                queryset,
+                related_datasets,
+            ),
+            format_queryset_data(field_names, queryset, related_datasets),
+        )
+        # Ensure that given related querysets, only referenced rows are
+        # loaded and used.
+        related_queryset = MagicMock()
+        related_queryset.filter.return_value.values = lambda: AsyncRows(
+            [related_datasets["related_field_b"][11]]
+        )
+        formatted_data = await aformat_queryset_data(
+            field_names,
+            queryset,
+            {"related_field_a": related_datasets["related_field_a"]},
+            {"related_field_b": related_queryset},
+        )
+        related_queryset.filter.assert_called_once_with(id__in=[11])
+        self.assertEqual(
+            formatted_data[1]["related_field_b"],
+            [related_datasets["related_field_b"][11]],
+        )
+        # Ensure the prefetch strategy fetches each relation separately.
+        queryset.values = lambda *args: AsyncRows(
+            [{"name": "Breakfast", "id": 1}, {"name": "Lunch", "id": 2}]
+        )
+        grouped_ids = {
+            related_field_a: {1: [1, 2]},
+            related_field_b: {2: [11]},
+        }
+
+        async def afetch_to_many_ids(field, ids):
+            return grouped_ids[field]
+
+        with patch.object(
+            drfwn_quick.data,
+            "afetch_to_many_ids",
+            side_effect=afetch_to_many_ids,
+        ):
+            prefetched_data = await aformat_queryset_data(
+                field_names,
+                queryset,
+                related_datasets,
+                fetch_strategy="prefetch",
+            )
+        self.assertEqual(
+            prefetched_data,
+            [
+                {
+                    "id": 1,
+                    "name": "Breakfast",
+                    "related_field_a": [
+                        related_datasets["related_field_a"][1],
+                        related_datasets["related_field_a"][2],
+                    ],
+                    "related_field_b": [],
+                },
+                {
+                    "id": 2,
+                    "name": "Lunch",
+                    "related_field_a": [],
+                    "related_field_b": [
+                        related_datasets["related_field_b"][11],
+                    ],
+                },
+            ],
+        )
+        with self.assertRaises(ValueError):
+            await aformat_queryset_data(
+                field_names,
+                queryset,
+                related_datasets,
+                fetch_strategy="bogus",
+            )
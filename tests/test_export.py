@@ -0,0 +1,135 @@
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.db import models
+from rest_framework import serializers
+
+import drfwn_quick.export
+from drfwn_quick.export import (
+    encode_rows,
+    get_id_ranges,
+    iter_export,
+    validate_export_format,
+)
+from drfwn_quick.serializers import QuickableNestedModelSerializer
+
+
+class ExportItem(models.Model):
+    name = models.CharField(max_length=256)
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class ExportItemSerializer(QuickableNestedModelSerializer):
+    queryset = ExportItem.objects.all()
+    related_querysets = {}
+    label = serializers.CharField(source="name")
+    title = serializers.CharField(source="name")
+
+    class Meta:
+        model = ExportItem
+        fields = ["id", "label", "title"]
+
+
+ROWS = [
+    {"id": 1, "name": "a, b", "vendors": [{"id": 2}], "enabled": True},
+    {"id": 3, "name": None, "vendors": [], "enabled": False},
+]
+
+
+def get_serializer_class() -> MagicMock:
+    serializer_class = MagicMock()
+    serializer_class.__module__ = "app.serializers"
+    serializer_class.__qualname__ = "ProductSerializer"
+    serializer_class.get_quick_plan.return_value.columns = (
+        ("id", "id"),
+        ("name", "name"),
+        ("vendors", "vendors"),
+        ("enabled", "enabled"),
+    )
+    serializer_class.iter_quick_data.side_effect = lambda *a, **kw: iter(ROWS)
+    return serializer_class
+
+
+class TestExport(unittest.TestCase):
+    def test_validate_export_format(self) -> None:
+        validate_export_format("csv")
+        with self.assertRaises(ValueError):
+            validate_export_format("xml")
+
+    def test_encode_rows(self) -> None:
+        columns = ["id", "name", "vendors", "enabled"]
+        # Ensure NDJSON has a row per line.
+        lines = encode_rows(ROWS, "ndjson", columns).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], ROWS)
+        # Ensure CSV is quoted, with related rows and booleans as JSON.
+        self.assertEqual(
+            encode_rows(ROWS, "csv", columns),
+            '1,"a, b","[{""id"":2}]",true\r\n3,,[],false\r\n',
+        )
+
+    def test_get_id_ranges(self) -> None:
+        queryset = MagicMock()
+        ids = queryset.order_by.return_value.values_list.return_value
+        ids.iterator.return_value = iter([1, 2, 3, 5, 8])
+        self.assertEqual(
+            get_id_ranges(queryset, 2),
+            [(1, 3), (3, 8), (8, None)],
+        )
+        queryset.order_by.assert_called_once_with("id")
+
+    def test_iter_export(self) -> None:
+        serializer_class = get_serializer_class()
+        # Ensure CSV starts with a header, and related rows are loaded per
+        # chunk.
+        chunks = list(iter_export(serializer_class, "csv", chunk_size=1))
+        self.assertEqual(chunks[0], "id,name,vendors,enabled\r\n")
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(
+            serializer_class.iter_quick_data.call_args.kwargs[
+                "referenced_only"
+            ]
+        )
+        # Ensure ID ranges exported by workers are yielded in order.
+        with (
+            patch.object(
+                drfwn_quick.export,
+                "ProcessPoolExecutor",
+                new=ThreadPoolExecutor,
+            ),
+            patch.object(
+                drfwn_quick.export,
+                "get_id_ranges",
+                return_value=[(1, 3), (3, 5), (5, None)],
+            ),
+            patch.object(
+                drfwn_quick.export,
+                "export_id_range",
+                side_effect=lambda path, id_range, *args: f"{id_range}\n",
+            ) as mock_export_id_range,
+        ):
+            chunks = list(iter_export(serializer_class, workers=2))
+        self.assertEqual(chunks, ["(1, 3)\n", "(3, 5)\n", "(5, None)\n"])
+        self.assertEqual(
+            mock_export_id_range.call_args.args[0],
+            "app.serializers.ProductSerializer",
+        )
+
+    def test_iter_export_renamed_fields(self) -> None:
+        rows = [{"id": 1, "label": "a", "title": "a"}]
+        # Ensure renamed fields are columns by their output names, even if
+        # they share a source.
+        with patch.object(
+            ExportItemSerializer,
+            "iter_quick_data",
+            return_value=iter(rows),
+        ):
+            chunks = list(iter_export(ExportItemSerializer, "csv"))
+        self.assertEqual(chunks, ["id,label,title\r\n", "1,a,a\r\n"])
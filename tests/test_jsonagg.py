@@ -0,0 +1,328 @@
+import dataclasses
+import datetime
+import os
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.db import NotSupportedError, connection, models
+from django.db.models import F, TextField
+from django.db.models.functions import Cast
+
+import drfwn_quick.jsonagg
+from drfwn_quick.data import format_queryset_data
+from drfwn_quick.jsonagg import (
+    JSON_PREFIX,
+    get_json_columns,
+    get_json_converter,
+    get_json_relations,
+    get_json_value,
+    make_json_unpacker,
+    unpack_json_rows,
+)
+from drfwn_quick.serializers import QuickableNestedModelSerializer
+
+
+class JSONRegion(models.Model):
+    name = models.CharField(max_length=64)
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class JSONTag(models.Model):
+    label = models.CharField(max_length=64)
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class JSONVendor(models.Model):
+    name = models.CharField(max_length=256)
+    enabled = models.BooleanField(default=False)
+    rating = models.DecimalField(max_digits=4, decimal_places=2)
+    created = models.DateTimeField()
+    region = models.ForeignKey(JSONRegion, on_delete=models.CASCADE)
+    tags = models.ManyToManyField(JSONTag)
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class JSONRegionSerializer(QuickableNestedModelSerializer):
+    related_querysets = {"jsonvendor": JSONVendor.objects.all()}
+
+    class Meta:
+        model = JSONRegion
+        fields = ["id", "name"]
+
+
+class JSONTagSerializer(QuickableNestedModelSerializer):
+    related_querysets = {"jsonvendor": JSONVendor.objects.all()}
+
+    class Meta:
+        model = JSONTag
+        fields = ["id", "label"]
+
+
+class JSONVendorSerializer(QuickableNestedModelSerializer):
+    region = JSONRegionSerializer()
+    tags = JSONTagSerializer(many=True)
+    queryset = JSONVendor.objects.all()
+    related_querysets = {
+        "region": JSONRegion.objects.filter(name__startswith="r"),
+        "tags": JSONTag.objects.exclude(label=""),
+    }
+
+    class Meta:
+        model = JSONVendor
+        fields = ["id", "name", "rating", "created", "region", "tags"]
+
+
+class JSONVendorNameSerializer(QuickableNestedModelSerializer):
+    related_querysets = {
+        "region": JSONRegion.objects.all(),
+        "tags": JSONTag.objects.all(),
+    }
+
+    class Meta:
+        model = JSONVendor
+        fields = ["id", "name", "rating"]
+
+
+class JSONRegionVendorsSerializer(QuickableNestedModelSerializer):
+    jsonvendor = JSONVendorNameSerializer(many=True)
+    queryset = JSONRegion.objects.all()
+    related_querysets = {"jsonvendor": JSONVendor.objects.filter(rating__gt=0)}
+
+    class Meta:
+        model = JSONRegion
+        fields = ["id", "name", "jsonvendor"]
+
+
+class TestJSONAgg(unittest.TestCase):
+    def test_get_json_converter(self) -> None:
+        connection = MagicMock(timezone=datetime.timezone.utc)
+        field = JSONVendor._meta.get_field
+        # Ensure values are converted back to what queryset.values() gives.
+        self.assertIs(get_json_converter(field("enabled"), connection)(1), True)
+        self.assertEqual(
+            get_json_converter(field("rating"), connection)(5),
+            Decimal("5.00"),
+        )
+        # Ensure decimals, embedded as text, keep all their digits.
+        self.assertEqual(
+            get_json_converter(field("rating"), connection)("12.34"),
+            Decimal("12.34"),
+        )
+        big = models.DecimalField(max_digits=30, decimal_places=2)
+        self.assertEqual(
+            get_json_converter(big, connection)("1234567890123456789.01"),
+            Decimal("1234567890123456789.01"),
+        )
+        created = get_json_converter(field("created"), connection)(
+            "2024-01-02 03:04:05"
+        )
+        self.assertEqual(
+            (created.year, created.month, created.day, created.hour),
+            (2024, 1, 2, 3),
+        )
+        # Ensure datetimes are formatted if asked.
+        with patch.object(drfwn_quick.jsonagg, "DATETIME_FORMAT", "%Y/%m/%d"):
+            self.assertEqual(
+                get_json_converter(field("created"), connection, True)(
+                    "2024-01-02T03:04:05+00:00"
+                ),
+                "2024/01/02",
+            )
+        # Ensure values that are the same in JSON aren't converted.
+        self.assertIsNone(get_json_converter(field("name"), connection))
+        # Ensure fields that can't be converted aren't embedded.
+        with self.assertRaises(NotSupportedError):
+            get_json_converter(models.JSONField(), connection)
+
+    def test_get_json_value(self) -> None:
+        # Ensure decimals are embedded as text, other columns as they are.
+        self.assertEqual(
+            get_json_value(JSONVendor, "rating", "vendor__rating"),
+            Cast(F("vendor__rating"), TextField()),
+        )
+        self.assertEqual(get_json_value(JSONVendor, "name"), F("name"))
+
+    def test_get_json_columns(self) -> None:
+        # Ensure keys are as load_related_dataset's.
+        self.assertEqual(
+            [key for key, _ in get_json_columns(JSONVendor)],
+            ["id", "name", "enabled", "rating", "created", "region_id"],
+        )
+        self.assertEqual(
+            get_json_columns(JSONVendor, (("name", "name"),)),
+            (("name", "name"), ("id", "id")),
+        )
+        self.assertEqual(
+            get_json_columns(JSONVendor, (("place", "region__name"),)),
+            (("id", "id"), ("place", "region__name")),
+        )
+
+    def test_unpack_json_rows(self) -> None:
+        connection = MagicMock(timezone=datetime.timezone.utc)
+        unpack = make_json_unpacker(
+            JSONVendor,
+            (("id", "id"), ("enabled", "enabled")),
+            (),
+            connection,
+        )
+        rows = [
+            {
+                "id": 1,
+                f"{JSON_PREFIX}vendors": [
+                    {"id": 5, "enabled": 1},
+                    {"id": 6, "enabled": 0},
+                ],
+            },
+            {"id": 2, f"{JSON_PREFIX}vendors": [{"id": 5, "enabled": 1}]},
+            {"id": 3, f"{JSON_PREFIX}vendors": None},
+        ]
+        dataset_rows, datasets = unpack_json_rows(
+            rows,
+            {"vendors": (MagicMock(), unpack)},
+        )
+        # Ensure rows reference their related IDs, and related rows are
+        # converted once each.
+        self.assertEqual(
+            dataset_rows,
+            [
+                {"id": 1, "vendors": [5, 6]},
+                {"id": 2, "vendors": [5]},
+                {"id": 3, "vendors": []},
+            ],
+        )
+        self.assertEqual(
+            datasets,
+            {
+                "vendors": {
+                    5: {"id": 5, "enabled": True},
+                    6: {"id": 6, "enabled": False},
+                },
+            },
+        )
+
+    def test_get_json_relations(self) -> None:
+        queryset = MagicMock()
+        queryset.query.combinator = None
+        connection = MagicMock(vendor="mysql")
+        with patch.object(
+            drfwn_quick.jsonagg,
+            "connections",
+            {queryset.db: connection},
+        ):
+            # Ensure other databases fall back.
+            self.assertIsNone(get_json_relations(queryset, MagicMock()))
+            # Ensure relations that can't be embedded fall back.
+            connection.vendor = "sqlite"
+            plan = MagicMock(
+                field_names=("id", "vendors"),
+                rel_fields={"vendors": MagicMock()},
+            )
+            with patch.object(
+                drfwn_quick.jsonagg,
+                "get_json_relation",
+                side_effect=NotSupportedError(),
+            ):
+                self.assertIsNone(get_json_relations(queryset, plan))
+            with patch.object(
+                drfwn_quick.jsonagg,
+                "get_json_relation",
+            ) as mock_get_json_relation:
+                self.assertEqual(
+                    get_json_relations(queryset, plan),
+                    {"vendors": mock_get_json_relation.return_value},
+                )
+
+
+class TestJSONAggDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with connection.schema_editor() as editor:
+            for model in (JSONRegion, JSONTag, JSONVendor):
+                editor.create_model(model)
+        regions = [
+            JSONRegion.objects.create(name=name)
+            for name in ("r1", "r2", "x")
+        ]
+        tags = [JSONTag.objects.create(label=label) for label in "ab"]
+        created = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        for name, rating, region, vendor_tags in (
+            ("v1", Decimal("12.34"), regions[0], tags),
+            ("v2", Decimal("5.00"), regions[1], tags[1:]),
+            ("v3", Decimal("0.50"), regions[0], []),
+        ):
+            vendor = JSONVendor.objects.create(
+                name=name,
+                rating=rating,
+                created=created,
+                region=region,
+            )
+            vendor.tags.set(vendor_tags)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        with connection.schema_editor() as editor:
+            for model in (JSONVendor, JSONTag, JSONRegion):
+                editor.delete_model(model)
+
+    def format(self, plan, engine: str) -> list[dict]:
+        return format_queryset_data(
+            list(plan.field_names),
+            plan.queryset.order_by("id"),
+            {},
+            plan.related_querysets,
+            plan=plan,
+            engine=engine,
+        )
+
+    def test_related_querysets(self) -> None:
+        # Ensure the related rows embedded as JSON are queried from the
+        # related querysets, as the other engines load them.
+        for serializer_class in (
+            JSONVendorSerializer,
+            JSONRegionVendorsSerializer,
+        ):
+            plan = serializer_class.get_quick_plan()
+            self.assertIsNotNone(
+                get_json_relations(plan.queryset, plan),
+                serializer_class,
+            )
+            data = self.format(plan, "json")
+            self.assertEqual(data, self.format(plan, "rows"))
+            self.assertEqual(data, self.format(plan, "columns"))
+        self.assertEqual(
+            [
+                [vendor["name"] for vendor in region["jsonvendor"]]
+                for region in data
+            ],
+            [["v1", "v3"], ["v2"], []],
+        )
+        # Ensure related rows left out of the related querysets aren't
+        # embedded.
+        plan = dataclasses.replace(
+            JSONVendorSerializer.get_quick_plan(),
+            related_querysets={
+                "region": JSONRegion.objects.filter(name="r1"),
+                "tags": JSONTag.objects.filter(label="a"),
+            },
+        )
+        self.assertEqual(
+            [
+                (vendor["region"], vendor["tags"])
+                for vendor in self.format(plan, "json")
+            ],
+            [
+                ({"id": 1, "name": "r1"}, [{"id": 1, "label": "a"}]),
+                (None, []),
+                ({"id": 1, "name": "r1"}, []),
+            ],
+        )
@@ -0,0 +1,97 @@
+import os
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+
+import drfwn_quick.metrics
+from drfwn_quick.metrics import QuickMetrics, phase, report_metrics
+
+
+class TestQuickMetrics(unittest.TestCase):
+    def test_phase(self) -> None:
+        metrics = QuickMetrics("ProductSerializer")
+        # Ensure phases accumulate rather than overwrite.
+        with patch.object(
+            drfwn_quick.metrics.time,
+            "perf_counter",
+            side_effect=[1.0, 1.5, 2.0, 2.25],
+        ):
+            with metrics.phase("related"):
+                pass
+            with phase(metrics, "related"):
+                pass
+        self.assertEqual(metrics.timings, {"related": 0.75})
+        self.assertEqual(
+            metrics.server_timing(),
+            "quick-related;dur=750.0",
+        )
+        # Ensure no metrics is a no-op.
+        with phase(None, "related"):
+            pass
+
+    def test_fan_out(self) -> None:
+        metrics = QuickMetrics("ProductSerializer")
+        self.assertEqual(metrics.fan_out, 0.0)
+        metrics.base_rows = 30
+        metrics.rows = 10
+        self.assertEqual(metrics.fan_out, 3.0)
+        metrics.count_related_rows({"vendors": {1: {}, 2: {}}})
+        metrics.count_related_rows({"vendors": {3: {}}})
+        self.assertEqual(metrics.related_rows, {"vendors": 3})
+
+    def test_count_queries(self) -> None:
+        metrics = QuickMetrics("ProductSerializer")
+        wrappers = []
+
+        @contextmanager
+        def execute_wrapper(wrapper):
+            wrappers.append(wrapper)
+            yield
+
+        connection = MagicMock()
+        connection.execute_wrapper = execute_wrapper
+        with patch.object(
+            drfwn_quick.metrics.connections,
+            "all",
+            return_value=[connection, connection],
+        ):
+            with metrics.count_queries():
+                execute = MagicMock(return_value="result")
+                for wrapper in wrappers:
+                    self.assertEqual(
+                        wrapper(execute, "SELECT 1", None, False, {}),
+                        "result",
+                    )
+        self.assertEqual(metrics.queries, 2)
+
+    def test_report_metrics(self) -> None:
+        metrics = QuickMetrics("ProductSerializer")
+        callback = MagicMock()
+        # Ensure metrics are logged and given to the callback.
+        with (
+            patch.object(drfwn_quick.metrics, "METRICS_CALLBACK", callback),
+            self.assertLogs("drfwn_quick", level="DEBUG") as logs,
+        ):
+            report_metrics(metrics)
+        callback.assert_called_once_with(metrics)
+        self.assertIn("ProductSerializer", logs.output[0])
+        # Ensure dotted paths are imported.
+        with (
+            patch.object(
+                drfwn_quick.metrics,
+                "METRICS_CALLBACK",
+                "callbacks.report",
+            ),
+            patch.object(
+                drfwn_quick.metrics,
+                "import_string",
+                return_value=callback,
+            ) as mock_import,
+        ):
+            report_metrics(metrics)
+        mock_import.assert_called_once_with("callbacks.report")
+        self.assertEqual(callback.call_count, 2)
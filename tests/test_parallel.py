@@ -0,0 +1,89 @@
+import os
+import threading
+import unittest
+from typing import Callable
+from unittest.mock import MagicMock, patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+
+import drfwn_quick.parallel
+from drfwn_quick.metrics import QuickMetrics
+from drfwn_quick.parallel import can_run_in_parallel, run_parallel
+from drfwn_quick.routers import QuickReadRouter, reading_from
+
+
+class TestParallel(unittest.TestCase):
+    def test_can_run_in_parallel(self) -> None:
+        connection = MagicMock(in_atomic_block=False, vendor="postgresql")
+        connections = MagicMock()
+        connections.all.return_value = [connection]
+        connections.__iter__.return_value = ["default"]
+        connections.__getitem__.return_value = connection
+        with patch.object(drfwn_quick.parallel, "connections", connections):
+            self.assertTrue(can_run_in_parallel())
+            # Ensure other threads aren't used in a transaction, they
+            # wouldn't see its writes.
+            connection.in_atomic_block = True
+            self.assertFalse(can_run_in_parallel())
+            # Ensure in-memory SQLite databases aren't used from other
+            # threads, each would get an empty database.
+            connection.in_atomic_block = False
+            connection.vendor = "sqlite"
+            connection.is_in_memory_db.return_value = True
+            self.assertFalse(can_run_in_parallel())
+            connection.is_in_memory_db.return_value = False
+            self.assertTrue(can_run_in_parallel())
+
+    def test_run_parallel(self) -> None:
+        main_thread = threading.get_ident()
+
+        def make_task(result: int) -> Callable:
+            return lambda: (result, threading.get_ident())
+
+        tasks = [make_task(i) for i in range(3)]
+        # Ensure tasks run in order on this thread without workers.
+        results = run_parallel(tasks)
+        self.assertEqual([r for r, _ in results], [0, 1, 2])
+        self.assertEqual({t for _, t in results}, {main_thread})
+        connections = MagicMock()
+        with (
+            patch.object(
+                drfwn_quick.parallel,
+                "can_run_in_parallel",
+                return_value=True,
+            ),
+            patch.object(drfwn_quick.parallel, "connections", connections),
+        ):
+            # Ensure results keep their order, from worker threads that
+            # close their connections.
+            results = run_parallel(tasks, workers=2)
+            self.assertEqual([r for r, _ in results], [0, 1, 2])
+            self.assertNotIn(main_thread, {t for _, t in results})
+            self.assertEqual(connections.close_all.call_count, 3)
+            # Ensure queries on worker threads are counted.
+            metrics = QuickMetrics("ProductSerializer")
+            with patch.object(metrics, "count_queries") as mock_count:
+                run_parallel(tasks, workers=2, metrics=metrics)
+            self.assertEqual(mock_count.call_count, 3)
+            # Ensure reads on worker threads are routed alike.
+            with reading_from("replica"):
+                results = run_parallel(
+                    [lambda: QuickReadRouter().db_for_read(None)] * 2,
+                    workers=2,
+                )
+            self.assertEqual(results, ["replica", "replica"])
+            # Ensure errors are raised.
+            with self.assertRaises(ValueError):
+                run_parallel(
+                    [tasks[0], MagicMock(side_effect=ValueError)],
+                    workers=2,
+                )
+        with patch.object(
+            drfwn_quick.parallel,
+            "can_run_in_parallel",
+            return_value=False,
+        ):
+            results = run_parallel(tasks, workers=2)
+            self.assertEqual({t for _, t in results}, {main_thread})
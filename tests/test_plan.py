@@ -0,0 +1,219 @@
+import os
+import unittest
+from types import MappingProxyType
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.db import models
+from rest_framework import serializers
+
+from drfwn_quick.plan import build_quick_plan, get_serializer_columns
+from drfwn_quick.serializers import (
+    NARROWED_PLANS_MAX_SIZE,
+    QuickableNestedModelSerializer,
+    get_narrowed_quick_plan,
+)
+
+
+class PlanVendor(models.Model):
+    name = models.CharField(max_length=256)
+    created = models.DateTimeField()
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class PlanProduct(models.Model):
+    name = models.CharField(max_length=256)
+    updated = models.DateTimeField()
+    vendors = models.ManyToManyField(PlanVendor)
+    main_vendor = models.ForeignKey(
+        PlanVendor,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    class Meta:
+        app_label = "contenttypes"
+
+
+class PlanVendorSerializer(QuickableNestedModelSerializer):
+    queryset = PlanVendor.objects.all()
+    related_querysets = {}
+
+    class Meta:
+        model = PlanVendor
+        fields = "__all__"
+
+
+class PlanProductSerializer(QuickableNestedModelSerializer):
+    queryset = PlanProduct.objects.all()
+    related_querysets = {
+        "vendors": PlanVendor.objects.all(),
+        "main_vendor": PlanVendor.objects.all(),
+    }
+
+    class Meta:
+        model = PlanProduct
+        fields = "__all__"
+
+
+class TestQuickPlan(unittest.TestCase):
+    def test_build_quick_plan(self) -> None:
+        plan = build_quick_plan(PlanProductSerializer)
+        # Ensure metadata is compiled from the model.
+        self.assertEqual(
+            plan.field_names,
+            ("id", "name", "updated", "main_vendor", "vendors"),
+        )
+        self.assertEqual(plan.rel_names, ("vendors",))
+        self.assertEqual(plan.expanded_names, ("vendors",))
+        self.assertEqual(
+            dict(plan.relation_kinds),
+            {"main_vendor": "many_to_one", "vendors": "many_to_many"},
+        )
+        self.assertEqual(plan.datetime_columns, {"updated"})
+        self.assertEqual(
+            dict(plan.related_datetime_columns),
+            {"vendors": {"created"}},
+        )
+        # Ensure the plan is immutable.
+        self.assertIsInstance(plan.related_querysets, MappingProxyType)
+        with self.assertRaises(Exception):
+            plan.field_names = ()
+        # Ensure the plan can be introspected as plain data.
+        description = plan.describe()
+        self.assertEqual(description["model"], "contenttypes.PlanProduct")
+        self.assertEqual(description["datetime_columns"], ["updated"])
+
+    def test_build_quick_plan_nested(self) -> None:
+        class NestedSerializer(PlanProductSerializer):
+            vendors = PlanVendorSerializer(many=True)
+            vendor = PlanVendorSerializer(source="main_vendor")
+
+        plan = build_quick_plan(NestedSerializer)
+        # Ensure nested quick serializers are found by source, and declared
+        # to-one relations are expanded.
+        self.assertEqual(
+            dict(plan.nested_serializers),
+            {
+                "vendors": PlanVendorSerializer,
+                "main_vendor": PlanVendorSerializer,
+            },
+        )
+        self.assertEqual(plan.expanded_names, ("main_vendor", "vendors"))
+        self.assertEqual(plan.output_names["main_vendor"], "vendor")
+        # Ensure related rows are loaded with the nested serializer's
+        # columns, without to-many columns.
+        self.assertEqual(
+            dict(plan.related_columns)["vendors"],
+            (("id", "id"), ("name", "name"), ("created", "created")),
+        )
+        self.assertEqual(
+            plan.get_nested_plans(),
+            {
+                "vendors": PlanVendorSerializer.get_quick_plan(),
+                "main_vendor": PlanVendorSerializer.get_quick_plan(),
+            },
+        )
+
+    def test_narrow(self) -> None:
+        class NestedSerializer(PlanProductSerializer):
+            vendors = PlanVendorSerializer(many=True)
+            vendor = PlanVendorSerializer(source="main_vendor")
+
+        plan = NestedSerializer.get_quick_plan()
+        # Ensure only the given fields are fetched, by output name.
+        narrowed = plan.narrow(fields=frozenset({"name", "vendor"}))
+        self.assertEqual(narrowed.field_names, ("name", "main_vendor"))
+        self.assertEqual(narrowed.expanded_names, ("main_vendor",))
+        # Ensure relations that aren't expanded output their related IDs,
+        # and aren't followed.
+        narrowed = plan.narrow(expand=frozenset({"vendors"}))
+        self.assertEqual(narrowed.expanded_names, ("vendors",))
+        self.assertEqual(narrowed.collapsed_names, {"main_vendor"})
+        self.assertEqual(list(narrowed.get_nested_plans()), ["vendors"])
+        narrowed = plan.narrow(expand=frozenset())
+        self.assertEqual(narrowed.expanded_names, ())
+        row = narrowed.build_row(
+            {"id": 1, "name": "a", "updated": None, "main_vendor": 2,
+             "vendors": [3, 4]},
+            {},
+        )
+        self.assertEqual(row["vendor"], 2)
+        self.assertEqual(row["vendors"], [3, 4])
+        # Ensure narrowed plans are cached per known names only, and
+        # expand per expandable relations only.
+        self.assertIs(
+            NestedSerializer.get_quick_plan(frozenset({"name", "bogus"})),
+            NestedSerializer.get_quick_plan(frozenset({"name"})),
+        )
+        self.assertEqual(
+            plan.expandable_names,
+            {"vendors", "vendor", "main_vendor"},
+        )
+        self.assertIs(
+            NestedSerializer.get_quick_plan(None, frozenset({"name", "id"})),
+            NestedSerializer.get_quick_plan(None, frozenset()),
+        )
+        self.assertIs(NestedSerializer.get_quick_plan(None, None), plan)
+        # Ensure the cache is bounded, as requests choose the names.
+        self.assertEqual(
+            get_narrowed_quick_plan.cache_info().maxsize,
+            NARROWED_PLANS_MAX_SIZE,
+        )
+
+    def test_get_serializer_columns(self) -> None:
+        class FieldsSerializer(serializers.ModelSerializer):
+            title = serializers.CharField(source="name")
+            vendor_name = serializers.CharField(source="main_vendor.name")
+            secret = serializers.CharField(write_only=True)
+
+            class Meta:
+                model = PlanProduct
+                fields = ["id", "title", "vendor_name", "secret", "vendors"]
+
+        # Ensure declared fields are used, with sources as lookups.
+        self.assertEqual(
+            get_serializer_columns(FieldsSerializer, PlanProduct),
+            (
+                ("id", "id"),
+                ("title", "name"),
+                ("vendor_name", "main_vendor__name"),
+                ("vendors", "vendors"),
+            ),
+        )
+
+        class ExcludeSerializer(serializers.ModelSerializer):
+            extra = serializers.SerializerMethodField()
+
+            class Meta:
+                model = PlanProduct
+                exclude = ["updated", "vendors"]
+                extra_kwargs = {"name": {"write_only": True}}
+
+        # Ensure excluded, write only and non-column fields are left out.
+        with self.assertWarns(Warning):
+            columns = get_serializer_columns(ExcludeSerializer, PlanProduct)
+        self.assertEqual(columns, (("id", "id"), ("main_vendor", "main_vendor")))
+
+    def test_build_quick_plan_warnings(self) -> None:
+        class BareSerializer(QuickableNestedModelSerializer):
+            class Meta:
+                model = PlanProduct
+                fields = "__all__"
+
+        # Ensure missing querysets are warned about and set.
+        with self.assertWarns(Warning):
+            plan = build_quick_plan(BareSerializer)
+        self.assertEqual(plan.queryset.model, PlanProduct)
+        self.assertEqual(
+            set(plan.related_querysets.keys()),
+            {"vendors", "main_vendor"},
+        )
+
+    def test_get_quick_plan(self) -> None:
+        # Ensure the plan is compiled once and reused.
+        plan = PlanProductSerializer.get_quick_plan()
+        self.assertIs(PlanProductSerializer.get_quick_plan(), plan)
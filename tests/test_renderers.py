@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import os
+import unittest
+import uuid
+from unittest.mock import patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from rest_framework.renderers import JSONRenderer
+
+import drfwn_quick.renderers
+from drfwn_quick.renderers import QuickJSONRenderer, encode_json
+
+
+def get_data() -> list[dict]:
+    return [
+        {
+            "id": 1,
+            "name": "h\u00e9llo\u2028world\u2029",
+            "created": datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 6,
+                tzinfo=datetime.timezone.utc,
+            ),
+            "updated": datetime.datetime(2024, 1, 2, 3, 4, 5),
+            "date": datetime.date(2024, 1, 2),
+            "price": decimal.Decimal("1.10"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "related": [{"id": 2, "enabled": True, "score": 1.5}],
+            "empty": None,
+        },
+    ]
+
+
+class TestRenderers(unittest.TestCase):
+    def test_encode_json(self) -> None:
+        data = get_data()
+        expected = JSONRenderer().render(data)
+        # Ensure output is identical to DRF's, with or without orjson.
+        self.assertEqual(encode_json(data), expected)
+        with patch.object(drfwn_quick.renderers, "orjson", None):
+            self.assertEqual(encode_json(data), expected)
+        # Ensure data orjson can't encode falls back to DRF's encoder.
+        data[0]["big"] = 2 ** 70
+        self.assertEqual(encode_json(data), JSONRenderer().render(data))
+
+    def test_encode_json_non_finite(self) -> None:
+        data = [{"id": 1, "score": float("nan")}]
+        # Ensure orjson encodes non-finite floats as null, and otherwise
+        # they're handled as DRF does.
+        self.assertEqual(encode_json(data), b'[{"id":1,"score":null}]')
+        with patch.object(drfwn_quick.renderers, "orjson", None):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                encode_json(data)
+            with (
+                patch.object(
+                    drfwn_quick.renderers.api_settings,
+                    "STRICT_JSON",
+                    False,
+                ),
+                patch.object(JSONRenderer, "strict", False),
+            ):
+                self.assertEqual(
+                    encode_json(data),
+                    JSONRenderer().render(data),
+                )
+
+    def test_render(self) -> None:
+        data = get_data()
+        renderer = QuickJSONRenderer()
+        self.assertEqual(renderer.render(None), b"")
+        self.assertEqual(renderer.render(data), JSONRenderer().render(data))
+        # Ensure DRF's options are still respected, by DRF's renderer.
+        media_type = "application/json; indent=2"
+        with patch.object(drfwn_quick.renderers, "encode_json") as mock_encode:
+            self.assertEqual(
+                renderer.render(data, media_type),
+                JSONRenderer().render(data, media_type),
+            )
+            mock_encode.assert_not_called()
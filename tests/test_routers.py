@@ -0,0 +1,130 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+django.setup()
+from django.contrib.contenttypes.models import ContentType
+from django.http import HttpRequest, HttpResponse
+from django.test import override_settings
+
+import drfwn_quick.routers
+from drfwn_quick.routers import (
+    ROUTER_PATH,
+    QuickReadRouter,
+    check_read_router,
+    get_read_alias,
+    is_sticky,
+    iter_reading_from,
+    make_sticky,
+    reading_from,
+)
+from drfwn_quick.settings import READ_STICKY_COOKIE_NAME
+
+
+def get_request(method: str = "GET", cookie: str | None = None) -> HttpRequest:
+    request = HttpRequest()
+    request.method = method
+    if cookie is not None:
+        request.COOKIES[READ_STICKY_COOKIE_NAME] = cookie
+    return request
+
+
+def get_sticky_cookie() -> str:
+    response = HttpResponse()
+    make_sticky(response)
+    return response.cookies[READ_STICKY_COOKIE_NAME].value
+
+
+class TestRouters(unittest.TestCase):
+    def test_reading_from(self) -> None:
+        router = QuickReadRouter()
+        self.assertIsNone(router.db_for_read(ContentType))
+        with reading_from("replica"):
+            self.assertEqual(router.db_for_read(ContentType), "replica")
+            # Ensure None keeps the outer alias.
+            with reading_from(None):
+                self.assertEqual(router.db_for_read(ContentType), "replica")
+            with reading_from("default"):
+                self.assertEqual(router.db_for_read(ContentType), "default")
+            self.assertEqual(router.db_for_read(ContentType), "replica")
+        self.assertIsNone(router.db_for_read(ContentType))
+
+    def test_iter_reading_from(self) -> None:
+        router = QuickReadRouter()
+
+        def items():
+            for _ in range(2):
+                yield router.db_for_read(ContentType)
+
+        # Ensure reads are routed only while each item is fetched.
+        aliases = []
+        for alias in iter_reading_from("replica", items()):
+            aliases.append(alias)
+            self.assertIsNone(router.db_for_read(ContentType))
+        self.assertEqual(aliases, ["replica", "replica"])
+
+    def test_get_read_alias(self) -> None:
+        request = get_request()
+        self.assertIsNone(get_read_alias(None, ContentType, request))
+        self.assertEqual(
+            get_read_alias("replica", ContentType, request),
+            "replica",
+        )
+        self.assertEqual(get_read_alias("replica", ContentType), "replica")
+        # Ensure writes, and reads just after, are from the write alias.
+        request.method = "POST"
+        self.assertEqual(
+            get_read_alias("replica", ContentType, request),
+            "default",
+        )
+        request.method = "GET"
+        request.COOKIES[READ_STICKY_COOKIE_NAME] = get_sticky_cookie()
+        self.assertEqual(
+            get_read_alias("replica", ContentType, request),
+            "default",
+        )
+
+    def test_make_sticky(self) -> None:
+        self.assertTrue(is_sticky(get_request(cookie=get_sticky_cookie())))
+        self.assertFalse(is_sticky(get_request()))
+        # Ensure expired, unsigned and forged cookies aren't sticky.
+        cookie = get_sticky_cookie()
+        with patch.object(time, "time", return_value=time.time() + 6):
+            self.assertFalse(is_sticky(get_request(cookie=cookie)))
+        expires = str(time.time() + 3600)
+        self.assertFalse(is_sticky(get_request(cookie=expires)))
+        cookie = get_sticky_cookie()
+        forged = cookie.replace(cookie.split(":", 1)[0], expires)
+        self.assertFalse(is_sticky(get_request(cookie=forged)))
+        # Ensure validly signed values are capped, e.g. if the setting was
+        # lowered.
+        with patch.object(drfwn_quick.routers, "READ_STICKY_SECONDS", 3600):
+            cookie = get_sticky_cookie()
+        self.assertFalse(is_sticky(get_request(cookie=cookie)))
+        # Ensure nothing is set if not sticky at all.
+        response = HttpResponse()
+        with patch.object(drfwn_quick.routers, "READ_STICKY_SECONDS", 0):
+            make_sticky(response)
+        self.assertNotIn(READ_STICKY_COOKIE_NAME, response.cookies)
+
+    def test_check_read_router(self) -> None:
+        self.assertEqual(check_read_router(), [])
+        with patch.object(drfwn_quick.routers, "READ_ALIAS", "replica"):
+            self.assertEqual(
+                [message.id for message in check_read_router()],
+                ["drfwn_quick.E001", "drfwn_quick.W001"],
+            )
+        with (
+            patch.object(drfwn_quick.routers, "READ_ALIAS", "replica"),
+            override_settings(
+                DATABASES={
+                    "default": {"ENGINE": "django.db.backends.dummy"},
+                    "replica": {"ENGINE": "django.db.backends.dummy"},
+                },
+                DATABASE_ROUTERS=[ROUTER_PATH],
+            ),
+        ):
+            self.assertEqual(check_read_router(), [])
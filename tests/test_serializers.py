@@ -34,9 +34,125 @@ class TestQuickableNestedModelSerializer(unittest.TestCase):
                 request.method = "GET"
                 _serializer(context={"request": request})
                 mock_format.assert_not_called()
+            # Test that without a request, e.g. when declared as a nested
+            # serializer, quick is not used.
+            with patch.object(drfwn_quick.serializers, "determine_quick") as mock_determine:
+                self.assertFalse(_serializer().quick)
+                mock_determine.assert_not_called()
         # Test that force_quick ignores other qualifiers.
         with patch.object(drfwn_quick.serializers, "format_queryset_data") as mock_format:
             with patch.object(drfwn_quick.serializers, "determine_quick", return_value=False):
                 request.method = "POST"
                 _serializer(context={"request": request}, force_quick=True)
                 mock_format.assert_called()
+
+    def test__init__instance(self) -> None:
+        _serializer = QuickableNestedModelSerializer
+        QuickableNestedModelSerializer.Meta = MagicMock()
+        queryset = MagicMock()
+        plan = MagicMock(queryset=queryset, field_names=("id",))
+        with (
+            patch.object(_serializer, "get_quick_plan", return_value=plan),
+            patch.object(
+                drfwn_quick.serializers,
+                "format_queryset_data",
+                return_value=[{"id": 1}, {"id": 2}, {"id": 3}],
+            ),
+        ):
+            # Ensure a page of rows is filtered by ID and its order is kept.
+            serializer = _serializer(
+                [{"id": 3}, {"id": 1}, {"id": 2}],
+                force_quick=True,
+            )
+        queryset.filter.assert_called_once_with(id__in=[3, 1, 2])
+        self.assertEqual(serializer.data, [{"id": 3}, {"id": 1}, {"id": 2}])
+
+    def test__init__metrics(self) -> None:
+        _serializer = QuickableNestedModelSerializer
+        QuickableNestedModelSerializer.Meta = MagicMock()
+        with (
+            patch.object(_serializer, "collect_metrics", True),
+            patch.object(_serializer, "get_quick_data", return_value=[]),
+            patch.object(
+                drfwn_quick.serializers,
+                "report_metrics",
+            ) as mock_report,
+        ):
+            # Ensure metrics are collected and reported.
+            serializer = _serializer(force_quick=True)
+            mock_report.assert_called_once_with(serializer.quick_metrics)
+            # Ensure reporting is left to viewsets if deferred.
+            serializer = _serializer(
+                force_quick=True,
+                context={"defer_quick_metrics": True},
+            )
+            self.assertIsNotNone(serializer.quick_metrics)
+            mock_report.assert_called_once()
+
+
+class TestAsyncQuickableNestedModelSerializer(unittest.IsolatedAsyncioTestCase):
+    async def test_aget_quick_data(self) -> None:
+        _serializer = QuickableNestedModelSerializer
+        queryset = MagicMock()
+        plan = MagicMock(
+            queryset=queryset,
+            field_names=("id",),
+            expanded_names=(),
+        )
+        with (
+            patch.object(_serializer, "get_quick_plan", return_value=plan),
+            patch.object(
+                drfwn_quick.serializers,
+                "aformat_queryset_data",
+                return_value=[{"id": 1}, {"id": 2}, {"id": 3}],
+            ) as mock_format,
+        ):
+            # Ensure a page of rows is filtered by ID and its order is kept.
+            data = await _serializer.aget_quick_data([3, 1, 2])
+            queryset.filter.assert_called_once_with(id__in=[3, 1, 2])
+            self.assertEqual(data, [{"id": 3}, {"id": 1}, {"id": 2}])
+            # Ensure an empty page has no rows, rather than every row.
+            queryset.filter.reset_mock()
+            await _serializer.aget_quick_data([])
+            queryset.filter.assert_called_once_with(id__in=[])
+            # Ensure every row is formatted without an instance.
+            await _serializer.aget_quick_data()
+            self.assertIs(mock_format.call_args.args[1], queryset)
+
+    def test_iter_quick_data_ids(self) -> None:
+        _serializer = QuickableNestedModelSerializer
+        queryset = MagicMock()
+        chunks = {(3, 1): [{"id": 1}, {"id": 3}], (2,): [{"id": 2}]}
+
+        def iter_queryset_data(field_names, chunk_queryset, *args, **kwargs):
+            return iter(chunks[chunk_queryset.ids])
+
+        def filter(id__in):
+            return MagicMock(ids=tuple(id__in))
+
+        queryset.filter.side_effect = filter
+        with (
+            patch.object(_serializer, "get_quick_plan"),
+            patch.object(_serializer, "get_related_cache"),
+            patch.object(
+                _serializer,
+                "get_related_datasets",
+                return_value=({}, {}),
+            ),
+            patch.object(
+                drfwn_quick.serializers,
+                "iter_queryset_data",
+                side_effect=iter_queryset_data,
+            ),
+        ):
+            # Ensure rows are fetched a chunk of IDs at a time, in their
+            # order rather than the queryset's.
+            rows = _serializer.iter_quick_data(
+                queryset,
+                chunk_size=2,
+                ids=[3, 1, 2],
+            )
+            self.assertEqual(
+                [row["id"] for row in rows],
+                [3, 1, 2],
+            )
@@ -1,3 +1,4 @@
+import json
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -5,10 +6,20 @@ from unittest.mock import MagicMock, patch
 import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
 django.setup()
+from django.db.models.query import QuerySet
 
 import drfwn_quick.utils
-from drfwn_quick.settings import URL_QUICK_PARAM_NAME
-from drfwn_quick.utils import determine_quick
+from drfwn_quick.settings import (
+    URL_EXPAND_PARAM_NAME,
+    URL_FIELDS_PARAM_NAME,
+    URL_QUICK_PARAM_NAME,
+)
+from drfwn_quick.utils import (
+    determine_fields,
+    determine_quick,
+    get_instance_ids,
+    stream_json,
+)
 
 
 class TestUtils(unittest.TestCase):
@@ -28,3 +39,56 @@ class TestUtils(unittest.TestCase):
         # Test neither gives False.
         with patch.object(drfwn_quick.utils, "ALWAYS_QUICK", False):
             self.assertFalse(determine_quick(request))
+
+    def test_determine_fields(self) -> None:
+        request = MagicMock()
+        # Ensure None is given for all when not asked for.
+        request.query_params = {}
+        self.assertEqual(determine_fields(request), (None, None))
+        # Ensure names are split, and empty names dropped.
+        request.query_params = {
+            URL_FIELDS_PARAM_NAME: "id, name,,vendors",
+            URL_EXPAND_PARAM_NAME: "",
+        }
+        self.assertEqual(
+            determine_fields(request),
+            ({"id", "name", "vendors"}, frozenset()),
+        )
+
+    def test_stream_json(self) -> None:
+        rows = [{"id": i, "name": f"row {i}"} for i in range(5)]
+        # Ensure rows are streamed in batches as a plain JSON list.
+        chunks = list(stream_json(iter(rows), batch_size=2))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b"".join(chunks)), rows)
+        self.assertEqual(json.loads(b"".join(stream_json([]))), [])
+        # Ensure rows are placed in the envelope's results.
+        envelope = {"count": 5, "next": None, "results": []}
+        self.assertEqual(
+            json.loads(b"".join(stream_json(rows, envelope))),
+            {**envelope, "results": rows},
+        )
+        self.assertEqual(
+            json.loads(b"".join(stream_json(rows, {"results": []}))),
+            {"results": rows},
+        )
+        # Ensure results must be the envelope's last key.
+        with self.assertRaises(ValueError):
+            list(stream_json(rows, {"results": [], "count": 5}))
+
+    def test_get_instance_ids(self) -> None:
+        instance = MagicMock()
+        instance.id = 3
+        self.assertEqual(get_instance_ids(1), [1])
+        self.assertEqual(get_instance_ids(instance), [3])
+        self.assertEqual(get_instance_ids({"id": 2, "name": "row"}), [2])
+        # Ensure a page of any mix keeps its order.
+        self.assertEqual(
+            get_instance_ids([instance, {"id": 2}, 1]),
+            [3, 2, 1],
+        )
+        # Ensure querysets are read for IDs only.
+        queryset = MagicMock(spec=QuerySet)
+        queryset.values_list.return_value = [5, 4]
+        self.assertEqual(get_instance_ids(queryset), [5, 4])
+        queryset.values_list.assert_called_once_with("id", flat=True)